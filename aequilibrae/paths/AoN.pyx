@@ -18,136 +18,340 @@ cimport numpy as np
 
 # include 'parameters.pxi'
 include 'basic_path_finding.pyx'
+include 'priority_queues.pyx'
+include 'point_to_point.pyx'
+include 'contraction_hierarchies.pyx'
+include 'graph_building.pyx'
 include 'bpr.pyx'
 include 'conical.pyx'
+include 'link_vdf.pyx'
 include 'parallel_numpy.pyx'
+include 'bush_based.pyx'
+include 'path_based.pyx'
+include 'line_search.pyx'
 
 from .__version__ import binary_version as VERSION_COMPILED
+from cython.parallel cimport threadid
+cimport openmp
 
-def one_to_all(origin, matrix, graph, result, aux_result, curr_thread):
-    cdef long nodes, orig, i, block_flows_through_centroids, classes, b, origin_index, zones, posit, posit1
-    cdef int critical_queries = 0
-    cdef int path_file = 0
-    cdef int skims
-    cdef int link_extract_queries, query_type
-
-    # Origin index is the index of the matrix we are assigning
-    # this is used as index for the skim matrices
-    # orig is the ID of the actual centroid
-    # Is is used to actual path computation and to refer to outputs of path computation
+cdef int heap_code(graph):
+    # Position of the heap in the list of heaps available matches the constants defined in parameters.pxi
+    return graph.heaps_available.index(graph.heap_type)
 
-    orig = origin
-    origin_index = graph.compact_nodes_to_indices[orig]
+def one_to_all(origin, matrix, graph, result, aux_result, curr_thread):
+    """
+    Assigns a single origin, using the scratch arrays of one thread
 
-    #We transform the python variables in Cython variables
-    nodes = graph.compact_num_nodes
+    :param origin: ID of the centroid to be assigned
+    :param curr_thread: thread whose scratch arrays will be used
+    """
+    if curr_thread >= aux_result.temp_link_loads.shape[0]:
+        raise ValueError("Each thread needs its own link load buffer to assign origins independently")
+
+    thread = slice(curr_thread, curr_thread + 1)
+    _assign_with_scratch([origin],
+                         matrix,
+                         graph,
+                         result,
+                         aux_result.predecessors[:, thread],
+                         aux_result.reached_first[:, thread],
+                         aux_result.connectors[:, thread],
+                         aux_result.temp_link_loads[thread, :, :],
+                         aux_result.temp_node_loads[thread, :, :],
+                         aux_result.b_nodes,
+                         aux_result.temp_b_nodes[:, thread],
+                         aux_result.destinations[:, thread],
+                         aux_result.skim_slots[:, thread],
+                         1)
+    return origin
 
+def assign_origins(origins, matrix, graph, result, aux_result, int cores):
+    """
+    Assigns all origins in a single call to the binary, with the whole origin loop parallelized with OpenMP.
 
-    skims = len(graph.skim_fields)
+    Each thread uses its own slice of the scratch arrays in aux_result, so these need to have been prepared for at
+    least *cores* threads
 
+    :param origins: IDs of the centroids to be assigned
+    :param cores: number of threads to use
+    """
+    if cores > aux_result.predecessors.shape[1]:
+        raise ValueError("Scratch arrays were prepared for fewer threads than requested")
+
+    if aux_result.temp_link_loads.shape[0] > cores:
+        raise ValueError("There cannot be more link load buffers than threads")
+
+    _assign_with_scratch(origins,
+                         matrix,
+                         graph,
+                         result,
+                         aux_result.predecessors,
+                         aux_result.reached_first,
+                         aux_result.connectors,
+                         aux_result.temp_link_loads,
+                         aux_result.temp_node_loads,
+                         aux_result.b_nodes,
+                         aux_result.temp_b_nodes,
+                         aux_result.destinations,
+                         aux_result.skim_slots,
+                         cores)
+
+def _assign_with_scratch(origins, matrix, graph, result, predecessors, reached_first, connectors, link_loads,
+                         node_loads, original_b_nodes, b_nodes, destinations, skim_slots, int cores):
     if VERSION_COMPILED != graph.__version__:
         raise ValueError('This graph was created for a different version of AequilibraE. Please re-create it')
 
-    zones = graph.num_zones
-    block_flows_through_centroids = graph.block_centroid_flows
+    if link_loads.dtype != graph.compact_cost.dtype:
+        raise ValueError("Scratch arrays were prepared for a different precision than the graph's")
 
-    # In order to release the GIL for this procedure, we create all the
-    # memory views we will need
-    cdef double [:, :] demand_view = matrix.matrix_view[origin_index, :, :]
-    classes = matrix.matrix_view.shape[2]
-
-    # views from the graph
-    cdef long long [:] graph_fs_view = graph.compact_fs
-    cdef double [:] g_view = graph.compact_cost
-    cdef long long [:] ids_graph_view = graph.compact_graph.id.values
-    cdef long long [:] all_nodes_view = graph.compact_all_nodes
-    cdef long long [:] original_b_nodes_view = graph.compact_graph.b_node.values
+    origin_indices = np.array(graph.compact_nodes_to_indices[np.array(origins, np.int64)], np.int64)
+    skims = len(graph.skim_fields)
 
     if skims > 0:
         gskim = graph.compact_skims
-        tskim = aux_result.temporary_skims[:, :, curr_thread]
-        fskm = result.skims.matrix_view[origin_index, :, :]
+        fskm = result.skims.matrix_view
     else:
-        gskim = np.zeros((1,1))
-        tskim = np.zeros((1,1))
-        fskm = np.zeros((1,1))
-
-    cdef double [:, :] graph_skim_view = gskim
-    cdef double [:, :] skim_matrix_view = tskim
-    cdef double [:, :] final_skim_matrices_view = fskm
-
-    # views from the result object
-    cdef long long [:] no_path_view = result.no_path[origin_index, :]
-
-    # views from the aux-result object
-    cdef long long [:] predecessors_view = aux_result.predecessors[:, curr_thread]
-    cdef long long [:] reached_first_view = aux_result.reached_first[:, curr_thread]
-    cdef long long [:] conn_view = aux_result.connectors[:, curr_thread]
-    cdef double [:, :] link_loads_view = aux_result.temp_link_loads[:, :, curr_thread]
-    cdef double [:, :] node_load_view = aux_result.temp_node_loads[:, :, curr_thread]
-    cdef long long [:] b_nodes_view = aux_result.temp_b_nodes[:, curr_thread]
-
-    #Now we do all procedures with NO GIL
-    with nogil:
-        if block_flows_through_centroids: # Unblocks the centroid if that is the case
-            b = 0
-            blocking_centroid_flows(b,
-                                    origin_index,
-                                    zones,
-                                    graph_fs_view,
-                                    b_nodes_view,
-                                    original_b_nodes_view)
-        w = path_finding(origin_index,
-                         g_view,
-                         b_nodes_view,
-                         graph_fs_view,
-                         predecessors_view,
-                         ids_graph_view,
-                         conn_view,
-                         reached_first_view)
-
-        network_loading(classes,
-                        demand_view,
-                        predecessors_view,
-                        conn_view,
-                        link_loads_view,
-                        no_path_view,
-                        reached_first_view,
-                        node_load_view,
-                        w)
-        if skims > 0:
-            skim_single_path(origin_index,
-                     nodes,
-                     skims,
-                     skim_matrix_view,
-                     predecessors_view,
-                     conn_view,
-                     graph_skim_view,
-                     reached_first_view,
-                     w)
-            _copy_skims(skim_matrix_view,
-                        final_skim_matrices_view)
-
-        if block_flows_through_centroids: # Re-blocks the centroid if that is the case
-            b = 1
-            blocking_centroid_flows(b,
-                                    origin_index,
-                                    zones,
-                                    graph_fs_view,
-                                    b_nodes_view,
-                                    original_b_nodes_view)
+        gskim = np.zeros((1, 1), graph.compact_cost.dtype)
+        fskm = np.zeros((graph.num_zones, 1, 1))
+
+    # Costs and loads can be in single or double precision
+    if graph.compact_cost.dtype == np.float32:
+        assign_origin_indices[float](origin_indices,
+                                     heap_code(graph),
+                                     graph.compact_num_nodes,
+                                     graph.num_zones,
+                                     skims,
+                                     graph.block_centroid_flows,
+                                     matrix.matrix_view,
+                                     graph.compact_fs,
+                                     graph.compact_cost,
+                                     graph.compact_graph.id.values,
+                                     original_b_nodes,
+                                     gskim,
+                                     fskm,
+                                     result.no_path,
+                                     predecessors,
+                                     reached_first,
+                                     connectors,
+                                     link_loads,
+                                     node_loads,
+                                     b_nodes,
+                                     destinations,
+                                     skim_slots,
+                                     cores)
+    else:
+        assign_origin_indices[double](origin_indices,
+                                      heap_code(graph),
+                                      graph.compact_num_nodes,
+                                      graph.num_zones,
+                                      skims,
+                                      graph.block_centroid_flows,
+                                      matrix.matrix_view,
+                                      graph.compact_fs,
+                                      graph.compact_cost,
+                                      graph.compact_graph.id.values,
+                                      original_b_nodes,
+                                      gskim,
+                                      fskm,
+                                      result.no_path,
+                                      predecessors,
+                                      reached_first,
+                                      connectors,
+                                      link_loads,
+                                      node_loads,
+                                      b_nodes,
+                                      destinations,
+                                      skim_slots,
+                                      cores)
+
+@cython.wraparound(False)
+@cython.embedsignature(True)
+@cython.boundscheck(False)
+cpdef void assign_origin_indices(long long [:] origin_indices,
+                                 int heap,
+                                 long long nodes,
+                                 long long zones,
+                                 int skims,
+                                 int block_flows_through_centroids,
+                                 double [:, :, :] demand_view,
+                                 long long [:] graph_fs_view,
+                                 cython.floating [:] g_view,
+                                 long long [:] ids_graph_view,
+                                 long long [:] original_b_nodes_view,
+                                 cython.floating [:, :] graph_skim_view,
+                                 double [:, :, :] final_skim_matrices_view,
+                                 long long [:, :] no_path_view,
+                                 long long [:, :] predecessors_view,
+                                 long long [:, :] reached_first_view,
+                                 long long [:, :] conn_view,
+                                 cython.floating [:, :, ::1] link_loads_view,
+                                 cython.floating [:, :, ::1] node_load_view,
+                                 long long [:, :] b_nodes_view,
+                                 long long [:, :] destinations_view,
+                                 long long [:, :] skim_slots_view,
+                                 int cores):
+    # Array-only version of assign_origins, so it can also be called by processes that only see shared memory.
+    # Threads load links into buffer (thread % buffers). If there are fewer buffers than threads, each buffer is
+    # protected by a lock, which is only held while the (already cascaded) loads of one origin are added to it
+    cdef long long i, origin_index
+    cdef long long num_origins = origin_indices.shape[0]
+    cdef long long buffers = link_loads_view.shape[0]
+    cdef int th, buf
+    cdef openmp.omp_lock_t *locks = NULL
+    cdef openmp.omp_lock_t *lock
+
+    if buffers < cores:
+        locks = <openmp.omp_lock_t *> malloc(buffers * sizeof(openmp.omp_lock_t))
+        for buf in range(buffers):
+            openmp.omp_init_lock(&locks[buf])
+
+    for i in prange(num_origins, num_threads=cores, schedule='dynamic', nogil=True):
+        th = threadid()
+        buf = th % buffers
+        lock = NULL
+        if locks != NULL:
+            lock = &locks[buf]
+        origin_index = origin_indices[i]
+        aon_single_origin(heap,
+                          origin_index,
+                          nodes,
+                          zones,
+                          skims,
+                          block_flows_through_centroids,
+                          demand_view[origin_index, :, :],
+                          graph_fs_view,
+                          g_view,
+                          ids_graph_view,
+                          original_b_nodes_view,
+                          graph_skim_view,
+                          final_skim_matrices_view[origin_index, :, :],
+                          no_path_view[origin_index, :],
+                          predecessors_view[:, th],
+                          reached_first_view[:, th],
+                          conn_view[:, th],
+                          link_loads_view[buf, :, :],
+                          node_load_view[th, :, :],
+                          b_nodes_view[:, th],
+                          destinations_view[:, th],
+                          skim_slots_view[:, th],
+                          lock)
+
+    if locks != NULL:
+        for buf in range(buffers):
+            openmp.omp_destroy_lock(&locks[buf])
+        free(locks)
+
+@cython.wraparound(False)
+@cython.boundscheck(False)
+cdef void aon_single_origin(int heap,
+                            long long origin_index,
+                            long long nodes,
+                            long long zones,
+                            int skims,
+                            int block_flows_through_centroids,
+                            double [:, :] demand_view,
+                            long long [:] graph_fs_view,
+                            cython.floating [:] g_view,
+                            long long [:] ids_graph_view,
+                            long long [:] original_b_nodes_view,
+                            cython.floating [:, :] graph_skim_view,
+                            double [:, :] final_skim_matrices_view,
+                            long long [:] no_path_view,
+                            long long [:] predecessors_view,
+                            long long [:] reached_first_view,
+                            long long [:] conn_view,
+                            cython.floating [:, ::1] link_loads_view,
+                            cython.floating [:, ::1] node_load_view,
+                            long long [:] b_nodes_view,
+                            long long [:] destinations_view,
+                            long long [:] skim_slots_view,
+                            openmp.omp_lock_t *lock) nogil:
+    # Path computation and loading for a single origin, with all scratch arrays provided by the caller. If a lock is
+    # provided, the link loads buffer is shared with other threads
+    cdef long long num_destinations, w, num_active
+    cdef long classes = demand_view.shape[1]
+    cdef int b
+    cdef long long *active
+
+    # Only classes with demand from this origin are loaded, and origins without demand only need a path tree to skim
+    active = <long long*> malloc(classes * sizeof(long long))
+    num_active = classes_with_demand(demand_view, active)
+    if num_active == 0 and skims == 0:
+        free(active)
+        return
+
+    # The search can stop as soon as all destinations with demand are settled (all centroids, if skimming)
+    if skims > 0:
+        num_destinations = all_destinations(zones, destinations_view)
+    else:
+        num_destinations = destinations_from_demand(demand_view, destinations_view)
+
+    if block_flows_through_centroids: # Unblocks the centroid if that is the case
+        b = 0
+        blocking_centroid_flows(b,
+                                origin_index,
+                                zones,
+                                graph_fs_view,
+                                b_nodes_view,
+                                original_b_nodes_view)
+    w = compute_path_tree(heap,
+                          origin_index,
+                          g_view,
+                          b_nodes_view,
+                          graph_fs_view,
+                          predecessors_view,
+                          ids_graph_view,
+                          conn_view,
+                          reached_first_view,
+                          destinations_view,
+                          num_destinations)
+
+    if num_active > 0:
+        seed_node_loads(demand_view, reached_first_view, node_load_view, active, num_active, w)
+        if lock == NULL:
+            cascade_loads(predecessors_view, conn_view, reached_first_view, node_load_view, link_loads_view, active,
+                          num_active, w, 1)
+        else:
+            cascade_loads(predecessors_view, conn_view, reached_first_view, node_load_view, link_loads_view, active,
+                          num_active, w, 0)
+            openmp.omp_set_lock(lock)
+            add_link_loads(conn_view, reached_first_view, node_load_view, link_loads_view, active, num_active, w)
+            openmp.omp_unset_lock(lock)
+    free(active)
 
-    return origin
+    if skims > 0:
+        skim_multiple_fields(origin_index,
+                             zones,
+                             skims,
+                             predecessors_view,
+                             conn_view,
+                             graph_skim_view,
+                             reached_first_view,
+                             w,
+                             skim_slots_view,
+                             final_skim_matrices_view)
 
-def path_computation(origin, destination, graph, results):
-    # type: (int, int, Graph, PathResults) -> (None)
+    if block_flows_through_centroids: # Re-blocks the centroid if that is the case
+        b = 1
+        blocking_centroid_flows(b,
+                                origin_index,
+                                zones,
+                                graph_fs_view,
+                                b_nodes_view,
+                                original_b_nodes_view)
+
+def path_computation(origin, destination, graph, results, early_exit=False):
+    # type: (int, int, Graph, PathResults, bool) -> (None)
     """
     :param graph: AequilibraE graph. Needs to have been set with number of centroids and list of skims (if any)
     :param results: AequilibraE Matrix properly set for computation using matrix.computational_view([matrix list])
     :param skimming: if we will skim for all nodes or not
+    :param early_exit: if we stop the search as soon as the destination is settled
     """
     cdef ITYPE_t nodes, orig, dest, p, b, origin_index, dest_index, connector, zones
     cdef long i, j, skims, a, block_flows_through_centroids
+    cdef long long num_destinations = 0
+    cdef int heap = heap_code(graph)
 
     results.origin = origin
     results.destination = destination
@@ -174,7 +378,7 @@ def path_computation(origin, destination, graph, results):
     #In order to release the GIL for this procedure, we create all the
     #memmory views we will need
     cdef double [:] g_view = graph.cost
-    cdef long long [:] original_b_nodes_view = graph.graph.b_node.values
+    cdef long long [:] original_b_nodes_view = graph.b_nodes
     cdef long long [:] graph_fs_view = graph.fs
     cdef double [:, :] graph_skim_view = graph.skims
     cdef long long [:] ids_graph_view = graph.graph.id.values
@@ -185,9 +389,16 @@ def path_computation(origin, destination, graph, results):
     cdef double [:, :] skim_matrix_view = results._skimming_array
     cdef long long [:] reached_first_view = results.reached_first
 
-    new_b_nodes = graph.graph.b_node.values.copy()
+    new_b_nodes = graph.b_nodes.copy()
     cdef long long [:] b_nodes_view = new_b_nodes
 
+    destinations = np.zeros(1, dtype=graph.default_types('int'))
+    if early_exit:
+        destinations = np.zeros(dest_index + 1, dtype=graph.default_types('int'))
+        destinations[dest_index] = 1
+        num_destinations = 1
+    cdef long long [:] destinations_view = destinations
+
     #Now we do all procedures with NO GIL
     with nogil:
         if block_flows_through_centroids: # Unblocks the centroid if that is the case
@@ -199,14 +410,17 @@ def path_computation(origin, destination, graph, results):
                                     b_nodes_view,
                                     original_b_nodes_view)
 
-        w = path_finding(origin_index,
-                         g_view,
-                         b_nodes_view,
-                         graph_fs_view,
-                         predecessors_view,
-                         ids_graph_view,
-                         conn_view,
-                         reached_first_view)
+        w = compute_path_tree(heap,
+                              origin_index,
+                              g_view,
+                              b_nodes_view,
+                              graph_fs_view,
+                              predecessors_view,
+                              ids_graph_view,
+                              conn_view,
+                              reached_first_view,
+                              destinations_view,
+                              num_destinations)
 
         if skims > 0:
             skim_single_path(origin_index,
@@ -254,6 +468,104 @@ def path_computation(origin, destination, graph, results):
             del mileposts
 
 
+def bidirectional_path_computation(origin, destination, graph, results):
+    # type: (int, int, Graph, PathResults) -> (None)
+    """
+    :param graph: AequilibraE graph. Needs to have been set with number of centroids and list of skims (if any)
+    :param results: PathResults object prepared for the graph, holding the reverse star of the graph
+    """
+    cdef long long origin_index, dest_index, zones, meeting_node, p
+    cdef int block_flows_through_centroids
+
+    results.origin = origin
+    results.destination = destination
+    origin_index = graph.nodes_to_indices[origin]
+    dest_index = graph.nodes_to_indices[destination]
+    if results.__graph_id__ != graph.__id__:
+        raise ValueError("Results object not prepared. Use --> results.prepare(graph)")
+
+    if VERSION_COMPILED != graph.__version__:
+        raise ValueError('This graph was created for a different version of AequilibraE. Please re-create it')
+
+    zones = graph.num_zones
+    block_flows_through_centroids = graph.block_centroid_flows
+
+    reverse_fs, reverse_csr, reverse_ids = results._reverse_star()
+
+    cdef double [:] g_view = graph.cost
+    cdef long long [:] b_nodes_view = graph.b_nodes
+    cdef long long [:] graph_fs_view = graph.fs
+    cdef long long [:] ids_graph_view = graph.graph.id.values
+    cdef long long [:] reverse_fs_view = reverse_fs
+    cdef long long [:] reverse_csr_view = reverse_csr
+    cdef long long [:] reverse_ids_view = reverse_ids
+
+    cdef long long [:] predecessors_view = results.predecessors
+    cdef long long [:] conn_view = results.connectors
+    successors = np.empty_like(results.predecessors)
+    reverse_connectors = np.empty_like(results.connectors)
+    cdef long long [:] successors_view = successors
+    cdef long long [:] reverse_conn_view = reverse_connectors
+
+    with nogil:
+        meeting_node = bidirectional_path_finding(origin_index,
+                                                  dest_index,
+                                                  g_view,
+                                                  b_nodes_view,
+                                                  graph_fs_view,
+                                                  ids_graph_view,
+                                                  reverse_csr_view,
+                                                  reverse_fs_view,
+                                                  reverse_ids_view,
+                                                  zones,
+                                                  block_flows_through_centroids,
+                                                  predecessors_view,
+                                                  conn_view,
+                                                  successors_view,
+                                                  reverse_conn_view)
+
+    results.path = None
+    results.path_nodes = None
+    results.path_link_directions = None
+    results.milepost = None
+    if results.num_skims > 0:
+        results._skimming_array.fill(np.inf)
+
+    if meeting_node < 0:
+        return
+
+    all_nodes = [meeting_node]
+    all_connectors = []
+    p = meeting_node
+    while p != origin_index:
+        all_connectors.append(conn_view[p])
+        p = predecessors_view[p]
+        all_nodes.append(p)
+    all_nodes.reverse()
+    all_connectors.reverse()
+
+    p = meeting_node
+    while p != dest_index:
+        all_connectors.append(reverse_conn_view[p])
+        p = successors_view[p]
+        all_nodes.append(p)
+
+    # The predecessors are made consistent along the path, so the tree can be read as in one-to-all searches
+    connectors = np.asarray(all_connectors, graph.default_types('int'))
+    nodes = np.asarray(all_nodes, graph.default_types('int'))
+    results.predecessors[nodes[1:]] = nodes[:-1]
+    results.connectors[nodes[1:]] = connectors
+
+    results.path = graph.graph.link_id.values[connectors]
+    results.path_nodes = graph.all_nodes[nodes]
+    results.path_link_directions = graph.graph.direction.values[connectors]
+    results.milepost = np.hstack(([0], np.cumsum(graph.cost[connectors])))
+
+    if results.num_skims > 0:
+        results._skimming_array[nodes, :] = np.vstack((np.zeros((1, results.num_skims)),
+                                                       np.cumsum(graph.skims[connectors, :results.num_skims], axis=0)))
+
+
 def update_path_trace(results, destination, graph):
     # type: (PathResults, int, Graph) -> (None)
     """
@@ -302,6 +614,7 @@ def skimming_single_origin(origin, graph, result, aux_result, curr_thread):
     :return:
     """
     cdef long long nodes, orig, origin_index, i, block_flows_through_centroids, skims, zones, b
+    cdef int heap = heap_code(graph)
     #We transform the python variables in Cython variables
     orig = origin
     origin_index = graph.compact_nodes_to_indices[orig]
@@ -328,24 +641,74 @@ def skimming_single_origin(origin, graph, result, aux_result, curr_thread):
     block_flows_through_centroids = graph.block_centroid_flows
     skims = result.num_skims
 
-    # In order to release the GIL for this procedure, we create all the
-    # memory views we will need
-
-    # views from the graph
-    cdef long long [:] graph_fs_view = graph_fs
-    cdef double [:] g_view = graph.compact_cost
-    cdef long long [:] ids_graph_view = graph.compact_graph.id.values
-    cdef long long [:] original_b_nodes_view = graph.compact_graph.b_node.values
-    cdef double [:, :] graph_skim_view = graph.compact_skims[:, :]
-
-    cdef double [:, :] final_skim_matrices_view = result.skims.matrix_view[origin_index, :, :]
+    # Costs and skims can be in single or double precision
+    if graph.compact_cost.dtype == np.float32:
+        skim_origin_index[float](origin_index,
+                                 heap,
+                                 nodes,
+                                 zones,
+                                 skims,
+                                 block_flows_through_centroids,
+                                 graph_fs,
+                                 graph.compact_cost,
+                                 graph.compact_graph.id.values,
+                                 graph.compact_b_nodes,
+                                 graph.compact_skims[:, :],
+                                 result._skim_row(origin_index),
+                                 aux_result.predecessors[:, curr_thread],
+                                 aux_result.reached_first[:, curr_thread],
+                                 aux_result.connectors[:, curr_thread],
+                                 aux_result.temp_b_nodes[:, curr_thread],
+                                 aux_result.skim_slots[:, curr_thread],
+                                 aux_result.destinations,
+                                 aux_result.num_destinations)
+    else:
+        skim_origin_index[double](origin_index,
+                                  heap,
+                                  nodes,
+                                  zones,
+                                  skims,
+                                  block_flows_through_centroids,
+                                  graph_fs,
+                                  graph.compact_cost,
+                                  graph.compact_graph.id.values,
+                                  graph.compact_b_nodes,
+                                  graph.compact_skims[:, :],
+                                  result._skim_row(origin_index),
+                                  aux_result.predecessors[:, curr_thread],
+                                  aux_result.reached_first[:, curr_thread],
+                                  aux_result.connectors[:, curr_thread],
+                                  aux_result.temp_b_nodes[:, curr_thread],
+                                  aux_result.skim_slots[:, curr_thread],
+                                  aux_result.destinations,
+                                  aux_result.num_destinations)
+    return orig
 
-    # views from the aux-result object
-    cdef long long [:] predecessors_view = aux_result.predecessors[:, curr_thread]
-    cdef long long [:] reached_first_view = aux_result.reached_first[:, curr_thread]
-    cdef long long [:] conn_view = aux_result.connectors[:, curr_thread]
-    cdef long long [:] b_nodes_view = aux_result.temp_b_nodes[:, curr_thread]
-    cdef double [:, :] skim_matrix_view = aux_result.temporary_skims[:, :, curr_thread]
+@cython.wraparound(False)
+@cython.embedsignature(True)
+@cython.boundscheck(False)
+cpdef void skim_origin_index(long long origin_index,
+                             int heap,
+                             long long nodes,
+                             long long zones,
+                             long long skims,
+                             long long block_flows_through_centroids,
+                             long long [:] graph_fs_view,
+                             cython.floating [:] g_view,
+                             long long [:] ids_graph_view,
+                             long long [:] original_b_nodes_view,
+                             cython.floating [:, :] graph_skim_view,
+                             double [:, :] final_skim_matrices_view,
+                             long long [:] predecessors_view,
+                             long long [:] reached_first_view,
+                             long long [:] conn_view,
+                             long long [:] b_nodes_view,
+                             long long [:] skim_slots_view,
+                             long long [:] destinations_view,
+                             long long num_destinations):
+    # Skims from a single origin. Link costs and skims may be in single or double precision
+    cdef long long w
+    cdef int b
 
     #Now we do all procedures with NO GIL
     with nogil:
@@ -357,25 +720,27 @@ def skimming_single_origin(origin, graph, result, aux_result, curr_thread):
                                     graph_fs_view,
                                     b_nodes_view,
                                     original_b_nodes_view)
-        w = path_finding(origin_index,
-                         g_view,
-                         b_nodes_view,
-                         graph_fs_view,
-                         predecessors_view,
-                         ids_graph_view,
-                         conn_view,
-                         reached_first_view)
+        w = compute_path_tree(heap,
+                              origin_index,
+                              g_view,
+                              b_nodes_view,
+                              graph_fs_view,
+                              predecessors_view,
+                              ids_graph_view,
+                              conn_view,
+                              reached_first_view,
+                              destinations_view,
+                              num_destinations)
 
         skim_multiple_fields(origin_index,
-                             nodes,
-                             zones, # ???????????????
+                             zones,
                              skims,
-                             skim_matrix_view,
                              predecessors_view,
                              conn_view,
                              graph_skim_view,
                              reached_first_view,
                              w,
+                             skim_slots_view,
                              final_skim_matrices_view)
         if block_flows_through_centroids: # Unblocks the centroid if that is the case
             b = 1
@@ -385,4 +750,134 @@ def skimming_single_origin(origin, graph, result, aux_result, curr_thread):
                                     graph_fs_view,
                                     b_nodes_view,
                                     original_b_nodes_view)
-    return orig
+
+def many_to_many_skims(origin_indices, destination_indices, graph, int cores, double cutoff=INFINITE):
+    """
+    :param origin_indices: Indices of the origins in the graph
+    :param destination_indices: Indices of the destinations in the graph
+    :param graph: AequilibraE graph. Origins and destinations do not need to be centroids
+    :param cores: Number of threads
+    :param cutoff: Maximum cost searched from each origin. Destinations beyond it are not reached
+    :return: Arrays with costs (origins x destinations) and skims (origins x destinations x skims)
+    """
+    if VERSION_COMPILED != graph.__version__:
+        raise ValueError('This graph was created for a different version of AequilibraE. Please re-create it')
+
+    itype = graph.default_types('int')
+    nodes = graph.num_nodes + 1
+    skims = len(graph.skim_fields)
+    origin_indices = np.array(origin_indices, dtype=itype)
+    destination_indices = np.array(destination_indices, dtype=itype)
+
+    # The cost of each link is skimmed together with the skim fields, so it is the first skim
+    link_skims = np.zeros((graph.num_links, skims + 1), dtype=np.float64)
+    link_skims[:, 0] = graph.cost
+    if skims > 0:
+        link_skims[:, 1:] = graph.skims[:, :skims]
+
+    destinations = np.zeros(nodes, dtype=itype)
+    destinations[destination_indices] = 1
+    b_nodes = np.repeat(graph.b_nodes.reshape(-1, 1), cores, axis=1)
+    final_skims = np.empty((origin_indices.shape[0], destination_indices.shape[0], skims + 1), dtype=np.float64)
+
+    skim_node_sets(origin_indices,
+                   destination_indices,
+                   heap_code(graph),
+                   graph.num_zones,
+                   int(graph.block_centroid_flows),
+                   graph.fs,
+                   np.asarray(graph.cost, dtype=np.float64),
+                   graph.graph.id.values,
+                   graph.b_nodes,
+                   link_skims,
+                   final_skims,
+                   np.zeros((nodes, cores), dtype=itype),
+                   np.zeros((nodes, cores), dtype=itype),
+                   np.zeros((nodes, cores), dtype=itype),
+                   b_nodes,
+                   np.zeros((cores, nodes, skims + 1), dtype=np.float64),
+                   destinations,
+                   int(destinations.sum()),
+                   cutoff,
+                   cores)
+    final_skims[final_skims >= INFINITE] = np.inf
+    return final_skims[:, :, 0], final_skims[:, :, 1:]
+
+@cython.wraparound(False)
+@cython.embedsignature(True)
+@cython.boundscheck(False)
+cpdef void skim_node_sets(long long [:] origin_indices,
+                          long long [:] destination_indices,
+                          int heap,
+                          long long zones,
+                          long long block_flows_through_centroids,
+                          long long [:] graph_fs_view,
+                          double [:] g_view,
+                          long long [:] ids_graph_view,
+                          long long [:] original_b_nodes_view,
+                          double [:, :] graph_skim_view,
+                          double [:, :, :] final_skims_view,
+                          long long [:, :] predecessors_view,
+                          long long [:, :] reached_first_view,
+                          long long [:, :] conn_view,
+                          long long [:, :] b_nodes_view,
+                          double [:, :, ::1] node_skims_view,
+                          long long [:] destinations_view,
+                          long long num_destinations,
+                          double cutoff,
+                          int cores):
+    # Skims between any nodes of the graph, writing one row (destinations x skims) per origin. The searches stop once
+    # all destinations flagged in destinations_view are settled or the cutoff is exceeded. The first skim is the cost
+    # of the path itself
+    cdef long long i, j, k, origin_index, w
+    cdef long long num_origins = origin_indices.shape[0]
+    cdef long long num_dest = destination_indices.shape[0]
+    cdef long long nodes = node_skims_view.shape[1]
+    cdef long long skims = node_skims_view.shape[2]
+    cdef int th
+
+    for i in prange(num_origins, num_threads=cores, schedule='dynamic', nogil=True):
+        th = threadid()
+        origin_index = origin_indices[i]
+        if block_flows_through_centroids:
+            blocking_centroid_flows(0,
+                                    origin_index,
+                                    zones,
+                                    graph_fs_view,
+                                    b_nodes_view[:, th],
+                                    original_b_nodes_view)
+
+        w = compute_path_tree[double](heap,
+                                      origin_index,
+                                      g_view,
+                                      b_nodes_view[:, th],
+                                      graph_fs_view,
+                                      predecessors_view[:, th],
+                                      ids_graph_view,
+                                      conn_view[:, th],
+                                      reached_first_view[:, th],
+                                      destinations_view,
+                                      num_destinations,
+                                      cutoff)
+
+        skim_single_path[double](origin_index,
+                                 nodes,
+                                 skims,
+                                 node_skims_view[th, :, :],
+                                 predecessors_view[:, th],
+                                 conn_view[:, th],
+                                 graph_skim_view,
+                                 reached_first_view[:, th],
+                                 w)
+
+        for j in range(num_dest):
+            for k in range(skims):
+                final_skims_view[i, j, k] = node_skims_view[th, destination_indices[j], k]
+
+        if block_flows_through_centroids:
+            blocking_centroid_flows(1,
+                                    origin_index,
+                                    zones,
+                                    graph_fs_view,
+                                    b_nodes_view[:, th],
+                                    original_b_nodes_view)
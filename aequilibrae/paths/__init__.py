@@ -1,7 +1,9 @@
 from aequilibrae.paths.results import *
 from aequilibrae.paths.multi_threaded_aon import MultiThreadedAoN
+from aequilibrae.paths.multi_process_aon import close_process_pools
 from aequilibrae.paths.multi_threaded_skimming import MultiThreadedNetworkSkimming
 from aequilibrae.paths.network_skimming import NetworkSkimming
+from aequilibrae.paths.isochrones import Isochrones
 from aequilibrae.paths.all_or_nothing import allOrNothing
 from aequilibrae.paths.traffic_class import TrafficClass
 from aequilibrae.paths.traffic_assignment import TrafficAssignment
@@ -11,7 +13,7 @@ from .__version__ import binary_version, release_name, minor_version, release_ve
 from aequilibrae import logger
 
 try:
-    from aequilibrae.paths.AoN import one_to_all, skimming_single_origin, path_computation, VERSION_COMPILED, \
-        update_path_trace
+    from aequilibrae.paths.AoN import one_to_all, skimming_single_origin, path_computation, \
+        update_path_trace, VERSION_COMPILED
 except ImportError as ie:
     logger.warning(f'Could not import procedures from the binary. {ie.args}')
@@ -0,0 +1,244 @@
+import importlib.util as iutil
+from types import SimpleNamespace
+from typing import List
+import numpy as np
+from ..utils import WorkerThread
+from aequilibrae.paths.traffic_class import TrafficClass
+from aequilibrae.paths.all_or_nothing import allOrNothing
+from aequilibrae import logger
+
+try:
+    from aequilibrae.paths.AoN import aggregate_link_costs, assign_link_loads, copy_three_dimensions
+    from aequilibrae.paths.AoN import bush_link_costs, initialize_bush, update_bush
+except ImportError as ie:
+    logger.warning(f"Could not import procedures from the binary. {ie.args}")
+
+if False:
+    from aequilibrae.paths.traffic_assignment import TrafficAssignment
+
+spec = iutil.find_spec("PyQt5")
+pyqt = spec is not None
+if pyqt:
+    from PyQt5.QtCore import pyqtSignal as SIGNAL
+
+
+class AlgorithmB(WorkerThread):
+    """Bush-based user equilibrium assignment with Algorithm B (Dial, 2006)
+
+    The flows leaving each origin are kept on an acyclic sub-network (a bush), which is improved and equilibrated in
+    turns, so the assignment converges to much tighter relative gaps than the linear approximation algorithms. Bushes
+    are built on the compressed graph of each traffic class, and flows are shifted between the longest and shortest
+    paths within each bush with Newton steps. Link costs are updated after every shift, for all classes.
+
+    The relative gap is computed in the same way as for the other algorithms, with an all-or-nothing assignment
+    with the costs at the end of each iteration, and skims are those of the shortest paths of the final iteration.
+    """
+
+    if pyqt:
+        equilibration = SIGNAL(object)
+        assignment = SIGNAL(object)
+
+    def __init__(self, assig_spec, algorithm="algorithm-b") -> None:
+        WorkerThread.__init__(self, None)
+        self.algorithm = algorithm
+        self.rgap_target = assig_spec.rgap_target
+        self.max_iter = assig_spec.max_iter
+        self.cores = assig_spec.cores
+        self.iteration_issue = []
+        self.convergence_report = {"iteration": [], "rgap": [], "warnings": []}
+
+        # Number of times flows are shifted within each bush before moving to the next one
+        self.inner_iterations = 3
+
+        self.assig = assig_spec  # type: TrafficAssignment
+
+        if None in [
+            assig_spec.classes,
+            assig_spec.vdf,
+            assig_spec.capacity_field,
+            assig_spec.time_field,
+            assig_spec.vdf_parameters,
+        ]:
+            all_par = "Traffic classes, VDF, VDF_parameters, capacity field & time_field"
+            raise Exception(
+                "Parameter missing. Setting the algorithm is the last thing to do "
+                f"when assigning. Check if you have all of these: {all_par}"
+            )
+
+        self.traffic_classes = assig_spec.classes  # type: List[TrafficClass]
+        self.num_classes = len(assig_spec.classes)
+
+        self.cap_field = assig_spec.capacity_field
+        self.time_field = assig_spec.time_field
+        self.vdf = assig_spec.vdf
+        self.vdf_parameters = assig_spec.vdf_parameters
+
+        self.iter = 0
+        self.rgap = np.inf
+        self.steps_below_needed_to_terminate = assig_spec.steps_below_needed_to_terminate
+        self.steps_below = 0
+
+        self.capacity = assig_spec.capacity
+        self.free_flow_tt = assig_spec.free_flow_tt
+        self.fw_total_flow = assig_spec.total_flow
+        self.congested_time = assig_spec.congested_time
+        self.aon_total_flow = np.zeros_like(self.fw_total_flow)
+
+        self.bushes = {}
+        self._networks = {}
+        self._scratch = {}
+
+    def doWork(self):
+        self.execute()
+
+    def execute(self):
+        for c in self.traffic_classes:
+            if c.fixed_cost_field:
+                c.fixed_cost[c.graph.graph.__supernet_id__] = (
+                    c.graph.graph[c.fixed_cost_field].values[:] * c.fc_multiplier / c.vot
+                )
+                c.fixed_cost[np.isnan(c.fixed_cost)] = 0
+            c.graph.set_graph(self.time_field)
+            c.results.reset()
+
+        self.fw_total_flow.fill(0)
+        self.vdf.apply_vdf(
+            self.congested_time, self.fw_total_flow, self.capacity, self.free_flow_tt, *self.vdf_parameters, self.cores
+        )
+        for c in self.traffic_classes:
+            self._prepare_class(c)
+
+        logger.info(f"{self.algorithm} Assignment STATS")
+        logger.info("Iteration, RelativeGap")
+        for self.iter in range(1, self.max_iter + 1):
+            self.iteration_issue = []
+            if pyqt:
+                self.equilibration.emit(["rgap", self.rgap])
+                self.equilibration.emit(["iterations", self.iter])
+
+            for c in self.traffic_classes:
+                self._update_class(c)
+
+            converged = self.check_convergence()
+
+            self.convergence_report["iteration"].append(self.iter)
+            self.convergence_report["rgap"].append(self.rgap)
+            self.convergence_report["warnings"].append("; ".join(self.iteration_issue))
+            logger.info(f"{self.iter},{self.rgap}")
+
+            if converged:
+                self.steps_below += 1
+                if self.steps_below >= self.steps_below_needed_to_terminate:
+                    break
+            else:
+                self.steps_below = 0
+
+        for c in self.traffic_classes:
+            assign_link_loads(c.results.link_loads, c.results.compact_link_loads, c.results.crosswalk, self.cores)
+            c.results.total_flows()
+            if c.results.num_skims > 0:
+                copy_three_dimensions(c.results.skims.matrix_view, c._aon_results.skims.matrix_view, self.cores)
+
+        if self.rgap > self.rgap_target:
+            logger.error(f"Desired RGap of {self.rgap_target} was NOT reached")
+        logger.info(f"{self.algorithm} Assignment finished. {self.iter} iterations and {self.rgap} final gap")
+        if pyqt:
+            self.equilibration.emit(["rgap", self.rgap])
+            self.equilibration.emit(["iterations", self.iter])
+            self.equilibration.emit(["finished_threaded_procedure"])
+
+    def check_convergence(self):
+        """Calculate relative gap and return True if it is smaller than desired precision"""
+        aon_flows = []
+        for c in self.traffic_classes:
+            c._aon_results.reset()
+            cost = c.fixed_cost + self.congested_time
+            aggregate_link_costs(cost, c.graph.compact_cost, c.results.crosswalk)
+            aon = allOrNothing(c.matrix, c.graph, c._aon_results)
+            if pyqt:
+                aon.assignment.connect(self.signal_handler)
+            aon.execute()
+            c._aon_results.link_loads *= c.pce
+            c._aon_results.total_flows()
+            aon_flows.append(c._aon_results.total_link_loads)
+        self.aon_total_flow = np.sum(aon_flows, axis=0)
+
+        aon_cost = np.sum(self.congested_time * self.aon_total_flow)
+        current_cost = np.sum(self.congested_time * self.fw_total_flow)
+        self.rgap = abs(current_cost - aon_cost) / current_cost
+        return self.rgap_target >= self.rgap
+
+    def _prepare_class(self, c: TrafficClass):
+        graph = c.graph
+        num_links = graph.compact_num_links
+        nodes = graph.compact_num_nodes + 1
+
+        # Links of the network that make up each link of the compressed graph
+        crosswalk = c.results.crosswalk
+        in_compact = np.nonzero(crosswalk < num_links)[0]
+        members = in_compact[np.argsort(crosswalk[in_compact], kind="stable")].astype(np.int64)
+        member_fs = np.zeros(num_links + 1, np.int64)
+        member_fs[1:] = np.cumsum(np.bincount(crosswalk[in_compact], minlength=num_links))
+
+        vdf = 0 if self.vdf.function == "BPR" else 1
+        fixed_cost = np.array(c.fixed_cost, np.float64)
+        self._networks[c.__id__] = SimpleNamespace(
+            graph=graph,
+            zones=graph.num_zones,
+            block_flows_through_centroids=int(graph.block_centroid_flows),
+            graph_fs=np.array(graph.compact_fs, np.int64),
+            a_nodes=np.array(graph.compact_graph.a_node.values, np.int64),
+            b_nodes=np.array(graph.closed_b_nodes(c.results.closed_links), np.int64),
+            ids=np.arange(num_links, dtype=np.int64),
+            member_fs=member_fs,
+            members=members,
+            vdf=vdf,
+            pce=float(c.pce),
+            total_flow=self.fw_total_flow,
+            congested_time=self.congested_time,
+            fixed_cost=fixed_cost,
+            capacity=self.capacity,
+            fftime=self.free_flow_tt,
+            alpha=self.vdf_parameters[0],
+            beta=self.vdf_parameters[1],
+            link_costs=np.zeros(num_links, np.float64),
+            link_derivatives=np.zeros(num_links, np.float64),
+        )
+
+        self._scratch[c.__id__] = SimpleNamespace(
+            bush=np.zeros(num_links, np.int64),
+            in_bush=np.zeros(num_links, np.uint8),
+            flows=np.zeros(num_links, np.float64),
+            temp_b_nodes=np.zeros(num_links, np.int64),
+            order=np.zeros(nodes, np.int64),
+            position=np.zeros(nodes, np.int64),
+            indegree=np.zeros(nodes, np.int64),
+            min_cost=np.zeros(nodes, np.float64),
+            max_cost=np.zeros(nodes, np.float64),
+            pred_min=np.zeros(nodes, np.int64),
+            pred_max=np.zeros(nodes, np.int64),
+        )
+
+        # One bush for each origin with demand, for each user class in the matrix
+        self.bushes[c.__id__] = [{} for _ in range(c.results.classes["number"])]
+
+    def _update_class(self, c: TrafficClass):
+        network = self._networks[c.__id__]
+        scratch = self._scratch[c.__id__]
+        bush_link_costs(network)
+        matrix = c.matrix.matrix_view
+        if len(matrix.shape) == 2:
+            matrix = matrix.reshape(matrix.shape[0], matrix.shape[1], 1)
+
+        for m, bushes in enumerate(self.bushes[c.__id__]):
+            class_loads = c.results.compact_link_loads[:, m]
+            for origin in range(network.zones):
+                if self.iter == 1:
+                    demand = np.nan_to_num(np.array(matrix[origin, :, m], np.float64))
+                    if demand.sum() > 0:
+                        bushes[origin] = initialize_bush(origin, demand, network, scratch, class_loads)
+                elif origin in bushes:
+                    links, flows = bushes[origin]
+                    bushes[origin] = update_bush(
+                        origin, links, flows, network, scratch, class_loads, self.inner_iterations
+                    )
@@ -1,15 +1,14 @@
 import importlib.util as iutil
-import threading
-from multiprocessing.dummy import Pool as ThreadPool
 import numpy as np
 
 from .multi_threaded_aon import MultiThreadedAoN
+from .multi_process_aon import MultiProcessAoN
 from ..utils import WorkerThread
 from aequilibrae.matrix import AequilibraeMatrix
 from aequilibrae import logger
 
 try:
-    from aequilibrae.paths.AoN import one_to_all, assign_link_loads
+    from aequilibrae.paths.AoN import assign_origins, assign_link_loads, sum_axis0
 except ImportError as ie:
     logger.warning(f"Could not import procedures from the binary. {ie.args}")
 
@@ -38,6 +37,8 @@ class allOrNothing(WorkerThread):
         self.aux_res = MultiThreadedAoN()
         self.report = []
         self.cumulative = 0
+        # Number of calls to the binary in which origins are split, so progress can be reported in between
+        self.progress_steps = 20 if pyqt else 1
 
         if results.__graph_id__ != graph.__id__:
             raise ValueError("Results object not prepared. Use --> results.prepare(graph)")
@@ -58,40 +59,60 @@ class allOrNothing(WorkerThread):
         if pyqt:
             self.assignment.emit(["zones finalized", 0])
 
-        self.aux_res.prepare(self.graph, self.results)
         self.matrix.matrix_view = self.matrix.matrix_view.reshape(
             (self.graph.num_zones, self.graph.num_zones, self.results.classes["number"])
         )
         mat = self.matrix.matrix_view
-        pool = ThreadPool(self.results.cores)
-        all_threads = {"count": 0}
+        has_demand = np.nansum(mat, axis=(1, 2)) > 0
+        origins = []
         for orig in self.matrix.index:
             i = int(self.graph.nodes_to_indices[orig])
-            if np.nansum(mat[i, :, :]) > 0 or self.results.num_skims > 0:
+            if has_demand[i] or self.results.num_skims > 0:
                 if self.graph.fs[i] == self.graph.fs[i + 1]:
                     self.report.append("Centroid " + str(orig) + " is not connected")
                 else:
-                    pool.apply_async(self.func_assig_thread, args=(orig, all_threads))
-        pool.close()
-        pool.join()
-        # TODO: Multi-thread this sum
-        self.results.compact_link_loads = np.sum(self.aux_res.temp_link_loads, axis=2)
-        assign_link_loads(self.results.link_loads, self.results.compact_link_loads,
-                          self.results.crosswalk, self.results.cores)
-        if pyqt:
-            self.assignment.emit(["finished_threaded_procedure", None])
+                    origins.append(orig)
+
+        if self.results.processes > 1:
+            self.__execute_processes(origins)
+            return
 
-    def func_assig_thread(self, origin, all_threads):
-        thread_id = threading.get_ident()
-        th = all_threads.get(thread_id, all_threads["count"])
-        if th == all_threads["count"]:
-            all_threads[thread_id] = all_threads["count"]
-            all_threads["count"] += 1
-
-        x = one_to_all(origin, self.matrix, self.graph, self.results, self.aux_res, th)
-        self.cumulative += 1
-        if x != origin:
-            self.report.append(x)
+        self.aux_res.prepare(self.graph, self.results)
+        # The whole origin loop runs in the binary, without the GIL
+        steps = max(min(len(origins), self.progress_steps), 1)
+        for block in np.array_split(np.array(origins, np.int64), steps):
+            if block.shape[0]:
+                assign_origins(block, self.matrix, self.graph, self.results, self.aux_res, self.results.cores)
+                self.cumulative += block.shape[0]
+                if pyqt:
+                    self.assignment.emit(["zones finalized", self.cumulative])
+                    self.assignment.emit(["text AoN", f"{self.cumulative:,}/{self.matrix.zones:,}"])
+        loads = self.aux_res.temp_link_loads
+        if self.results.compact_link_loads.shape != loads.shape[1:]:
+            self.results.compact_link_loads = np.zeros(loads.shape[1:], loads.dtype)
+        sum_axis0(self.results.compact_link_loads, loads, self.results.cores)
+        self.__finalize()
+
+    def __execute_processes(self, origins):
+        processes = self.results.processes
+        threads = max(1, self.results.cores // processes)
+        # Arrays shared with the workers are kept with the results, so later iterations re-use them
+        aon = self.results.multi_process_aon
+        if aon is None or aon.processes != processes or aon.threads != threads:
+            if aon is not None:
+                aon.close()
+            aon = MultiProcessAoN(processes, threads)
+            self.results.multi_process_aon = aon
+        self.results.compact_link_loads = aon.execute(np.array(origins, np.int64), self.matrix, self.graph,
+                                                      self.results)
+        self.cumulative += len(origins)
         if pyqt:
             self.assignment.emit(["zones finalized", self.cumulative])
             self.assignment.emit(["text AoN", f"{self.cumulative:,}/{self.matrix.zones:,}"])
+        self.__finalize()
+
+    def __finalize(self):
+        assign_link_loads(self.results.link_loads, self.results.compact_link_loads,
+                          self.results.crosswalk, self.results.cores)
+        if pyqt:
+            self.assignment.emit(["finished_threaded_procedure", None])
@@ -35,16 +35,12 @@ cpdef void network_loading(long classes,
                            double[:, :] demand,
                            long long [:] pred,
                            long long [:] conn,
-                           double[:, :] link_loads,
+                           cython.floating[:, ::1] link_loads,
                            long long [:] no_path,
                            long long [:] reached_first,
-                           double [:, :] node_load,
+                           cython.floating [:, ::1] node_load,
                            long found) nogil:
 
-    cdef long long i, j, predecessor, connector, node
-    cdef long long zones = demand.shape[0]
-    cdef long long N = node_load.shape[0]
-
 # Traditional loading, without cascading
 #    for i in range(zones):
 #        node = i
@@ -57,17 +53,69 @@ cpdef void network_loading(long classes,
 #            predecessor = pred[predecessor]
 #            connector = conn[predecessor]
 
-    # Clean the node load array
-    for i in range(N):
-        node_load[i] = 0
+    cdef long long *active = <long long*> malloc(classes * sizeof(long long))
+    cdef long long num_active = classes_with_demand(demand, active)
+
+    if num_active > 0:
+        seed_node_loads(demand, reached_first, node_load, active, num_active, found)
+        cascade_loads(pred, conn, reached_first, node_load, link_loads, active, num_active, found, 1)
+    free(active)
+
+@cython.wraparound(False)
+@cython.boundscheck(False)
+cdef long long classes_with_demand(double[:, :] demand,
+                                   long long *active) nogil:
+    # Lists the classes with any demand from this origin in active and returns how many they are
+    cdef long long i, j
+    cdef long long count = 0
+
+    for j in range(demand.shape[1]):
+        for i in range(demand.shape[0]):
+            if demand[i, j] != 0 and not isnan(demand[i, j]):
+                active[count] = j
+                count += 1
+                break
+    return count
+
+@cython.wraparound(False)
+@cython.boundscheck(False)
+cdef void seed_node_loads(double[:, :] demand,
+                          long long [:] reached_first,
+                          cython.floating [:, ::1] node_load,
+                          long long *active,
+                          long long num_active,
+                          long found) nogil:
+    # The cascade only reads the loads of nodes in this origin's tree, so only those are cleaned, instead of the
+    # loads of all nodes in the graph. Centroids are then loaded with the demand of the active classes
+    cdef long long i, j, k, node
+    cdef long long classes = node_load.shape[1]
+
+    for i in range(found + 1):
+        node = reached_first[i]
+        for j in range(classes):
+            node_load[node, j] = 0
 
-    # Loads the demand to the centroids
-    for j in range(classes):
-        for i in range(zones):
-            if not isnan(demand[i, j]):
-                node_load[i, j] = demand[i, j]
+    for i in range(demand.shape[0]):
+        for k in range(num_active):
+            j = active[k]
+            node_load[i, j] = 0 if isnan(demand[i, j]) else demand[i, j]
+
+@cython.wraparound(False)
+@cython.boundscheck(False)
+cdef void cascade_loads(long long [:] pred,
+                        long long [:] conn,
+                        long long [:] reached_first,
+                        cython.floating [:, ::1] node_load,
+                        cython.floating [:, ::1] link_loads,
+                        long long *active,
+                        long long num_active,
+                        long found,
+                        int load_links) nogil:
+    # Recursively cascades the loads of the active classes to the origin, loading links along the way if requested.
+    # Loads of all classes of a node are contiguous, so the loop over classes is vectorized when all are active
+    cdef long long i, j, k, predecessor, connector, node
+    cdef long long classes = node_load.shape[1]
 
-    #Recursively cascades to the origin
     for i in range(found, 0, -1):
         node = reached_first[i]
 
@@ -75,26 +123,43 @@ cpdef void network_loading(long classes,
         predecessor = pred[node]
         connector = conn[node]
 
-        # loads the flow to the links for each class
-        for j in range(classes):
-            link_loads[connector, j] += node_load[node, j]
-            # Cascades the load from the node to their predecessor
-            node_load[predecessor, j] += node_load[node, j]
+        if num_active == classes:
+            if load_links:
+                for j in range(classes):
+                    link_loads[connector, j] += node_load[node, j]
+            for j in range(classes):
+                node_load[predecessor, j] += node_load[node, j]
+        else:
+            for k in range(num_active):
+                j = active[k]
+                if load_links:
+                    link_loads[connector, j] += node_load[node, j]
+                node_load[predecessor, j] += node_load[node, j]
 
 @cython.wraparound(False)
-@cython.embedsignature(True)
 @cython.boundscheck(False)
-cdef void _copy_skims(double[:,:] skim_matrix,  #Skim matrix_procedures computed from one origin to all nodes
-                      double[:,:] final_skim_matrix) nogil:  #Skim matrix_procedures computed for one origin to all other centroids only
-
-    cdef long i, j
-    cdef long N = final_skim_matrix.shape[0]
-    cdef long skims = final_skim_matrix.shape[1]
-
-    for i in range(N):
-        for j in range(skims):
-            final_skim_matrix[i,j]=skim_matrix[i,j]
+cdef void add_link_loads(long long [:] conn,
+                         long long [:] reached_first,
+                         cython.floating [:, ::1] node_load,
+                         cython.floating [:, ::1] link_loads,
+                         long long *active,
+                         long long num_active,
+                         long found) nogil:
+    # After cascade_loads without loading links, the load of each node is the load of the link used to reach it, so
+    # links can be loaded later from a buffer shared with other threads
+    cdef long long i, j, k, node, connector
+    cdef long long classes = node_load.shape[1]
 
+    for i in range(found, 0, -1):
+        node = reached_first[i]
+        connector = conn[node]
+        if num_active == classes:
+            for j in range(classes):
+                link_loads[connector, j] += node_load[node, j]
+        else:
+            for k in range(num_active):
+                j = active[k]
+                link_loads[connector, j] += node_load[node, j]
 
 cdef return_an_int_view(input):
     cdef int [:] critical_links_view = input
@@ -167,11 +232,12 @@ cdef void blocking_centroid_flows(int action,
                                   long long [:] real_b_nodes) nogil:
     cdef long long i
 
+    # Links leaving centroids are the first fs[centroids] ones in the graph
     if action == 1: # We are unblocking
-        for i in range(fs[centroids + 1]):
+        for i in range(fs[centroids]):
             temp_b_nodes[i] = real_b_nodes[i]
     else: # We are blocking:
-        for i in range(fs[centroids + 1]):
+        for i in range(fs[centroids]):
             temp_b_nodes[i] = orig
 
         for i in range(fs[orig], fs[orig + 1]):
@@ -187,7 +253,7 @@ cdef void skim_single_path(long origin,
                            double[:, :] node_skims,
                            long long [:] pred,
                            long long [:] conn,
-                           double[:, :] graph_costs,
+                           cython.floating[:, :] graph_costs,
                            long long [:] reached_first,
                            long found) nogil:
     cdef long long i, node, predecessor, connector, j
@@ -217,41 +283,107 @@ cdef void skim_single_path(long origin,
 @cython.embedsignature(True)
 @cython.boundscheck(False) # turn of bounds-checking for entire function
 cpdef void skim_multiple_fields(long origin,
-                                long nodes,
                                 long zones,
                                 long skims,
-                                double[:, :] node_skims,
                                 long long [:] pred,
                                 long long [:] conn,
-                                double[:, :] graph_costs,
+                                cython.floating[:, :] graph_costs,
                                 long long [:] reached_first,
                                 long found,
+                                long long [:] slots,
                                 double [:,:] final_skims) nogil:
-    cdef long long i, node, predecessor, connector, j
+    # Skims from one origin straight into final_skims, which has one row per centroid. Only nodes in paths to
+    # centroids are cascaded, and those that are not centroids keep their skims in a buffer sized for them alone,
+    # where slots holds the position of each node
+    cdef long long i, node, predecessor, connector, j, row, previous
+    cdef long long needed = 0
+    cdef double *buffer
 
-    # sets all skims to infinity
-    for i in range(nodes):
+    for i in range(zones):
         for j in range(skims):
-            node_skims[i, j] = INFINITE
+            final_skims[i, j] = INFINITE
 
     # Zeroes the intrazonal cost
     for j in range(skims):
-            node_skims[origin, j] = 0
+            final_skims[origin, j] = 0
+
+    # Flags the nodes in paths to centroids, walking the tree from its leaves. Only nodes in the tree are read
+    for i in range(found + 1):
+        slots[reached_first[i]] = -1
+    for i in range(found, 0, -1):
+        node = reached_first[i]
+        if node < zones or slots[node] == -2:
+            predecessor = pred[node]
+            if predecessor >= zones and slots[predecessor] == -1:
+                slots[predecessor] = -2
+                needed += 1
+
+    buffer = <double*> malloc((needed + 1) * skims * sizeof(double))
 
     # Cascade skimming
+    needed = 0
     for i in range(1, found + 1):
         node = reached_first[i]
+        if node >= zones and slots[node] != -2:
+            continue
 
         # captures how we got to that node
         predecessor = pred[node]
         connector = conn[node]
 
-        for j in range(skims):
-            node_skims[node, j] = node_skims[predecessor, j] + graph_costs[connector, j]
+        if node >= zones:
+            slots[node] = needed
+            row = needed * skims
+            needed += 1
+            if predecessor < zones:
+                for j in range(skims):
+                    buffer[row + j] = final_skims[predecessor, j] + graph_costs[connector, j]
+            else:
+                previous = slots[predecessor] * skims
+                for j in range(skims):
+                    buffer[row + j] = buffer[previous + j] + graph_costs[connector, j]
+        elif predecessor < zones:
+            for j in range(skims):
+                final_skims[node, j] = final_skims[predecessor, j] + graph_costs[connector, j]
+        else:
+            previous = slots[predecessor] * skims
+            for j in range(skims):
+                final_skims[node, j] = buffer[previous + j] + graph_costs[connector, j]
+    free(buffer)
+
+
+@cython.wraparound(False)
+@cython.embedsignature(True)
+@cython.boundscheck(False)
+cdef long long destinations_from_demand(double[:, :] demand,
+                                        long long [:] destinations) nogil:
+    # Flags all zones with positive demand in at least one class and returns how many they are
+    cdef long long i, j
+    cdef long long zones = demand.shape[0]
+    cdef long long classes = demand.shape[1]
+    cdef long long count = 0
 
     for i in range(zones):
-        for j in range(skims):
-            final_skims[i, j] = node_skims[i, j]
+        destinations[i] = 0
+        for j in range(classes):
+            if demand[i, j] > 0:
+                destinations[i] = 1
+                count += 1
+                break
+    return count
+
+
+@cython.wraparound(False)
+@cython.embedsignature(True)
+@cython.boundscheck(False)
+cdef long long all_destinations(long long zones,
+                                long long [:] destinations) nogil:
+    # Flags all zones
+    cdef long long i
+
+    for i in range(zones):
+        destinations[i] = 1
+    return zones
 
 
 # ###########################################################################################################################
@@ -267,19 +399,25 @@ cpdef void skim_multiple_fields(long origin,
 @cython.embedsignature(True)
 @cython.boundscheck(False) # turn of bounds-checking for entire function
 cpdef int path_finding(long origin,
-                       double[:] graph_costs,
+                       cython.floating[:] graph_costs,
                        long long [:] csr_indices,
                        long long [:] graph_fs,
                        long long [:] pred,
                        long long [:] ids,
                        long long [:] connectors,
-                       long long [:] reached_first) nogil:
+                       long long [:] reached_first,
+                       long long [:] destinations,
+                       long long num_destinations,
+                       double cutoff=INFINITE) nogil:
 
     cdef unsigned int N = graph_costs.shape[0]
     cdef unsigned int M = pred.shape[0]
+    cdef long long D = destinations.shape[0]
 
     cdef long i, k, j_source, j_current
     cdef ITYPE_t found = 0
+    # Search stops once all flagged destinations are scanned. Zero means we search the entire graph
+    cdef long long remaining = num_destinations
     cdef long j
     cdef DTYPE_t weight
 
@@ -302,10 +440,19 @@ cpdef int path_finding(long origin,
 
     while heap.min_node:
         v = remove_min(&heap)
+        # Nodes are scanned in order of cost, so all others are beyond the cutoff as well
+        if v.val > cutoff:
+            break
         reached_first[found] = v.index
         found += 1
         v.state = 1
 
+        if remaining > 0 and v.index < D:
+            if destinations[v.index] > 0:
+                remaining -= 1
+                if remaining == 0:
+                    break
+
         for j in range(graph_fs[v.index],graph_fs[v.index + 1]):
             j_current = csr_indices[j]
             current_node = &nodes[j_current]
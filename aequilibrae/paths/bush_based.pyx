@@ -0,0 +1,552 @@
+"""
+ -----------------------------------------------------------------------------------------------------------
+ Package:    AequilibraE
+ Name:       Bush-based traffic assignment
+ Purpose:    Implements the bush operations of Algorithm B (Dial, 2006)
+ Original Author:  Pedro Camargo (c@margo.co)
+ Contributors:
+ Last edited by: Pedro Camrgo
+ Website:    www.AequilibraE.com
+ Repository:  https://github.com/AequilibraE/AequilibraE
+ Created:    18/10/2026
+ Updated:
+ Copyright:   (c) AequilibraE authors
+ Licence:     See LICENSE.TXT
+ -----------------------------------------------------------------------------------------------------------
+
+A bush is the acyclic sub-network used by the flows leaving one origin. Bushes are kept as the list of links of the
+compressed graph they contain and the flow of the origin on each one of them. Between calls, they are scattered into
+dense (per link) scratch arrays, updated and gathered back.
+
+Every time flow is shifted, the total flow, congested time and derivative of all network links that make up the
+compressed links involved are updated, so the next shift (for this or any other origin) sees the new costs.
+"""
+cdef double FLOW_EPSILON = 1e-10
+
+
+@cython.wraparound(False)
+@cython.boundscheck(False)
+cdef void shift_flow(long long link,
+                     double delta,
+                     int vdf,
+                     double pce,
+                     long long [:] member_fs,
+                     long long [:] members,
+                     double [:] total_flow,
+                     double [:] congested_time,
+                     double [:] fixed_cost,
+                     double [:] capacity,
+                     double [:] fftime,
+                     double [:] alpha,
+                     double [:] beta,
+                     double [:] link_costs,
+                     double [:] link_derivatives,
+                     double [:] class_loads) nogil:
+    # Adds delta to the class flow on one link of the compressed graph and updates its cost and derivative
+    cdef long long k, s
+    cdef double time, der
+    cdef double cost = 0
+    cdef double derivative = 0
+
+    class_loads[link] += delta
+    for k in range(member_fs[link], member_fs[link + 1]):
+        s = members[k]
+        total_flow[s] += pce * delta
+        link_vdf(vdf, total_flow[s], capacity[s], fftime[s], alpha[s], beta[s], &time, &der)
+        congested_time[s] = time
+        cost += fixed_cost[s] + time
+        derivative += pce * der
+    link_costs[link] = cost
+    link_derivatives[link] = derivative
+
+
+@cython.wraparound(False)
+@cython.boundscheck(False)
+cdef void compute_link_costs(int vdf,
+                             double pce,
+                             long long [:] member_fs,
+                             long long [:] members,
+                             double [:] total_flow,
+                             double [:] fixed_cost,
+                             double [:] capacity,
+                             double [:] fftime,
+                             double [:] alpha,
+                             double [:] beta,
+                             double [:] link_costs,
+                             double [:] link_derivatives) nogil:
+    # Costs and derivatives of all links of the compressed graph with the current total flows
+    cdef long long link, k, s
+    cdef double time, der
+
+    for link in range(link_costs.shape[0]):
+        link_costs[link] = 0
+        link_derivatives[link] = 0
+        for k in range(member_fs[link], member_fs[link + 1]):
+            s = members[k]
+            link_vdf(vdf, total_flow[s], capacity[s], fftime[s], alpha[s], beta[s], &time, &der)
+            link_costs[link] += fixed_cost[s] + time
+            link_derivatives[link] += pce * der
+
+
+@cython.wraparound(False)
+@cython.boundscheck(False)
+cdef inline bint usable_link(long long link,
+                             long long origin,
+                             long long zones,
+                             int block_flows_through_centroids,
+                             long long [:] a_nodes,
+                             long long [:] b_nodes) nogil:
+    # Closed links and links leaving centroids other than the origin (if they are blocked) cannot be used
+    if b_nodes[link] == a_nodes[link]:
+        return False
+    if block_flows_through_centroids and a_nodes[link] < zones and a_nodes[link] != origin:
+        return False
+    return True
+
+
+@cython.wraparound(False)
+@cython.boundscheck(False)
+cdef long long topological_order(long long origin,
+                                 long long [:] bush,
+                                 long long num_links,
+                                 long long [:] graph_fs,
+                                 long long [:] b_nodes,
+                                 unsigned char [:] in_bush,
+                                 long long [:] indegree,
+                                 long long [:] order,
+                                 long long [:] position) nogil:
+    # Orders the nodes reached by the bush so all its links go from earlier to later nodes. Returns how many they are
+    cdef long long i, j, node, head, tail
+    cdef long long nodes = order.shape[0]
+
+    for i in range(nodes):
+        indegree[i] = 0
+        position[i] = -1
+    for i in range(num_links):
+        indegree[b_nodes[bush[i]]] += 1
+
+    order[0] = origin
+    head = 0
+    tail = 1
+    while head < tail:
+        node = order[head]
+        position[node] = head
+        head += 1
+        for j in range(graph_fs[node], graph_fs[node + 1]):
+            if in_bush[j]:
+                indegree[b_nodes[j]] -= 1
+                if indegree[b_nodes[j]] == 0:
+                    order[tail] = b_nodes[j]
+                    tail += 1
+    return tail
+
+
+@cython.wraparound(False)
+@cython.boundscheck(False)
+cdef void bush_labels(long long reached,
+                      long long [:] order,
+                      long long [:] graph_fs,
+                      long long [:] b_nodes,
+                      unsigned char [:] in_bush,
+                      double [:] flows,
+                      double [:] link_costs,
+                      int used_only,
+                      double [:] min_cost,
+                      double [:] max_cost,
+                      long long [:] pred_min,
+                      long long [:] pred_max) nogil:
+    # Costs of the shortest and longest paths from the origin to all nodes within the bush, and the last link of
+    # each. If used_only, longest paths only go through links with flow
+    cdef long long i, j, node, b
+    cdef double cost
+
+    for i in range(reached):
+        node = order[i]
+        min_cost[node] = INFINITE
+        max_cost[node] = -INFINITE
+        pred_min[node] = -1
+        pred_max[node] = -1
+    min_cost[order[0]] = 0
+    max_cost[order[0]] = 0
+
+    for i in range(reached):
+        node = order[i]
+        for j in range(graph_fs[node], graph_fs[node + 1]):
+            if not in_bush[j]:
+                continue
+            b = b_nodes[j]
+            cost = min_cost[node] + link_costs[j]
+            if cost < min_cost[b]:
+                min_cost[b] = cost
+                pred_min[b] = j
+            if used_only and flows[j] <= FLOW_EPSILON:
+                continue
+            if max_cost[node] > -INFINITE:
+                cost = max_cost[node] + link_costs[j]
+                if cost > max_cost[b]:
+                    max_cost[b] = cost
+                    pred_max[b] = j
+
+
+@cython.wraparound(False)
+@cython.boundscheck(False)
+cdef long long improve_bush(long long origin,
+                            long long zones,
+                            int block_flows_through_centroids,
+                            long long reached,
+                            long long [:] order,
+                            long long [:] position,
+                            long long [:] bush,
+                            long long num_links,
+                            long long [:] graph_fs,
+                            long long [:] a_nodes,
+                            long long [:] b_nodes,
+                            unsigned char [:] in_bush,
+                            double [:] flows,
+                            double [:] link_costs,
+                            double [:] min_cost,
+                            double [:] max_cost,
+                            long long [:] pred_min,
+                            long long [:] pred_max) nogil:
+    # Drops links without flow that are not in the shortest paths within the bush and adds all links that are
+    # shortcuts to it. Links are only added from nodes closer to nodes farther from the origin in the longest paths
+    # within the bush, so it remains acyclic. If no such link exists, the topological order is used instead.
+    # Returns the new number of links in the bush
+    cdef long long i, j
+    cdef long long kept = 0
+
+    bush_labels(reached, order, graph_fs, b_nodes, in_bush, flows, link_costs, 0, min_cost, max_cost, pred_min,
+                pred_max)
+
+    for i in range(num_links):
+        j = bush[i]
+        if flows[j] <= FLOW_EPSILON and pred_min[b_nodes[j]] != j:
+            in_bush[j] = 0
+            flows[j] = 0
+        else:
+            bush[kept] = j
+            kept += 1
+
+    # Removed links were not in the shortest paths, so only the longest ones change
+    bush_labels(reached, order, graph_fs, b_nodes, in_bush, flows, link_costs, 0, min_cost, max_cost, pred_min,
+                pred_max)
+
+    num_links = kept
+    kept = add_shortcuts(origin, zones, block_flows_through_centroids, bush, kept, a_nodes, b_nodes, in_bush,
+                         link_costs, min_cost, max_cost, position, 0)
+    if kept == num_links:
+        kept = add_shortcuts(origin, zones, block_flows_through_centroids, bush, kept, a_nodes, b_nodes, in_bush,
+                             link_costs, min_cost, max_cost, position, 1)
+    return kept
+
+
+@cython.wraparound(False)
+@cython.boundscheck(False)
+cdef long long add_shortcuts(long long origin,
+                             long long zones,
+                             int block_flows_through_centroids,
+                             long long [:] bush,
+                             long long num_links,
+                             long long [:] a_nodes,
+                             long long [:] b_nodes,
+                             unsigned char [:] in_bush,
+                             double [:] link_costs,
+                             double [:] min_cost,
+                             double [:] max_cost,
+                             long long [:] position,
+                             int use_order) nogil:
+    # Adds all links between nodes reached by the bush that shorten the paths within it and go from nodes closer to
+    # nodes farther from the origin, either in the longest paths or in the topological order
+    cdef long long j, a, b
+    cdef long long kept = num_links
+
+    for j in range(a_nodes.shape[0]):
+        if in_bush[j] or not usable_link(j, origin, zones, block_flows_through_centroids, a_nodes, b_nodes):
+            continue
+        a = a_nodes[j]
+        b = b_nodes[j]
+        if position[a] < 0 or position[b] < 0:
+            continue
+        if min_cost[a] + link_costs[j] >= min_cost[b]:
+            continue
+        if (use_order and position[a] < position[b]) or (not use_order and max_cost[a] < max_cost[b]):
+            in_bush[j] = 1
+            bush[kept] = j
+            kept += 1
+    return kept
+
+
+@cython.wraparound(False)
+@cython.boundscheck(False)
+cdef void equilibrate_bush(long long reached,
+                           long long [:] order,
+                           long long [:] position,
+                           long long [:] graph_fs,
+                           long long [:] a_nodes,
+                           long long [:] b_nodes,
+                           unsigned char [:] in_bush,
+                           double [:] flows,
+                           double [:] min_cost,
+                           double [:] max_cost,
+                           long long [:] pred_min,
+                           long long [:] pred_max,
+                           int vdf,
+                           double pce,
+                           long long [:] member_fs,
+                           long long [:] members,
+                           double [:] total_flow,
+                           double [:] congested_time,
+                           double [:] fixed_cost,
+                           double [:] capacity,
+                           double [:] fftime,
+                           double [:] alpha,
+                           double [:] beta,
+                           double [:] link_costs,
+                           double [:] link_derivatives,
+                           double [:] class_loads) nogil:
+    # Shifts flow from the longest used path to the shortest path to each node, from the nodes farthest from the
+    # origin to the closest. Paths are only followed until they meet, and the shift is a Newton step on the
+    # difference of their costs, limited to the smallest flow on the longest path
+    cdef long long i, node, a, b, j
+    cdef double min_segment, max_segment, derivative, delta, max_flow
+
+    bush_labels(reached, order, graph_fs, b_nodes, in_bush, flows, link_costs, 1, min_cost, max_cost, pred_min,
+                pred_max)
+
+    for i in range(reached - 1, 0, -1):
+        node = order[i]
+        if pred_max[node] < 0 or pred_max[node] == pred_min[node]:
+            continue
+
+        # Finds where the two paths diverge
+        a = a_nodes[pred_min[node]]
+        b = a_nodes[pred_max[node]]
+        while a != b:
+            if position[a] > position[b]:
+                a = a_nodes[pred_min[a]]
+            else:
+                b = a_nodes[pred_max[b]]
+
+        min_segment = 0
+        max_segment = 0
+        derivative = 0
+        max_flow = INFINITE
+        a = node
+        while a != b:
+            j = pred_min[a]
+            min_segment += link_costs[j]
+            derivative += link_derivatives[j]
+            a = a_nodes[j]
+        a = node
+        while a != b:
+            j = pred_max[a]
+            max_segment += link_costs[j]
+            derivative += link_derivatives[j]
+            if flows[j] < max_flow:
+                max_flow = flows[j]
+            a = a_nodes[j]
+
+        if max_segment <= min_segment or max_flow <= 0:
+            continue
+        delta = max_flow
+        if derivative > 0 and (max_segment - min_segment) / derivative < max_flow:
+            delta = (max_segment - min_segment) / derivative
+
+        a = node
+        while a != b:
+            j = pred_max[a]
+            flows[j] -= delta
+            shift_flow(j, -delta, vdf, pce, member_fs, members, total_flow, congested_time, fixed_cost, capacity,
+                       fftime, alpha, beta, link_costs, link_derivatives, class_loads)
+            a = a_nodes[j]
+        a = node
+        while a != b:
+            j = pred_min[a]
+            flows[j] += delta
+            shift_flow(j, delta, vdf, pce, member_fs, members, total_flow, congested_time, fixed_cost, capacity,
+                       fftime, alpha, beta, link_costs, link_derivatives, class_loads)
+            a = a_nodes[j]
+
+
+def bush_link_costs(network):
+    """
+    Updates the costs and derivatives of the links of the compressed graph used by the bushes of one traffic class
+
+    Flows of other traffic classes change the costs of the links, so costs need to be updated every time the bushes
+    of a different class are updated
+
+    :param network: Network arrays, as prepared by AlgorithmB
+    """
+    cdef long long [:] member_fs = network.member_fs
+    cdef long long [:] members = network.members
+    cdef double [:] total_flow = network.total_flow
+    cdef double [:] fixed_cost = network.fixed_cost
+    cdef double [:] capacity = network.capacity
+    cdef double [:] fftime = network.fftime
+    cdef double [:] alpha = network.alpha
+    cdef double [:] beta = network.beta
+    cdef double [:] link_costs = network.link_costs
+    cdef double [:] link_derivatives = network.link_derivatives
+    cdef int vdf = network.vdf
+    cdef double pce = network.pce
+
+    with nogil:
+        compute_link_costs(vdf, pce, member_fs, members, total_flow, fixed_cost, capacity, fftime, alpha, beta,
+                           link_costs, link_derivatives)
+
+
+@cython.wraparound(False)
+@cython.boundscheck(False)
+def initialize_bush(origin, demand, network, scratch, class_loads):
+    """
+    Loads the demand of one origin on its shortest path tree, which becomes its initial bush
+
+    :param origin: Index of the origin in the compressed graph
+    :param demand: Demand from the origin to each zone
+    :param network: Network arrays, as prepared by AlgorithmB
+    :param scratch: Scratch arrays, as prepared by AlgorithmB
+    :param class_loads: Loads of the user class on the compressed graph
+    :return: Links in the bush and the flow on them
+    """
+    cdef long long i, node, j, found
+    cdef long long orig = origin
+    cdef int heap = heap_code(network.graph)
+    cdef double [:] demand_view = demand
+    cdef long long [:] temp_b_nodes = scratch.temp_b_nodes
+    cdef long long [:] pred = scratch.pred_min
+    cdef long long [:] connectors = scratch.pred_max
+    cdef long long [:] reached_first = scratch.order
+    cdef double [:] node_flows = scratch.min_cost
+    cdef long long [:] no_destinations = scratch.position
+    cdef long long [:] ids = network.ids
+    cdef long long [:] graph_fs = network.graph_fs
+    cdef long long [:] a_nodes = network.a_nodes
+    cdef long long [:] b_nodes = network.b_nodes
+    cdef long long [:] member_fs = network.member_fs
+    cdef long long [:] members = network.members
+    cdef double [:] total_flow = network.total_flow
+    cdef double [:] congested_time = network.congested_time
+    cdef double [:] fixed_cost = network.fixed_cost
+    cdef double [:] capacity = network.capacity
+    cdef double [:] fftime = network.fftime
+    cdef double [:] alpha = network.alpha
+    cdef double [:] beta = network.beta
+    cdef double [:] link_costs = network.link_costs
+    cdef double [:] link_derivatives = network.link_derivatives
+    cdef double [:] loads = class_loads
+    cdef int vdf = network.vdf
+    cdef double pce = network.pce
+    cdef long long zones = network.zones
+    cdef int block_flows_through_centroids = network.block_flows_through_centroids
+
+    with nogil:
+        # Shortest paths cannot go through links that cannot be part of the bush
+        for j in range(a_nodes.shape[0]):
+            temp_b_nodes[j] = b_nodes[j]
+            if not usable_link(j, orig, zones, block_flows_through_centroids, a_nodes, b_nodes):
+                temp_b_nodes[j] = a_nodes[j]
+
+        found = compute_path_tree[double](heap, orig, link_costs, temp_b_nodes, graph_fs, pred, ids, connectors,
+                                          reached_first, no_destinations, 0)
+        for i in range(found + 1):
+            node_flows[reached_first[i]] = 0
+        for i in range(zones):
+            if demand_view[i] > 0 and pred[i] >= 0:
+                node_flows[i] = demand_view[i]
+
+    links = np.zeros(found, dtype=np.int64)
+    flows = np.zeros(found, dtype=np.float64)
+    cdef long long [:] links_view = links
+    cdef double [:] flows_view = flows
+
+    with nogil:
+        # Demand cascades from the farthest nodes towards the origin
+        for i in range(found, 0, -1):
+            node = reached_first[i]
+            j = connectors[node]
+            links_view[i - 1] = j
+            flows_view[i - 1] = node_flows[node]
+            node_flows[pred[node]] += node_flows[node]
+            if node_flows[node] > 0:
+                shift_flow(j, node_flows[node], vdf, pce, member_fs, members, total_flow, congested_time, fixed_cost,
+                           capacity, fftime, alpha, beta, link_costs, link_derivatives, loads)
+    return links, flows
+
+
+@cython.wraparound(False)
+@cython.boundscheck(False)
+def update_bush(origin, links, flows, network, scratch, class_loads, int inner_iterations):
+    """
+    Improves the bush of one origin with the current costs and equilibrates the flows within it
+
+    :param origin: Index of the origin in the compressed graph
+    :param links: Links in the bush
+    :param flows: Flow of the origin on each link in the bush
+    :param network: Network arrays, as prepared by AlgorithmB
+    :param scratch: Scratch arrays, as prepared by AlgorithmB
+    :param class_loads: Loads of the user class on the compressed graph
+    :param inner_iterations: Number of times flows are shifted within the bush
+    :return: Links in the new bush and the flow on them
+    """
+    cdef long long i, reached, num_links
+    cdef long long orig = origin
+    cdef long long [:] links_view = links
+    cdef double [:] flows_view = flows
+    cdef long long [:] bush = scratch.bush
+    cdef unsigned char [:] in_bush = scratch.in_bush
+    cdef double [:] dense_flows = scratch.flows
+    cdef long long [:] order = scratch.order
+    cdef long long [:] position = scratch.position
+    cdef long long [:] indegree = scratch.indegree
+    cdef double [:] min_cost = scratch.min_cost
+    cdef double [:] max_cost = scratch.max_cost
+    cdef long long [:] pred_min = scratch.pred_min
+    cdef long long [:] pred_max = scratch.pred_max
+    cdef long long [:] graph_fs = network.graph_fs
+    cdef long long [:] a_nodes = network.a_nodes
+    cdef long long [:] b_nodes = network.b_nodes
+    cdef long long [:] member_fs = network.member_fs
+    cdef long long [:] members = network.members
+    cdef double [:] total_flow = network.total_flow
+    cdef double [:] congested_time = network.congested_time
+    cdef double [:] fixed_cost = network.fixed_cost
+    cdef double [:] capacity = network.capacity
+    cdef double [:] fftime = network.fftime
+    cdef double [:] alpha = network.alpha
+    cdef double [:] beta = network.beta
+    cdef double [:] link_costs = network.link_costs
+    cdef double [:] link_derivatives = network.link_derivatives
+    cdef double [:] loads = class_loads
+    cdef int vdf = network.vdf
+    cdef double pce = network.pce
+    cdef long long zones = network.zones
+    cdef int block_flows_through_centroids = network.block_flows_through_centroids
+
+    with nogil:
+        num_links = links_view.shape[0]
+        for i in range(num_links):
+            bush[i] = links_view[i]
+            in_bush[links_view[i]] = 1
+            dense_flows[links_view[i]] = flows_view[i]
+
+        reached = topological_order(orig, bush, num_links, graph_fs, b_nodes, in_bush, indegree, order, position)
+        num_links = improve_bush(orig, zones, block_flows_through_centroids, reached, order, position, bush,
+                                 num_links, graph_fs, a_nodes, b_nodes, in_bush, dense_flows, link_costs, min_cost,
+                                 max_cost, pred_min, pred_max)
+        reached = topological_order(orig, bush, num_links, graph_fs, b_nodes, in_bush, indegree, order, position)
+
+        for i in range(inner_iterations):
+            equilibrate_bush(reached, order, position, graph_fs, a_nodes, b_nodes, in_bush, dense_flows, min_cost,
+                             max_cost, pred_min, pred_max, vdf, pce, member_fs, members, total_flow, congested_time,
+                             fixed_cost, capacity, fftime, alpha, beta, link_costs, link_derivatives, loads)
+
+    new_links = np.array(scratch.bush[:num_links], copy=True)
+    new_flows = np.array(scratch.flows[new_links], copy=True)
+    cdef long long [:] new_links_view = new_links
+
+    # Scratch arrays go back to their clean state
+    with nogil:
+        for i in range(num_links):
+            in_bush[new_links_view[i]] = 0
+            dense_flows[new_links_view[i]] = 0
+    return new_links, new_flows
@@ -0,0 +1,270 @@
+# cython: language_level=3
+"""
+Customizable contraction hierarchies (CCH)
+
+The hierarchy is a chordal supergraph of the compact graph, built for a node order that does not depend on link
+costs. Each edge of that supergraph links a lower ranked node to a higher ranked one and carries two metrics, one for
+each direction of travel. Customization (re-)computes these metrics for a given cost field, and queries only need to
+walk up the elimination tree of each origin and destination.
+"""
+from libc.stdlib cimport calloc
+from cython.parallel import prange, parallel
+
+
+@cython.wraparound(False)
+@cython.boundscheck(False)
+cdef inline long long cch_edge(long long low,
+                               long long high,
+                               long long [:] rank,
+                               long long [:] up_fs,
+                               long long [:] up_heads) nogil:
+    # Binary search for the edge between two nodes in the upward adjacency (sorted by rank) of the lowest ranked one
+    cdef long long first = up_fs[low]
+    cdef long long last = up_fs[low + 1] - 1
+    cdef long long middle, target = rank[high]
+
+    while first <= last:
+        middle = (first + last) // 2
+        if rank[up_heads[middle]] < target:
+            first = middle + 1
+        elif rank[up_heads[middle]] > target:
+            last = middle - 1
+        else:
+            return middle
+    return -1
+
+
+@cython.wraparound(False)
+@cython.embedsignature(True)
+@cython.boundscheck(False)
+cpdef void cch_customize(long long [:] a_nodes,
+                         long long [:] b_nodes,
+                         double [:] link_costs,
+                         double [:, :] link_skims,
+                         long long [:] rank,
+                         long long [:] order,
+                         long long [:] up_fs,
+                         long long [:] up_heads,
+                         double [:] up_costs,
+                         double [:] down_costs,
+                         double [:, :] up_skims,
+                         double [:, :] down_skims,
+                         long long zones,
+                         int block_flows_through_centroids) nogil:
+
+    cdef long long nodes = up_fs.shape[0] - 1
+    cdef long long edges = up_heads.shape[0]
+    cdef long long skims = up_skims.shape[1]
+    cdef long long i, j, k, e, u, v, w, e_uv, e_uw, e_vw, p
+    cdef double new_cost
+
+    for e in range(edges):
+        up_costs[e] = INFINITE
+        down_costs[e] = INFINITE
+        for k in range(skims):
+            up_skims[e, k] = INFINITE
+            down_skims[e, k] = INFINITE
+
+    # Original links
+    for i in range(a_nodes.shape[0]):
+        u = a_nodes[i]
+        v = b_nodes[i]
+        if u == v:
+            continue
+        if rank[u] < rank[v]:
+            e = cch_edge(u, v, rank, up_fs, up_heads)
+            if link_costs[i] < up_costs[e]:
+                up_costs[e] = link_costs[i]
+                for k in range(skims):
+                    up_skims[e, k] = link_skims[i, k]
+        else:
+            e = cch_edge(v, u, rank, up_fs, up_heads)
+            if link_costs[i] < down_costs[e]:
+                down_costs[e] = link_costs[i]
+                for k in range(skims):
+                    down_skims[e, k] = link_skims[i, k]
+
+    # Lower triangles, processed in increasing rank of their lowest node
+    for p in range(nodes):
+        u = order[p]
+        # Paths cannot go through centroids if flows through them are blocked
+        if block_flows_through_centroids and u < zones:
+            continue
+        for e_uv in range(up_fs[u], up_fs[u + 1]):
+            v = up_heads[e_uv]
+            # Higher neighbors of u are also neighbors of v, and both lists are sorted by rank
+            e_vw = up_fs[v]
+            for e_uw in range(e_uv + 1, up_fs[u + 1]):
+                w = up_heads[e_uw]
+                while up_heads[e_vw] != w:
+                    e_vw += 1
+
+                # v -> u -> w
+                new_cost = down_costs[e_uv] + up_costs[e_uw]
+                if new_cost < up_costs[e_vw]:
+                    up_costs[e_vw] = new_cost
+                    for k in range(skims):
+                        up_skims[e_vw, k] = down_skims[e_uv, k] + up_skims[e_uw, k]
+
+                # w -> u -> v
+                new_cost = down_costs[e_uw] + up_costs[e_uv]
+                if new_cost < down_costs[e_vw]:
+                    down_costs[e_vw] = new_cost
+                    for k in range(skims):
+                        down_skims[e_vw, k] = down_skims[e_uw, k] + up_skims[e_uv, k]
+
+
+@cython.wraparound(False)
+@cython.embedsignature(True)
+@cython.boundscheck(False)
+cpdef void cch_many_to_many(long long [:] origins,
+                            long long [:] destinations,
+                            long long [:] parent,
+                            long long [:] up_fs,
+                            long long [:] up_heads,
+                            double [:] up_costs,
+                            double [:] down_costs,
+                            double [:, :] up_skims,
+                            double [:, :] down_skims,
+                            long long zones,
+                            int block_flows_through_centroids,
+                            int cores,
+                            double [:, :] costs,
+                            double [:, :, :] skim_matrix) nogil:
+    # Bucket-based many-to-many query. The backward search from each destination leaves its labels in buckets on all
+    # of its elimination tree ancestors, and the forward search from each origin scans the buckets on its own
+    # ancestors. costs and skim_matrix are indexed by the position of each origin and destination in their arrays
+
+    cdef long long nodes = up_fs.shape[0] - 1
+    cdef long long skims = up_skims.shape[1]
+    cdef long long num_origins = origins.shape[0]
+    cdef long long num_destinations = destinations.shape[0]
+    cdef long long i, j, k, x, w, e, t, entries, pos, s
+    cdef int blocked
+    cdef double new_cost
+
+    cdef double *labels = <double*> malloc(nodes * sizeof(double))
+    cdef double *label_skims = <double*> malloc(nodes * max(skims, 1) * sizeof(double))
+    cdef double *forward_labels
+    cdef double *forward_skims
+
+    cdef long long *bucket_fs = <long long*> calloc(nodes + 1, sizeof(long long))
+    cdef long long *bucket_destination
+    cdef double *bucket_costs
+    cdef double *bucket_skims
+
+    for x in range(nodes):
+        labels[x] = INFINITE
+
+    # Counts how many entries each bucket will hold
+    for j in range(num_destinations):
+        x = destinations[j]
+        while x >= 0:
+            bucket_fs[x + 1] += 1
+            x = parent[x]
+    for x in range(nodes):
+        bucket_fs[x + 1] += bucket_fs[x]
+    entries = bucket_fs[nodes]
+
+    bucket_destination = <long long*> malloc(max(entries, 1) * sizeof(long long))
+    bucket_costs = <double*> malloc(max(entries, 1) * sizeof(double))
+    bucket_skims = <double*> malloc(max(entries, 1) * max(skims, 1) * sizeof(double))
+
+    # Backward searches
+    for j in range(num_destinations):
+        t = destinations[j]
+        labels[t] = 0
+        for k in range(skims):
+            label_skims[t * skims + k] = 0
+
+        x = t
+        while x >= 0:
+            pos = bucket_fs[x]
+            bucket_fs[x] += 1
+            bucket_destination[pos] = j
+            bucket_costs[pos] = labels[x]
+            if labels[x] < INFINITE:
+                for k in range(skims):
+                    bucket_skims[pos * skims + k] = label_skims[x * skims + k]
+
+            # Paths cannot go through centroids if flows through them are blocked, but they can still start at them
+            if labels[x] < INFINITE and not (block_flows_through_centroids and x < zones and x != t):
+                for e in range(up_fs[x], up_fs[x + 1]):
+                    w = up_heads[e]
+                    new_cost = labels[x] + down_costs[e]
+                    if new_cost < labels[w]:
+                        labels[w] = new_cost
+                        for k in range(skims):
+                            label_skims[w * skims + k] = label_skims[x * skims + k] + down_skims[e, k]
+            x = parent[x]
+
+        x = t
+        while x >= 0:
+            labels[x] = INFINITE
+            x = parent[x]
+
+    # bucket_fs now points to the end of each bucket, so we shift it back to the start
+    for x in range(nodes, 0, -1):
+        bucket_fs[x] = bucket_fs[x - 1]
+    bucket_fs[0] = 0
+
+    free(labels)
+    free(label_skims)
+
+    # Forward searches, in parallel
+    with parallel(num_threads=cores):
+        forward_labels = <double*> malloc(nodes * sizeof(double))
+        forward_skims = <double*> malloc(nodes * max(skims, 1) * sizeof(double))
+        for t in range(nodes):
+            forward_labels[t] = INFINITE
+
+        for i in prange(num_origins, schedule='dynamic'):
+            s = origins[i]
+            for j in range(num_destinations):
+                costs[i, j] = INFINITE
+                for k in range(skims):
+                    skim_matrix[i, j, k] = INFINITE
+
+            forward_labels[s] = 0
+            for k in range(skims):
+                forward_skims[s * skims + k] = 0
+
+            x = s
+            while x >= 0:
+                if forward_labels[x] < INFINITE:
+                    # A blocked centroid can only be the end of the path
+                    blocked = block_flows_through_centroids and x < zones and x != s
+                    for pos in range(bucket_fs[x], bucket_fs[x + 1]):
+                        j = bucket_destination[pos]
+                        if blocked and destinations[j] != x:
+                            continue
+                        new_cost = forward_labels[x] + bucket_costs[pos]
+                        if new_cost < costs[i, j]:
+                            costs[i, j] = new_cost
+                            for k in range(skims):
+                                skim_matrix[i, j, k] = forward_skims[x * skims + k] + bucket_skims[pos * skims + k]
+                    if blocked:
+                        x = parent[x]
+                        continue
+
+                    for e in range(up_fs[x], up_fs[x + 1]):
+                        w = up_heads[e]
+                        new_cost = forward_labels[x] + up_costs[e]
+                        if new_cost < forward_labels[w]:
+                            forward_labels[w] = new_cost
+                            for k in range(skims):
+                                forward_skims[w * skims + k] = forward_skims[x * skims + k] + up_skims[e, k]
+                x = parent[x]
+
+            x = s
+            while x >= 0:
+                forward_labels[x] = INFINITE
+                x = parent[x]
+
+        free(forward_labels)
+        free(forward_skims)
+
+    free(bucket_fs)
+    free(bucket_destination)
+    free(bucket_costs)
+    free(bucket_skims)
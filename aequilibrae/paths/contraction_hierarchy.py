@@ -0,0 +1,236 @@
+import multiprocessing as mp
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import breadth_first_order, connected_components
+from aequilibrae import logger
+
+try:
+    from aequilibrae.paths.AoN import cch_customize, cch_many_to_many
+except ImportError as ie:
+    logger.warning(f"Could not import procedures from the binary. {ie.args}")
+
+
+class ContractionHierarchy:
+    """Customizable contraction hierarchy built on the compact graph
+
+    The node order and the shortcuts only depend on the topology of the graph, so the hierarchy is built only once.
+    Changing the cost field, skim fields or blocking of centroid flows only requires a (fast) customization, which
+    the graph triggers automatically when the hierarchy was created through it.
+
+    ::
+
+        from aequilibrae.paths import NetworkSkimming
+
+        graph.set_graph('free_flow_time')
+        graph.set_skimming(['free_flow_time', 'distance'])
+        graph.build_contraction_hierarchy()
+
+        # Skimming now uses the hierarchy
+        skm = NetworkSkimming(graph)
+        skm.execute()
+
+        # And so can point-to-point queries between any two nodes in the compact graph
+        cost, skims = graph.contraction_hierarchy.query(1, 20)
+
+        # Re-customizes the hierarchy for the new costs
+        graph.set_graph('distance')
+    """
+
+    def __init__(self, graph, leaf_size=64):
+        self.graph = graph
+        self.leaf_size = leaf_size
+        self.cores = mp.cpu_count()
+        itype = graph.default_types("int")
+
+        self.nodes = graph.compact_num_nodes
+        a_nodes = graph.compact_graph.a_node.values
+        b_nodes = graph.compact_graph.b_node.values
+        self.order = self.__nested_dissection(a_nodes, b_nodes).astype(itype)
+        self.rank = np.empty(self.nodes, dtype=itype)
+        self.rank[self.order] = np.arange(self.nodes, dtype=itype)
+        self.up_fs, self.up_heads, self.parent = self.__chordal_completion(a_nodes, b_nodes)
+
+        edges = self.up_heads.shape[0]
+        self.up_costs = np.zeros(edges, dtype=graph.default_types("float"))
+        self.down_costs = np.zeros(edges, dtype=graph.default_types("float"))
+        self.up_skims = np.zeros((edges, 0), dtype=graph.default_types("float"))
+        self.down_skims = np.zeros((edges, 0), dtype=graph.default_types("float"))
+        self.customized = False
+        logger.info(f"Contraction hierarchy built with {edges} edges for {self.nodes} nodes")
+
+    def customize(self) -> None:
+        """Computes the metrics of the hierarchy for the current cost and skim fields of the graph"""
+        graph = self.graph
+        if not graph.cost_field:
+            raise ValueError('Cost field needs to be set for customization. use graph.set_graph("your_cost_field")')
+
+        num_skims = len(graph.skim_fields)
+        edges = self.up_heads.shape[0]
+        ftype = graph.default_types("float")
+        self.up_skims = np.zeros((edges, num_skims), dtype=ftype)
+        self.down_skims = np.zeros((edges, num_skims), dtype=ftype)
+        if num_skims:
+            link_skims = np.ascontiguousarray(graph.compact_skims[:, :num_skims], dtype=ftype)
+        else:
+            link_skims = np.zeros((graph.compact_num_links, 0), dtype=ftype)
+
+        # Closed links keep their place in the hierarchy, but can never be used
+        link_costs = graph.compact_cost[graph.compact_graph.id.values].astype(ftype)
+        link_costs[graph.compact_b_nodes == graph.compact_graph.a_node.values] = np.inf
+
+        cch_customize(
+            graph.compact_graph.a_node.values,
+            graph.compact_graph.b_node.values,
+            link_costs,
+            link_skims,
+            self.rank,
+            self.order,
+            self.up_fs,
+            self.up_heads,
+            self.up_costs,
+            self.down_costs,
+            self.up_skims,
+            self.down_skims,
+            graph.num_zones,
+            int(graph.block_centroid_flows),
+        )
+        self.customized = True
+
+    def skim(self, origins=None, destinations=None) -> (np.ndarray, np.ndarray):
+        """Computes costs and skims between sets of nodes
+
+        Args:
+            *origins* (:obj:`list`, `Optional`): Node IDs of origins. Defaults to all centroids
+
+            *destinations* (:obj:`list`, `Optional`): Node IDs of destinations. Defaults to all centroids
+
+        Returns:
+            *costs* (:obj:`np.ndarray`): Array (origins x destinations) with the cost of the shortest paths
+
+            *skims* (:obj:`np.ndarray`): Array (origins x destinations x skims) with the skims along the shortest
+            paths, in the same order as *graph.skim_fields*
+        """
+        orig = self.__node_indices(self.graph.centroids if origins is None else origins)
+        dest = self.__node_indices(self.graph.centroids if destinations is None else destinations)
+
+        ftype = self.graph.default_types("float")
+        costs = np.empty((orig.shape[0], dest.shape[0]), dtype=ftype)
+        skims = np.empty((orig.shape[0], dest.shape[0], self.up_skims.shape[1]), dtype=ftype)
+        self._many_to_many(orig, dest, costs, skims)
+        return costs, skims
+
+    def query(self, origin: int, destination: int) -> (float, np.ndarray):
+        """Computes cost and skims of the shortest path between two nodes
+
+        Args:
+            *origin* (:obj:`int`): Node ID of the origin
+
+            *destination* (:obj:`int`): Node ID of the destination
+
+        Returns:
+            *cost* (:obj:`float`): Cost of the shortest path. np.inf if there is no path
+
+            *skims* (:obj:`np.ndarray`): Skims along the shortest path, in the same order as *graph.skim_fields*
+        """
+        costs, skims = self.skim([origin], [destination])
+        return costs[0, 0], skims[0, 0, :]
+
+    def _many_to_many(self, origins: np.ndarray, destinations: np.ndarray, costs, skims) -> None:
+        # Origins and destinations are indices in the compact graph
+        if not self.customized:
+            self.customize()
+
+        cch_many_to_many(
+            origins,
+            destinations,
+            self.parent,
+            self.up_fs,
+            self.up_heads,
+            self.up_costs,
+            self.down_costs,
+            self.up_skims,
+            self.down_skims,
+            self.graph.num_zones,
+            int(self.graph.block_centroid_flows),
+            self.cores,
+            costs,
+            skims,
+        )
+
+    def __node_indices(self, nodes) -> np.ndarray:
+        nodes = np.array(nodes, dtype=self.graph.default_types("int"))
+        indices = self.graph.compact_nodes_to_indices
+        if nodes.min() < 0 or nodes.max() >= indices.shape[0] or np.any(indices[nodes] < 0):
+            raise ValueError("Nodes need to exist in the compressed graph")
+        return np.array(indices[nodes], dtype=self.graph.default_types("int"))
+
+    def __nested_dissection(self, a_nodes: np.ndarray, b_nodes: np.ndarray) -> np.ndarray:
+        # Recursive bisection using the middle level of a breadth-first search from a pseudo-peripheral node as
+        # separator. Separators are contracted last, so they end up at the top of the hierarchy
+        n = self.nodes
+        adjacency = sp.coo_matrix((np.ones(a_nodes.shape[0], np.int8), (a_nodes, b_nodes)), shape=(n, n)).tocsr()
+        adjacency = (adjacency + adjacency.T).tocsr()
+
+        pieces = []
+        stack = [np.arange(n)]
+        while stack:
+            nodes = stack.pop()
+            if nodes.shape[0] <= self.leaf_size:
+                pieces.append(nodes)
+                continue
+
+            sub = adjacency[nodes][:, nodes]
+            num_components, labels = connected_components(sub, directed=False)
+            if num_components > 1:
+                stack.extend(nodes[labels == c] for c in range(num_components))
+                continue
+
+            start = 0
+            for _ in range(2):
+                bfs_order = breadth_first_order(sub, start, directed=False, return_predecessors=False)
+                start = bfs_order[-1]
+            bfs_order, predecessors = breadth_first_order(sub, start, directed=False)
+            level = np.zeros(nodes.shape[0], dtype=np.int64)
+            for v in bfs_order[1:]:
+                level[v] = level[predecessors[v]] + 1
+
+            middle = np.searchsorted(np.cumsum(np.bincount(level)), nodes.shape[0] / 2)
+            pieces.append(nodes[level == middle])
+            stack.append(nodes[level < middle])
+            stack.append(nodes[level > middle])
+
+        # Pieces were found top-down, so the reverse gives us the contraction order
+        return np.hstack(pieces[::-1])
+
+    def __chordal_completion(self, a_nodes: np.ndarray, b_nodes: np.ndarray):
+        # Symbolic elimination. The upward neighbors of a node are its original upward neighbors plus the upward
+        # neighbors of its children in the elimination tree
+        itype = self.graph.default_types("int")
+        rank = self.rank
+        low = np.where(rank[a_nodes] < rank[b_nodes], a_nodes, b_nodes)
+        high = np.where(rank[a_nodes] < rank[b_nodes], b_nodes, a_nodes)
+        keep = low != high
+
+        upward = [set() for _ in range(self.nodes)]
+        for x, y in zip(low[keep].tolist(), high[keep].tolist()):
+            upward[x].add(y)
+
+        parent = np.full(self.nodes, -1, dtype=itype)
+        for v in self.order.tolist():
+            neighbors = upward[v]
+            if not neighbors:
+                continue
+            p = min(neighbors, key=rank.__getitem__)
+            parent[v] = p
+            upward[p].update(neighbors)
+            upward[p].discard(p)
+
+        counts = np.array([len(x) for x in upward], dtype=itype)
+        up_fs = np.zeros(self.nodes + 1, dtype=itype)
+        up_fs[1:] = np.cumsum(counts)
+        up_heads = np.zeros(up_fs[-1], dtype=itype)
+        for v, neighbors in enumerate(upward):
+            if neighbors:
+                heads = np.fromiter(neighbors, dtype=itype, count=len(neighbors))
+                up_heads[up_fs[v]: up_fs[v + 1]] = heads[np.argsort(rank[heads])]
+        return up_fs, up_heads, parent
@@ -0,0 +1,67 @@
+import numpy as np
+from aequilibrae.paths.algorithm_b import AlgorithmB
+from aequilibrae.paths.traffic_class import TrafficClass
+from aequilibrae.paths.results.path_store import PathStore
+from aequilibrae import logger
+
+try:
+    from aequilibrae.paths.AoN import bush_link_costs, update_origin_paths
+except ImportError as ie:
+    logger.warning(f"Could not import procedures from the binary. {ie.args}")
+
+
+class GradientProjection(AlgorithmB):
+    """Path-based user equilibrium assignment with gradient projection (Jayakrishnan et al., 1994)
+
+    The shortest path between each OD pair is added to a path store at every iteration (if it is not there yet), and
+    flows of each OD pair are shifted from all its paths to the cheapest one with Newton steps. Link costs are
+    updated after every shift, for all classes, in the same way as for Algorithm B.
+
+    Path flows are kept in the :obj:`PathStore` of the results of each traffic class (*results.path_store*), which
+    supports select-link analysis and path file output.
+    """
+
+    def __init__(self, assig_spec, algorithm="gradient-projection") -> None:
+        AlgorithmB.__init__(self, assig_spec, algorithm)
+        self.inner_iterations = 2
+        self.path_stores = {}
+
+    def _prepare_class(self, c: TrafficClass):
+        AlgorithmB._prepare_class(self, c)
+        network = self._networks[c.__id__]
+
+        # Links leaving centroids are blocked once for all origins
+        blocked = self._scratch[c.__id__].temp_b_nodes
+        blocked[:] = network.b_nodes[:]
+        if network.block_flows_through_centroids:
+            centroid_links = slice(0, network.graph_fs[network.zones])
+            blocked[centroid_links] = network.a_nodes[centroid_links]
+
+        store = PathStore()
+        store.prepare(c.graph, c.results.classes["names"], self.__demand(c))
+        self.path_stores[c.__id__] = store
+        c.results.path_store = store
+
+    def _update_class(self, c: TrafficClass):
+        network = self._networks[c.__id__]
+        scratch = self._scratch[c.__id__]
+        store = self.path_stores[c.__id__]
+        bush_link_costs(network)
+        matrix = self.__demand(c)
+
+        for m in range(len(store.classes)):
+            class_loads = c.results.compact_link_loads[:, m]
+            for origin in range(network.zones):
+                pair = m * network.zones + origin
+                if store.pair_fs[pair + 1] > store.pair_fs[pair]:
+                    demand = np.nan_to_num(np.array(matrix[origin, :, m], np.float64))
+                    update_origin_paths(
+                        origin, m, pair, demand, network, scratch, store, class_loads, self.inner_iterations
+                    )
+
+    @staticmethod
+    def __demand(c: TrafficClass):
+        matrix = c.matrix.matrix_view
+        if len(matrix.shape) == 2:
+            matrix = matrix.reshape(matrix.shape[0], matrix.shape[1], 1)
+        return matrix
@@ -1,4 +1,6 @@
+import json
 import logging
+import os
 import pickle
 import uuid
 from datetime import datetime
@@ -6,19 +8,32 @@ from warnings import warn
 from typing import List
 import numpy as np
 import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.csgraph import reverse_cuthill_mckee
 from aequilibrae.starts_logging import logger
 from .__version__ import binary_version as VERSION
 
+try:
+    from aequilibrae.paths.AoN import compress_chains
+except ImportError as ie:
+    logger.warning(f"Could not import procedures from the binary. {ie.args}")
+
 
 class Graph(object):
     """
     Graph class
     """
 
+    # The order of this list matches the heap codes used by the path computation binaries
+    heaps_available = ["fibonacci", "quaternary", "radix"]
+    precisions_available = ["double", "single"]
+    node_orders_available = ["sorted", "rcm"]
+
     def __init__(self):
         self.logger = logging.getLogger("aequilibrae")
         self.__integer_type = np.int64
         self.__float_type = np.float64
+        self.__cost_type = np.float64  # Type of the compact cost and skim arrays used by assignment and skimming
 
         self.required_default_fields = ["link_id", "a_node", "b_node", "direction", "id"]
         self.__required_default_types = [
@@ -68,9 +83,18 @@ class Graph(object):
 
         self.block_centroid_flows = True
         self.penalty_through_centroids = np.inf
+        self.heap_type = "fibonacci"  # Priority queue used by Dijkstra's algorithm
+        self.precision = "double"  # Precision of the compact costs and skims, as well as of the loading buffers
+        self.node_order = "sorted"  # Order of the non-centroid nodes in the compact graph
+        self.contraction_hierarchy = None  # Optional ContractionHierarchy built on the compact graph
 
         self.centroids = None  # NumPy array of centroid IDs
 
+        # Links closed in the current scenario. Path computation uses B nodes where they point back to their A nodes
+        self.closed_links = []
+        self.b_nodes = np.array([])
+        self.compact_b_nodes = np.array([])
+
         self.g_link_crosswalk = np.array([])  # 4 a link ID in the BIG graph, a corresponding link in the compressed 1
 
         self.__version__ = VERSION
@@ -121,6 +145,7 @@ class Graph(object):
         if centroids.shape[0] != np.unique(centroids).shape[0]:
             raise ValueError("Centroid IDs are not unique")
         self.centroids = np.array(centroids, np.uint32)
+        self.contraction_hierarchy = None
 
         properties = self.__build_directed_graph(self.network, centroids)
         self.all_nodes, self.num_nodes, self.nodes_to_indices, self.fs, self.graph = properties
@@ -135,105 +160,54 @@ class Graph(object):
 
         self.__build_compressed_graph()
         self.compact_num_links = self.compact_graph.shape[0]
+        self.__apply_closures()
 
     def __build_compressed_graph(self):
-        # Build link index
-        link_idx = np.empty(self.network.link_id.max() + 1).astype(np.int)
-        link_idx[self.network.link_id] = np.arange(self.network.shape[0])
+        a_nodes = self.network.a_node.values.astype(np.int64)
+        b_nodes = self.network.b_node.values.astype(np.int64)
+        num_links = self.network.shape[0]
 
-        nodes = np.hstack([self.network.a_node.values, self.network.b_node.values])
-        links = np.hstack([self.network.link_id.values, self.network.link_id.values])
+        # Forward star of the links (rows of the network table) incident to each node
+        nodes = np.hstack([a_nodes, b_nodes])
         counts = np.bincount(nodes)
-
-        idx = np.argsort(nodes)
-        all_nodes = nodes[idx]
-        all_links = links[idx]
-        links_index = np.empty(all_nodes.max() + 2, np.int64)
-        links_index.fill(-1)
-        nlist = np.arange(all_nodes.max() + 2)
-
-        y, x, _ = np.intersect1d(all_nodes, nlist, assume_unique=False, return_indices=True)
-        links_index[y] = x[:]
-        links_index[-1] = all_links.shape[0]
-
-        for i in range(all_nodes.max() + 1, 0, -1):
-            links_index[i - 1] = links_index[i] if links_index[i - 1] == -1 else links_index[i - 1]
+        node_links = np.tile(np.arange(num_links, dtype=np.int64), 2)[np.argsort(nodes, kind="stable")]
+        node_fs = np.zeros(counts.shape[0] + 1, np.int64)
+        node_fs[1:] = np.cumsum(counts)
 
         # We keep all centroids for sure
         counts[self.centroids] = 999
 
-        truth = (counts == 2).astype(np.int)
-        link_edge = truth[self.network.a_node.values] + truth[self.network.b_node.values]
-        link_edge = self.network.link_id.values[link_edge == 1]
+        # Links with exactly one node of degree two are the ends of chains that can be compressed
+        truth = (counts == 2).astype(np.int64)
+        link_edge = truth[a_nodes] + truth[b_nodes]
+        chain_ends = np.nonzero(link_edge == 1)[0].astype(np.int64)
+
+        row_simplified_links = np.full(num_links, -1, np.int64)
+        row_simplified_directions = np.zeros(num_links, np.int64)
+        compressed_a_node = np.zeros(num_links, np.int64)
+        compressed_b_node = np.zeros(num_links, np.int64)
+        compressed_dir = np.zeros(num_links, np.int64)
+
+        slink = compress_chains(
+            a_nodes,
+            b_nodes,
+            self.network.direction.values.astype(np.int64),
+            counts.astype(np.int64),
+            node_fs,
+            node_links,
+            chain_ends,
+            row_simplified_links,
+            row_simplified_directions,
+            compressed_a_node,
+            compressed_b_node,
+            compressed_dir,
+        )
 
+        # The crosswalk is indexed by link ID
         simplified_links = np.repeat(-1, self.network.link_id.max() + 1)
-        simplified_directions = np.zeros(self.network.link_id.max() + 1, np.int)
-
-        compressed_dir = np.zeros(self.network.link_id.max() + 1, np.int)
-        compressed_a_node = np.zeros(self.network.link_id.max() + 1, np.int)
-        compressed_b_node = np.zeros(self.network.link_id.max() + 1, np.int)
-
-        slink = 0
-        major_nodes = {}
-        tot = 0
-        tot_graph_add = 0
-        for pre_link in link_edge:
-            if simplified_links[pre_link] >= 0:
-                continue
-            ab_dir = 1
-            ba_dir = 1
-            lidx = link_idx[pre_link]
-            a_node = self.network.a_node.values[lidx]
-            b_node = self.network.b_node.values[lidx]
-            drc = self.network.direction.values[lidx]
-            n = a_node if counts[a_node] == 2 else b_node
-            first_node = b_node if counts[a_node] == 2 else a_node
-
-            ab_dir = 0 if (first_node == a_node and drc < 0) or (first_node == b_node and drc > 0) else ab_dir
-            ba_dir = 0 if (first_node == a_node and drc > 0) or (first_node == b_node and drc < 0) else ba_dir
-
-            while counts[n] == 2:
-                # assert (simplified_links[pre_link] >= 0), "How the heck did this happen?"
-                simplified_links[pre_link] = slink
-                simplified_directions[pre_link] = -1 if a_node == n else 1
-
-                # Gets the link from the list that is not the link we are coming from
-                lnk = [all_links[k] for k in range(links_index[n], links_index[n + 1]) if pre_link != all_links[k]][0]
-                pre_link = lnk
-                lidx = link_idx[pre_link]
-                a_node = self.network.a_node.values[lidx]
-                b_node = self.network.b_node.values[lidx]
-                drc = self.network.direction.values[lidx]
-                ab_dir = 0 if (n == a_node and drc < 0) or (n == b_node and drc > 0) else ab_dir
-                ba_dir = 0 if (n == a_node and drc > 0) or (n == b_node and drc < 0) else ba_dir
-                n = (
-                    self.network.a_node.values[lidx]
-                    if n == self.network.b_node.values[lidx]
-                    else self.network.b_node.values[lidx]
-                )
-
-            if max(ab_dir, ba_dir) < 1:
-                tot += 1
-
-            tot_graph_add += ab_dir + ba_dir
-            simplified_links[pre_link] = slink
-            simplified_directions[pre_link] = -1 if a_node == n else 1
-            last_node = b_node if counts[a_node] == 2 else a_node
-            major_nodes[slink] = [first_node, last_node]
-
-            # Available directions are NOT indexed like the other arrays
-            compressed_a_node[slink] = first_node
-            compressed_b_node[slink] = last_node
-            if ab_dir > 0:
-                if ba_dir > 0:
-                    compressed_dir[slink] = 0
-                else:
-                    compressed_dir[slink] = 1
-            elif ba_dir > 0:
-                compressed_dir[slink] = -1
-            else:
-                compressed_dir[slink] = -999
-            slink += 1
+        simplified_directions = np.zeros(self.network.link_id.max() + 1, np.int64)
+        simplified_links[self.network.link_id.values] = row_simplified_links
+        simplified_directions[self.network.link_id.values] = row_simplified_directions
 
         links_to_remove = np.argwhere(simplified_links >= 0)
         df = pd.DataFrame(self.network, copy=True)
@@ -253,7 +227,7 @@ class Graph(object):
 
         df = pd.concat([df, comp_lnk])
         df = df[["id", "link_id", "a_node", "b_node", "direction"]]
-        properties = self.__build_directed_graph(df, self.centroids)
+        properties = self.__build_directed_graph(df, self.centroids, self.node_order == "rcm")
         self.compact_all_nodes = properties[0]
         self.compact_num_nodes = properties[1]
         self.compact_nodes_to_indices = properties[2]
@@ -265,7 +239,7 @@ class Graph(object):
                 "link_id": np.arange(simplified_directions.shape[0]),
                 "link_direction": simplified_directions,
                 "compressed_link": simplified_links,
-                "compressed_direction": np.ones(simplified_directions.shape[0]).astype(np.int),
+                "compressed_direction": np.ones(simplified_directions.shape[0], np.int64),
             }
         )
 
@@ -304,7 +278,7 @@ class Graph(object):
         # We build a groupby to save time later
         self.__graph_groupby = self.graph.groupby(["__compressed_id__"])
 
-    def __build_directed_graph(self, network: pd.DataFrame, centroids: np.ndarray):
+    def __build_directed_graph(self, network: pd.DataFrame, centroids: np.ndarray, reorder=False):
         all_titles = list(network.columns)
 
         not_pos = network.loc[network.direction != 1, :]
@@ -350,17 +324,24 @@ class Graph(object):
 
         df.loc[:, "a_node"] = nodes_to_indices[df.a_node.values][:]
         df.loc[:, "b_node"] = nodes_to_indices[df.b_node.values][:]
+
+        if reorder:
+            # Neighbouring nodes get close indices, so path searches touch fewer cache lines. Centroids must remain
+            # the first nodes of the graph
+            order = self.__bandwidth_reducing_order(df.a_node.values, df.b_node.values, num_nodes, centroids.shape[0])
+            all_nodes = all_nodes[order]
+            new_index = np.empty(num_nodes, dtype=self.__integer_type)
+            new_index[order] = nlist
+            nodes_to_indices[all_nodes] = nlist
+            df.loc[:, "a_node"] = new_index[df.a_node.values]
+            df.loc[:, "b_node"] = new_index[df.b_node.values]
+
         df = df.sort_values(by=["a_node", "b_node"])
         df.index = np.arange(df.shape[0])
         df.loc[:, "id"] = np.arange(df.shape[0])
-        fs = np.empty(num_nodes + 1, dtype=self.__integer_type)
-        fs.fill(-1)
-        y, x, _ = np.intersect1d(df.a_node.values, nlist, assume_unique=False, return_indices=True)
-        fs[y] = x[:]
-        fs[-1] = df.shape[0]
-        for i in range(num_nodes, 1, -1):
-            if fs[i - 1] == -1:
-                fs[i - 1] = fs[i]
+        # Links are sorted by a_node, so the forward star is the cumulative count of links leaving each node
+        fs = np.zeros(num_nodes + 1, dtype=self.__integer_type)
+        fs[1:] = np.cumsum(np.bincount(df.a_node.values.astype(np.int64), minlength=num_nodes))
 
         nans = ", ".join([i for i in df.columns if df[i].isnull().any().any()])
         if nans:
@@ -373,6 +354,17 @@ class Graph(object):
 
         return all_nodes, num_nodes, nodes_to_indices, fs, df
 
+    @staticmethod
+    def __bandwidth_reducing_order(a_nodes: np.ndarray, b_nodes: np.ndarray, num_nodes: int, zones: int):
+        # Reverse Cuthill-McKee order of all nodes, with centroids kept in place at the beginning
+        a_nodes = a_nodes.astype(np.int64)
+        b_nodes = b_nodes.astype(np.int64)
+        ones = np.ones(a_nodes.shape[0], np.int8)
+        adjacency = sp.coo_matrix((ones, (a_nodes, b_nodes)), shape=(num_nodes, num_nodes))
+        adjacency = (adjacency + adjacency.T).tocsr()
+        rcm = reverse_cuthill_mckee(adjacency, symmetric_mode=True)
+        return np.hstack((np.arange(zones), rcm[rcm >= zones]))
+
     def exclude_links(self, links: list) -> None:
         """
         Excludes a list of links from a graph by setting their B node equal to their A node
@@ -392,6 +384,95 @@ class Graph(object):
             self.set_blocked_centroid_flows(self.block_centroid_flows)
         self.__id__ = uuid.uuid4().hex
 
+    def update_links(self, links: pd.DataFrame, removed: list = None) -> None:
+        """
+        Applies changes to links of a prepared graph, rebuilding only what the changes affect
+
+        Links in *links* replace the links with the same IDs in the network, or are added to it if they do not exist,
+        and links listed in *removed* are removed from it.
+
+        When only link attributes change, the directed and compressed graphs are patched in place, together with
+        costs and skims. New or removed links, and changes of nodes or direction, change the topology of the network
+        and require the graph to be prepared again, which is done automatically while keeping cost, skims and blocking
+        of flows through centroids.
+
+        Args:
+            *links* (:obj:`pd.DataFrame`): Links to change or add, with the same fields as the network
+            *removed* (:obj:`list`, optional): List of IDs of links to remove from the network
+        """
+        if self.compact_num_links < 0:
+            raise ValueError("Graph needs to be prepared before it can be updated")
+        removed = [] if removed is None else list(removed)
+
+        if "id" not in links.columns:
+            links = links.assign(id=np.nan)
+        missing = [x for x in self.network.columns if x not in links.columns]
+        if missing:
+            raise ValueError(f"Fields missing from the links: {', '.join(missing)}")
+        links = links[self.network.columns]
+
+        positions = pd.Index(self.network.link_id.values).get_indexer(links.link_id.values)
+        new_links = positions < 0
+        topology = ["a_node", "b_node", "direction"]
+        old_topology = self.network[topology].values[positions[~new_links]]
+        topology_changed = new_links.any() or bool(removed)
+        topology_changed = topology_changed or (old_topology != links[topology].values[~new_links]).any()
+
+        if topology_changed:
+            network = self.network[~self.network.link_id.isin(removed + list(links.link_id.values))]
+            self.network = pd.concat([network, links], ignore_index=True)
+            self.__prepare_keeping_settings(self.centroids)
+            self.__id__ = uuid.uuid4().hex
+            return
+
+        for col in self.network.columns:
+            self.network.iloc[positions, self.network.columns.get_loc(col)] = links[col].values
+        self.__update_graph_links(links.link_id.values)
+        self.__id__ = uuid.uuid4().hex
+
+    def __update_graph_links(self, link_ids: np.ndarray):
+        # Copies the attributes of links from the network into the graph, for both directions, and updates the costs
+        # and skims of the full and compressed graphs
+        rows = np.nonzero(np.isin(self.graph.link_id.values, link_ids))[0]
+        net_rows = pd.Index(self.network.link_id.values).get_indexer(self.graph.link_id.values[rows])
+        ab_direction = self.graph.direction.values[rows] > 0
+
+        for col in self.graph.columns:
+            if col in self.required_default_fields or col.startswith("__"):
+                continue
+            ab_field = col if col in self.network.columns else f"{col}_ab"
+            ba_field = col if col in self.network.columns else f"{col}_ba"
+            ab_values = self.network[ab_field].values[net_rows]
+            values = np.where(ab_direction, ab_values, self.network[ba_field].values[net_rows])
+            self.graph.iloc[rows, self.graph.columns.get_loc(col)] = values
+
+        # Compressed links made of the links changed (the last ID is where links without a compressed link point to)
+        compressed_ids = self.graph.__compressed_id__.values
+        affected = np.unique(compressed_ids[rows]).astype(np.int64)
+        affected = affected[affected < self.compact_graph.id.max() + 1]
+        members = np.nonzero(np.isin(compressed_ids, affected))[0]
+
+        def compressed_sum(field):
+            weights = np.nan_to_num(self.graph[field].values[members].astype(self.__float_type))
+            return np.bincount(compressed_ids[members].astype(np.int64), weights=weights)[affected]
+
+        if self.cost_field:
+            self.cost[rows] = self.graph[self.cost_field].values[rows]
+            self.compact_cost[affected] = compressed_sum(self.cost_field)
+        for i, field in enumerate(self.skim_fields):
+            self.skims[rows, i] = self.graph[field].values[rows]
+            self.compact_skims[affected, i] = compressed_sum(field)
+        self.__customize_hierarchy()
+
+    def __prepare_keeping_settings(self, centroids: np.ndarray):
+        block_centroid_flows = self.block_centroid_flows
+        self.prepare_graph(centroids)
+        self.set_blocked_centroid_flows(block_centroid_flows)
+        if self.cost_field:
+            self.set_graph(self.cost_field)
+        if self.skim_fields:
+            self.set_skimming(self.skim_fields)
+
     def __build_column_names(self, all_titles: [str]) -> (list, list):
         fields = [x for x in self.required_default_fields]
         types = [x for x in self.__required_default_types]
@@ -442,7 +523,7 @@ class Graph(object):
         """
         if cost_field in self.graph.columns:
             self.cost_field = cost_field
-            self.compact_cost = np.zeros(self.compact_graph.id.max() + 1, self.__float_type)
+            self.compact_cost = np.zeros(self.compact_graph.id.max() + 1, self.__cost_type)
             df = self.__graph_groupby.sum()[[cost_field]].reset_index()
             self.compact_cost[df.index.values[:-1]] = df[cost_field].values[:-1]
             if self.graph[cost_field].dtype == self.__float_type:
@@ -454,6 +535,7 @@ class Graph(object):
             raise ValueError("cost_field not available in the graph:" + str(self.graph.columns))
 
         self.__build_derived_properties()
+        self.__customize_hierarchy()
 
     def set_skimming(self, skim_fields: list) -> None:
         """
@@ -476,10 +558,10 @@ class Graph(object):
         if k:
             raise ValueError("At least one of the skim fields does not exist in the graph: {}".format(",".join(k)))
 
-        self.compact_skims = np.zeros((self.compact_num_links, len(skim_fields) + 1), self.__float_type)
+        self.compact_skims = np.zeros((self.compact_num_links, len(skim_fields) + 1), self.__cost_type)
         df = self.__graph_groupby.sum()[skim_fields].reset_index()
         for i, skm in enumerate(skim_fields):
-            self.compact_skims[df.index.values[:-1], i] = df[skm].values[:-1].astype(self.__float_type)
+            self.compact_skims[df.index.values[:-1], i] = df[skm].values[:-1].astype(self.__cost_type)
 
         self.skims = np.zeros((self.num_links, len(skim_fields) + 1), self.__float_type)
         t = [x for x in skim_fields if self.graph[x].dtype != self.__float_type]
@@ -491,6 +573,7 @@ class Graph(object):
             for i, j in enumerate(skim_fields):
                 self.skims[:, i] = self.graph[j].values[:]
         self.skim_fields = skim_fields
+        self.__customize_hierarchy()
 
     def set_blocked_centroid_flows(self, block_centroid_flows) -> None:
         """
@@ -507,6 +590,145 @@ class Graph(object):
             warn("No centroids in the model. Nothing to block")
             return
         self.block_centroid_flows = block_centroid_flows
+        self.__customize_hierarchy()
+
+    def set_heap(self, heap_type: str) -> None:
+        """
+        Chooses the priority queue used in all shortest path computations with this graph
+
+        The Fibonacci heap is the default. The quaternary (4-ary) heap has much better cache behaviour and is
+        usually faster on road networks, while the radix heap is a monotone priority queue that works directly
+        on the binary representation of the (non-negative) link costs.
+
+        All heaps return the same path costs, but trees may differ when there are ties between paths.
+
+        Args:
+            heap_type (:obj:`str`): One of 'fibonacci', 'quaternary' or 'radix'
+        """
+        if not isinstance(heap_type, str) or heap_type.lower() not in self.heaps_available:
+            raise ValueError(f"Heap type needs to be one of {', '.join(self.heaps_available)}")
+        self.heap_type = heap_type.lower()
+
+    def set_precision(self, precision: str) -> None:
+        """
+        Chooses the floating point precision of the compressed graph used by assignment and skimming
+
+        Single precision halves the memory traffic of path finding, network loading and skim cascading, at the cost of
+        rounding link costs and skims to about 7 significant digits. Path costs, skims and link loads returned in
+        results objects, as well as all convergence computations, remain in double precision.
+
+        Path computation with :obj:`PathResults` always uses the full graph in double precision.
+
+        Args:
+            precision (:obj:`str`): One of 'double' (default) or 'single'
+        """
+        if not isinstance(precision, str) or precision.lower() not in self.precisions_available:
+            raise ValueError(f"Precision needs to be one of {', '.join(self.precisions_available)}")
+        self.precision = precision.lower()
+        self.__cost_type = np.float32 if self.precision == "single" else np.float64
+
+        # Existing compact arrays are converted to the new precision
+        if self.cost_field:
+            self.compact_cost = self.compact_cost.astype(self.__cost_type)
+        if self.compact_skims is not None:
+            self.compact_skims = self.compact_skims.astype(self.__cost_type)
+        self.__customize_hierarchy()
+
+    def set_node_order(self, node_order: str) -> None:
+        """
+        Chooses how nodes of the compressed graph are numbered
+
+        By default, nodes are numbered in the order of their IDs, which rarely has any relation to their location in
+        the network. The reverse Cuthill-McKee order ('rcm') gives neighbouring nodes close indices, which makes path
+        computation more cache-friendly on large networks. Centroids are always the first nodes of the graph.
+
+        Node numbering is internal to the graph, so results are not affected other than for ties between paths.
+        Setting a new order re-prepares the graph if it has already been prepared.
+
+        Args:
+            node_order (:obj:`str`): One of 'sorted' (default) or 'rcm'
+        """
+        if not isinstance(node_order, str) or node_order.lower() not in self.node_orders_available:
+            raise ValueError(f"Node order needs to be one of {', '.join(self.node_orders_available)}")
+        self.node_order = node_order.lower()
+
+        if self.centroids is not None:
+            self.__prepare_keeping_settings(self.centroids)
+
+    def set_closed_links(self, links: list) -> None:
+        """
+        Closes links for all path computations with this graph, without preparing it again
+
+        Path computation uses copies of the B nodes of the graphs where closed links point back to their own A nodes,
+        so the path finding binaries never traverse them. Closures apply to both directions of the links and to the
+        whole compressed links that contain them, and replace any closures set before. An empty list re-opens all
+        links. Links can also be closed for a single traffic class with :meth:`TrafficClass.set_closed_links`
+
+        Args:
+            *links* (:obj:`list`): List of IDs of the links to close
+        """
+        links = list(links)
+        if np.unique(self.graph.link_id.values[self.__link_rows(links)]).shape[0] != len(set(links)):
+            warn("At least one link does not exist in the network and therefore cannot be closed")
+        self.closed_links = links
+        self.__apply_closures()
+
+    def closed_b_nodes(self, links: list) -> np.ndarray:
+        """
+        Returns the B nodes of the compressed graph with some links closed in addition to those closed for the graph
+
+        Args:
+            *links* (:obj:`list`): List of IDs of the links to close
+
+        Returns:
+            *b_nodes* (:obj:`np.ndarray`): B nodes to be used in path computation with the compressed graph
+        """
+        if not len(links):
+            return self.compact_b_nodes
+        return self.__close_compact_links(np.array(self.compact_b_nodes, copy=True), self.__link_rows(links))
+
+    def __apply_closures(self):
+        if "b_node" not in self.graph.columns:
+            return
+        self.b_nodes = self.graph.b_node.values
+        if "b_node" in self.compact_graph.columns:
+            self.compact_b_nodes = self.compact_graph.b_node.values
+        if self.closed_links:
+            rows = self.__link_rows(self.closed_links)
+            self.b_nodes = np.array(self.b_nodes, copy=True)
+            self.b_nodes[rows] = self.graph.a_node.values[rows]
+            if "b_node" in self.compact_graph.columns:
+                self.compact_b_nodes = self.__close_compact_links(np.array(self.compact_b_nodes, copy=True), rows)
+        self.__customize_hierarchy()
+
+    def __link_rows(self, links: list) -> np.ndarray:
+        return np.nonzero(np.isin(self.graph.link_id.values, np.array(links, np.int64)))[0]
+
+    def __close_compact_links(self, compact_b_nodes: np.ndarray, rows: np.ndarray) -> np.ndarray:
+        # Compressed links made of the given rows of the graph (the last ID is where links without one point to)
+        compressed = self.graph.__compressed_id__.values[rows].astype(np.int64)
+        compressed = compressed[compressed < self.compact_num_links]
+        compact_b_nodes[compressed] = self.compact_graph.a_node.values[compressed]
+        return compact_b_nodes
+
+    def build_contraction_hierarchy(self) -> None:
+        """
+        Builds a customizable contraction hierarchy on the compressed graph
+
+        The hierarchy is used by network skimming and is re-customized automatically whenever the cost field, the
+        skim fields or the blocking of flows through centroids change. It is discarded if the graph is re-prepared
+        """
+        from aequilibrae.paths.contraction_hierarchy import ContractionHierarchy
+
+        if self.compact_num_nodes < 0:
+            raise ValueError("Graph needs to be prepared before building a contraction hierarchy")
+
+        self.contraction_hierarchy = ContractionHierarchy(self)
+        self.__customize_hierarchy()
+
+    def __customize_hierarchy(self):
+        if self.contraction_hierarchy is not None and self.cost_field:
+            self.contraction_hierarchy.customize()
 
     # Procedure to pickle graph and save to disk
     def save_to_disk(self, filename: str) -> None:
@@ -531,6 +753,10 @@ class Graph(object):
         mygraph["skims"] = self.skims
         mygraph["skim_fields"] = self.skim_fields
         mygraph["block_centroid_flows"] = self.block_centroid_flows
+        mygraph["heap_type"] = self.heap_type
+        mygraph["precision"] = self.precision
+        mygraph["node_order"] = self.node_order
+        mygraph["closed_links"] = self.closed_links
         mygraph["centroids"] = self.centroids
         mygraph["graph_id"] = self.__id__
         mygraph["graph_version"] = self.__version__
@@ -543,9 +769,15 @@ class Graph(object):
         """
         Loads graph from disk
 
+        Graphs saved with :meth:`save_to_folder` are memory-mapped instead of unpickled
+
         Args:
-            filename (:obj:`str`): Path to file
+            filename (:obj:`str`): Path to file, or to a folder created with :meth:`save_to_folder`
         """
+        if os.path.isdir(filename):
+            self.load_from_folder(filename)
+            return
+
         with open(filename, "rb") as f:
             mygraph = pickle.load(f)
             self.description = mygraph["description"]
@@ -562,11 +794,174 @@ class Graph(object):
             self.skims = mygraph["skims"]
             self.skim_fields = mygraph["skim_fields"]
             self.block_centroid_flows = mygraph["block_centroid_flows"]
+            self.heap_type = mygraph.get("heap_type", "fibonacci")
+            self.set_precision(mygraph.get("precision", "double"))
+            self.node_order = mygraph.get("node_order", "sorted")
+            self.closed_links = mygraph.get("closed_links", [])
             self.centroids = mygraph["centroids"]
             self.__id__ = mygraph["graph_id"]
             self.__version__ = mygraph["graph_version"]
             self.mode = mygraph["mode"]
         self.__build_derived_properties()
+        self.__apply_closures()
+
+    def save_to_folder(self, folder: str) -> None:
+        """
+        Saves graph to disk as a folder of NumPy arrays described by a small JSON header
+
+        Unlike :meth:`save_to_disk`, this format also keeps the compressed graph, so a graph loaded from it is
+        ready for assignment without being prepared again. A graph previously saved to the same folder is replaced,
+        but folders holding anything else must be empty
+
+        Args:
+            folder (:obj:`str`): Path to the folder
+        """
+        if os.path.isdir(folder) and os.listdir(folder):
+            if not os.path.isfile(os.path.join(folder, "graph.json")):
+                raise FileExistsError(f"{folder} is not empty and does not hold a saved graph")
+            # Only the files written by this method are removed
+            for name in os.listdir(folder):
+                if name.endswith(".npy") or name == "graph.json":
+                    os.remove(os.path.join(folder, name))
+        os.makedirs(folder, exist_ok=True)
+
+        header = {
+            "description": self.description,
+            "mode": self.mode,
+            "date": self.date,
+            "num_links": int(self.num_links),
+            "num_nodes": int(self.num_nodes),
+            "compact_num_links": int(self.compact_num_links),
+            "compact_num_nodes": int(self.compact_num_nodes),
+            "cost_field": self.cost_field,
+            "skim_fields": list(self.skim_fields),
+            "block_centroid_flows": bool(self.block_centroid_flows),
+            "heap_type": self.heap_type,
+            "precision": self.precision,
+            "node_order": self.node_order,
+            "closed_links": [int(x) for x in self.closed_links],
+            "graph_id": self.__id__,
+            "graph_version": self.__version__,
+            "arrays": [],
+            "frames": {},
+        }
+
+        arrays = {
+            "all_nodes": self.all_nodes,
+            "nodes_to_indices": self.nodes_to_indices,
+            "fs": self.fs,
+            "cost": self.cost,
+            "skims": self.skims,
+            "compact_all_nodes": self.compact_all_nodes,
+            "compact_nodes_to_indices": self.compact_nodes_to_indices,
+            "compact_fs": self.compact_fs,
+            "compact_cost": self.compact_cost,
+            "compact_skims": self.compact_skims,
+            "centroids": self.centroids,
+        }
+        for name, array in arrays.items():
+            if array is not None:
+                np.save(os.path.join(folder, f"{name}.npy"), np.ascontiguousarray(array))
+                header["arrays"].append(name)
+
+        for name, frame in [("network", self.network), ("graph", self.graph), ("compact_graph", self.compact_graph)]:
+            header["frames"][name] = self.__save_frame(frame, folder, name)
+
+        with open(os.path.join(folder, "graph.json"), "w") as f:
+            json.dump(header, f, indent=4)
+
+    def load_from_folder(self, folder: str, memory_map: bool = True) -> None:
+        """
+        Loads graph saved with :meth:`save_to_folder`
+
+        By default, arrays are memory-mapped instead of read, so loading takes the same time regardless of the size of
+        the graph, and all processes that load the same folder share a single copy of the graph in memory. Arrays are
+        mapped copy-on-write, so changes made to the graph are never written back to disk
+
+        Args:
+            folder (:obj:`str`): Path to the folder
+            memory_map (:obj:`bool`, optional): Whether to memory-map arrays. Defaults to True
+        """
+        mmap_mode = "c" if memory_map else None
+        with open(os.path.join(folder, "graph.json"), "r") as f:
+            header = json.load(f)
+
+        self.description = header["description"]
+        self.mode = header["mode"]
+        self.date = header["date"]
+        self.num_links = header["num_links"]
+        self.num_nodes = header["num_nodes"]
+        self.compact_num_links = header["compact_num_links"]
+        self.compact_num_nodes = header["compact_num_nodes"]
+        self.cost_field = header["cost_field"]
+        self.skim_fields = header["skim_fields"]
+        self.block_centroid_flows = header["block_centroid_flows"]
+        self.heap_type = header["heap_type"]
+        self.precision = header["precision"]
+        self.__cost_type = np.float32 if self.precision == "single" else np.float64
+        self.node_order = header["node_order"]
+        self.closed_links = header.get("closed_links", [])
+        self.__id__ = header["graph_id"]
+        self.__version__ = header["graph_version"]
+
+        arrays = {name: np.load(os.path.join(folder, f"{name}.npy"), mmap_mode) for name in header["arrays"]}
+        self.all_nodes = arrays["all_nodes"]
+        self.nodes_to_indices = arrays["nodes_to_indices"]
+        self.fs = arrays["fs"]
+        self.cost = arrays["cost"]
+        self.skims = arrays.get("skims")
+        self.compact_all_nodes = arrays["compact_all_nodes"]
+        self.compact_nodes_to_indices = arrays["compact_nodes_to_indices"]
+        self.compact_fs = arrays["compact_fs"]
+        self.compact_cost = arrays["compact_cost"]
+        self.compact_skims = arrays.get("compact_skims")
+        self.centroids = arrays.get("centroids")
+
+        frames = header["frames"]
+        self.network = self.__load_frame(folder, "network", frames["network"], mmap_mode)
+        self.graph = self.__load_frame(folder, "graph", frames["graph"], mmap_mode)
+        self.compact_graph = self.__load_frame(folder, "compact_graph", frames["compact_graph"], mmap_mode)
+        self.contraction_hierarchy = None
+        if "__compressed_id__" in self.graph.columns:
+            self.__graph_groupby = self.graph.groupby(["__compressed_id__"])
+        self.__build_derived_properties()
+        self.__apply_closures()
+
+    @staticmethod
+    def __save_frame(frame: pd.DataFrame, folder: str, name: str) -> list:
+        # All columns of the same type are saved as a single 2D array (one row per column), which pandas can use as a
+        # block of the DataFrame without copying it. Columns are therefore grouped by type when the frame is loaded.
+        # Text columns are saved as fixed-width strings, with a mask of their nulls (if there are any) saved alongside
+        blocks = {}
+        for col in frame.columns:
+            dtype = frame[col].dtype if frame[col].dtype != object else np.dtype(str)
+            blocks[dtype] = blocks.get(dtype, []) + [col]
+
+        description = []
+        for i, (dtype, cols) in enumerate(blocks.items()):
+            data = np.vstack([frame[col].values.astype(dtype) for col in cols])
+            np.save(os.path.join(folder, f"{name}.{i}.npy"), data)
+            if dtype.kind == "U":
+                nulls = np.vstack([frame[col].isna().values for col in cols])
+                if nulls.any():
+                    np.save(os.path.join(folder, f"{name}.{i}.nulls.npy"), nulls)
+            description.append(cols)
+        return description
+
+    @staticmethod
+    def __load_frame(folder: str, name: str, description: list, mmap_mode=None) -> pd.DataFrame:
+        # Numeric columns keep pointing to the (mapped) arrays on disk, as there is a single block for each type
+        frames = []
+        for i, cols in enumerate(description):
+            data = np.load(os.path.join(folder, f"{name}.{i}.npy"), mmap_mode)
+            block = pd.DataFrame(data.T, columns=cols, copy=False)
+            nulls_file = os.path.join(folder, f"{name}.{i}.nulls.npy")
+            if os.path.isfile(nulls_file):
+                block = block.mask(np.load(nulls_file).T)
+            frames.append(block)
+        if not frames:
+            return pd.DataFrame([])
+        return pd.concat(frames, axis=1, copy=False)
 
     def __build_derived_properties(self):
         if self.centroids is None:
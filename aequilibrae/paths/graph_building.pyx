@@ -0,0 +1,86 @@
+# cython: language_level=3
+"""
+Compiled passes used to build graphs
+
+Network links are identified by their position (row) in the network table, and nodes by their ID
+"""
+
+
+@cython.wraparound(False)
+@cython.embedsignature(True)
+@cython.boundscheck(False)
+cpdef long long compress_chains(long long [:] a_nodes,
+                                long long [:] b_nodes,
+                                long long [:] directions,
+                                long long [:] counts,
+                                long long [:] node_fs,
+                                long long [:] node_links,
+                                long long [:] chain_ends,
+                                long long [:] simplified_links,
+                                long long [:] simplified_directions,
+                                long long [:] compressed_a_node,
+                                long long [:] compressed_b_node,
+                                long long [:] compressed_dir) nogil:
+    # Walks each chain of nodes with degree two from one of its ends (the links in chain_ends), tagging all its links
+    # with the index of the compressed link that replaces them. Returns the number of compressed links.
+    # node_fs/node_links is the forward star of links incident to each node, and counts is the degree of each node
+    cdef long long i, k, pre_link, a_node, b_node, drc, n, first_node, last_node
+    cdef long long slink = 0
+    cdef int ab_dir, ba_dir
+
+    for i in range(chain_ends.shape[0]):
+        pre_link = chain_ends[i]
+        if simplified_links[pre_link] >= 0:
+            continue
+        ab_dir = 1
+        ba_dir = 1
+        a_node = a_nodes[pre_link]
+        b_node = b_nodes[pre_link]
+        drc = directions[pre_link]
+        if counts[a_node] == 2:
+            n = a_node
+            first_node = b_node
+        else:
+            n = b_node
+            first_node = a_node
+
+        if (first_node == a_node and drc < 0) or (first_node == b_node and drc > 0):
+            ab_dir = 0
+        if (first_node == a_node and drc > 0) or (first_node == b_node and drc < 0):
+            ba_dir = 0
+
+        while counts[n] == 2:
+            simplified_links[pre_link] = slink
+            simplified_directions[pre_link] = -1 if a_node == n else 1
+
+            # Gets the link from the list that is not the link we are coming from
+            for k in range(node_fs[n], node_fs[n + 1]):
+                if node_links[k] != pre_link:
+                    pre_link = node_links[k]
+                    break
+
+            a_node = a_nodes[pre_link]
+            b_node = b_nodes[pre_link]
+            drc = directions[pre_link]
+            if (n == a_node and drc < 0) or (n == b_node and drc > 0):
+                ab_dir = 0
+            if (n == a_node and drc > 0) or (n == b_node and drc < 0):
+                ba_dir = 0
+            n = a_node if n == b_node else b_node
+
+        simplified_links[pre_link] = slink
+        simplified_directions[pre_link] = -1 if a_node == n else 1
+        last_node = b_node if counts[a_node] == 2 else a_node
+
+        # Available directions are NOT indexed like the other arrays
+        compressed_a_node[slink] = first_node
+        compressed_b_node[slink] = last_node
+        if ab_dir > 0:
+            compressed_dir[slink] = 0 if ba_dir > 0 else 1
+        elif ba_dir > 0:
+            compressed_dir[slink] = -1
+        else:
+            compressed_dir[slink] = -999
+        slink += 1
+
+    return slink
@@ -0,0 +1,142 @@
+import multiprocessing as mp
+import numpy as np
+import pandas as pd
+import shapely.wkb
+from shapely.geometry import MultiPoint
+from aequilibrae import logger
+
+try:
+    from aequilibrae.paths.AoN import many_to_many_skims
+except ImportError as ie:
+    logger.warning(f"Could not import procedures from the binary. {ie.args}")
+
+
+class Isochrones:
+    """Nodes and links reachable from a set of sources within a cost cutoff
+
+    Searches from all sources run in parallel, and each one stops as soon as the cutoff is exceeded, so only the
+    part of the network within the cutoff is ever searched.
+
+    ::
+
+        from aequilibrae.paths.isochrones import Isochrones
+
+        graph.set_graph('free_flow_time')
+
+        iso = Isochrones(graph)
+        iso.execute(sources=[1, 7, 2560], cutoff=15)
+
+        # Nodes reached from each source, with the cost to reach them
+        iso.nodes
+
+        # Links that can be fully traversed from each source within the cutoff
+        iso.links
+
+        # Convex hulls of the nodes reached from each source, built from the node geometries in the project
+        iso.polygons(project.conn)
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.cores = mp.cpu_count()
+        self.cutoff = np.inf
+        self.sources = np.array([], dtype=graph.default_types("int"))
+        #: Nodes reached from each source (columns *source*, *node_id* and *cost*)
+        self.nodes = pd.DataFrame([], columns=["source", "node_id", "cost"])
+        #: Links fully reachable from each source (columns *source*, *link_id* and *direction*)
+        self.links = pd.DataFrame([], columns=["source", "link_id", "direction"])
+
+    def set_cores(self, cores: int) -> None:
+        """
+        Sets number of cores (threads) to be used in computation
+
+        Args:
+            *cores* (:obj:`int`): Number of cores to be used in computation. Zero or negative values are counted
+            from the number of cores available in the system
+        """
+        if not isinstance(cores, int):
+            raise ValueError("Number of cores needs to be an integer")
+        self.cores = max(1, mp.cpu_count() + cores) if cores <= 0 else cores
+
+    def execute(self, sources, cutoff: float) -> None:
+        """Finds all nodes and links reachable from each source within the cutoff
+
+        Args:
+            *sources* (:obj:`list`): Node IDs of the sources. They do not need to be centroids
+
+            *cutoff* (:obj:`float`): Maximum cost, in the units of the cost field of the graph
+        """
+        graph = self.graph
+        if not graph.cost_field:
+            raise ValueError('Cost field needs to be set for computation. use graph.set_graph("your_cost_field")')
+        if not cutoff >= 0:
+            raise ValueError("Cutoff needs to be a non-negative number")
+
+        sources = np.unique(np.array(sources, dtype=graph.default_types("int")).reshape(-1))
+        if sources.shape[0] == 0:
+            raise ValueError("At least one source is required")
+        if sources.min() < 0 or sources.max() >= graph.nodes_to_indices.shape[0]:
+            raise ValueError("All sources need to be nodes in the graph")
+        if np.any(graph.nodes_to_indices[sources] < 0):
+            raise ValueError("All sources need to be nodes in the graph")
+
+        self.sources = sources
+        self.cutoff = float(cutoff)
+
+        # Costs to all nodes are kept for one block of sources at a time
+        all_nodes = np.arange(graph.num_nodes, dtype=graph.default_types("int"))
+        block_size = max(self.cores, 2**22 // max(graph.num_nodes, 1))
+        nodes, links = [], []
+        for start in range(0, sources.shape[0], block_size):
+            block = sources[start : start + block_size]
+            costs, _ = many_to_many_skims(graph.nodes_to_indices[block], all_nodes, graph, self.cores, self.cutoff)
+            for source, node_costs in zip(block, costs):
+                nodes.append(self.__reached_nodes(source, node_costs))
+                links.append(self.__reached_links(source, node_costs))
+
+        self.nodes = pd.concat(nodes, ignore_index=True)
+        self.links = pd.concat(links, ignore_index=True)
+
+    def polygons(self, conn) -> pd.DataFrame:
+        """Builds the convex hull of the nodes reached from each source
+
+        Args:
+            *conn* (:obj:`sqlite3.Connection`): Connection to the project database, with Spatialite loaded
+
+        Returns:
+            *polygons* (:obj:`pd.DataFrame`): Table with the *source* and the *geometry* (Shapely) of each isochrone
+        """
+        if self.nodes.shape[0] == 0:
+            raise ValueError("Isochrones need to be computed first. Use execute")
+
+        sql = "SELECT node_id, ST_AsBinary(geometry) FROM nodes WHERE geometry IS NOT NULL"
+        geometries = {node_id: shapely.wkb.loads(geo) for node_id, geo in conn.execute(sql).fetchall()}
+
+        data = []
+        for source, df in self.nodes.groupby("source"):
+            points = [geometries[x] for x in df.node_id.values if x in geometries]
+            data.append([source, MultiPoint(points).convex_hull])
+        return pd.DataFrame(data, columns=["source", "geometry"])
+
+    def __reached_nodes(self, source: int, node_costs: np.ndarray) -> pd.DataFrame:
+        reached = np.nonzero(node_costs <= self.cutoff)[0]
+        return pd.DataFrame(
+            {"source": source, "node_id": self.graph.all_nodes[reached], "cost": node_costs[reached]}
+        )
+
+    def __reached_links(self, source: int, node_costs: np.ndarray) -> pd.DataFrame:
+        # Links can only be traversed if they are not closed and, when flows through centroids are blocked, if they
+        # do not leave any centroid other than the source
+        graph = self.graph
+        a_nodes = graph.graph.a_node.values
+        usable = graph.b_nodes != a_nodes
+        if graph.block_centroid_flows:
+            usable &= (a_nodes >= graph.num_zones) | (a_nodes == graph.nodes_to_indices[source])
+        reached = usable & (node_costs[a_nodes] + graph.cost <= self.cutoff)
+        return pd.DataFrame(
+            {
+                "source": source,
+                "link_id": graph.graph.link_id.values[reached],
+                "direction": graph.graph.direction.values[reached],
+            }
+        )
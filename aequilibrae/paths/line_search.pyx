@@ -0,0 +1,221 @@
+"""
+ -----------------------------------------------------------------------------------------------------------
+ Package:    AequilibraE
+ Name:       Line search
+ Purpose:    Finds the step size that minimizes the objective function along a descent direction
+ Original Author:  Pedro Camargo (c@margo.co)
+ Contributors:
+ Last edited by: Pedro Camrgo
+ Website:    www.AequilibraE.com
+ Repository:  https://github.com/AequilibraE/AequilibraE
+ Created:    18/10/2026
+ Updated:
+ Copyright:   (c) AequilibraE authors
+ Licence:     See LICENSE.TXT
+ -----------------------------------------------------------------------------------------------------------
+
+The derivative of the objective function with respect to the step size is the sum, over all links, of the congested
+time at the combined flows times the difference between the direction and the current flows. It is evaluated for
+several step sizes in a single pass over the links, with each thread adding up a block of links for all step sizes.
+
+The root is first bracketed with an evenly spaced set of step sizes, and then refined with Newton steps (with the
+second derivative of the objective), falling back to bisection whenever a Newton step leaves the bracket.
+"""
+from libc.math cimport fabs, pow
+
+
+cdef inline void line_search_vdf(int vdf,
+                                 double flow,
+                                 double capacity,
+                                 double fftime,
+                                 double alpha,
+                                 double beta,
+                                 double *time,
+                                 double *derivative) nogil:
+    # Same as link_vdf, but with a single power for BPR, as this is evaluated several times for every link
+    cdef double ratio, power
+    if vdf == BPR_VDF:
+        if flow <= 0:
+            time[0] = fftime
+            derivative[0] = 0
+            return
+        ratio = flow / capacity
+        power = pow(ratio, beta - 1)
+        time[0] = fftime * (1 + alpha * power * ratio)
+        derivative[0] = fftime * alpha * beta * power / capacity
+    else:
+        link_vdf(vdf, flow, capacity, fftime, alpha, beta, time, derivative)
+
+
+@cython.wraparound(False)
+@cython.boundscheck(False)
+cdef void block_derivatives(long long b,
+                            double [:] stepsizes,
+                            long long candidates,
+                            double [:, :] partial_first,
+                            double [:, :] partial_second,
+                            int vdf,
+                            double [:] direction,
+                            double [:] flows,
+                            double [:] capacity,
+                            double [:] fftime,
+                            double [:] alpha,
+                            double [:] beta) nogil:
+    # Adds up the derivatives over one block of links. Variables here are local to the thread working on the block
+    cdef long long i, k
+    cdef double difference, time, derivative
+    cdef long long l = flows.shape[0]
+    cdef long long blocks = partial_first.shape[0]
+
+    for k in range(candidates):
+        partial_first[b, k] = 0
+        partial_second[b, k] = 0
+
+    for i in range(b * l // blocks, (b + 1) * l // blocks):
+        difference = direction[i] - flows[i]
+        if difference == 0:
+            continue
+        for k in range(candidates):
+            line_search_vdf(vdf, flows[i] + stepsizes[k] * difference, capacity[i], fftime[i], alpha[i], beta[i],
+                            &time, &derivative)
+            partial_first[b, k] += time * difference
+            partial_second[b, k] += derivative * difference * difference
+
+
+@cython.wraparound(False)
+@cython.boundscheck(False)
+cdef void objective_derivatives(double [:] stepsizes,
+                                long long candidates,
+                                double [:, :] partial_first,
+                                double [:, :] partial_second,
+                                double [:] first,
+                                double [:] second,
+                                int vdf,
+                                double [:] direction,
+                                double [:] flows,
+                                double [:] capacity,
+                                double [:] fftime,
+                                double [:] alpha,
+                                double [:] beta,
+                                int cores) nogil:
+    # First and second derivatives of the objective function for the first candidates step sizes
+    cdef long long b, k
+    cdef long long blocks = partial_first.shape[0]
+
+    for b in prange(blocks, num_threads=cores):
+        block_derivatives(b, stepsizes, candidates, partial_first, partial_second, vdf, direction, flows, capacity,
+                          fftime, alpha, beta)
+
+    for k in range(candidates):
+        first[k] = 0
+        second[k] = 0
+        for b in range(blocks):
+            first[k] += partial_first[b, k]
+            second[k] += partial_second[b, k]
+
+
+@cython.wraparound(False)
+@cython.embedsignature(True)
+@cython.boundscheck(False)
+def line_search(vdf_function, direction, flows, capacity, fftime, alpha, beta, const_term, xtol, candidates, cores):
+    """
+    Finds the step size in [0, 1] where the derivative of the objective function along a direction is zero
+
+    :param vdf_function: Volume-delay function ('BPR' or 'CONICAL')
+    :param direction: Total link flows of the descent direction
+    :param flows: Current total link flows
+    :param capacity: Link capacities
+    :param fftime: Link free flow travel times
+    :param alpha: Alpha parameter of the volume-delay function
+    :param beta: Beta parameter of the volume-delay function
+    :param const_term: Part of the derivative that does not depend on the step size (e.g. fixed costs)
+    :param xtol: Tolerance for the step size
+    :param candidates: Number of evenly spaced step sizes used to bracket the root (at least 2)
+    :param cores: Number of threads
+    :return: Tuple with the step size (NaN if the derivatives at 0 and 1 have the same sign), the derivatives at 0
+             and 1, and whether the search converged
+    """
+    cdef long long k, iteration
+    cdef double lo, hi, f_lo, f_hi, point, f_point, d_point, newton
+    cdef int vdf = 0 if vdf_function.upper() == "BPR" else 1
+    cdef int c = cores
+    cdef long long n = max(2, candidates)
+    cdef long long blocks = max(1, min(4 * c, flows.shape[0]))
+    cdef double tolerance = xtol
+    cdef double constant = const_term
+    cdef bint converged = False
+
+    stepsizes = np.linspace(0.0, 1.0, n)
+    first = np.zeros(n)
+    second = np.zeros(n)
+    partial_first = np.zeros((blocks, n))
+    partial_second = np.zeros((blocks, n))
+
+    cdef double [:] stepsizes_view = stepsizes
+    cdef double [:] first_view = first
+    cdef double [:] second_view = second
+    cdef double [:, :] partial_first_view = partial_first
+    cdef double [:, :] partial_second_view = partial_second
+    cdef double [:] direction_view = direction
+    cdef double [:] flows_view = flows
+    cdef double [:] capacity_view = capacity
+    cdef double [:] fftime_view = fftime
+    cdef double [:] alpha_view = alpha
+    cdef double [:] beta_view = beta
+
+    with nogil:
+        objective_derivatives(stepsizes_view, n, partial_first_view, partial_second_view, first_view, second_view,
+                              vdf, direction_view, flows_view, capacity_view, fftime_view, alpha_view, beta_view, c)
+        for k in range(n):
+            first_view[k] += constant
+
+    f_zero, f_one = first[0], first[n - 1]
+    if f_zero == 0:
+        return 0.0, f_zero, f_one, True
+    if f_one == 0:
+        return 1.0, f_zero, f_one, True
+    if (f_zero > 0) == (f_one > 0):
+        return np.nan, f_zero, f_one, False
+
+    with nogil:
+        # Bracket between the first pair of candidates where the sign changes
+        k = 1
+        while (first_view[k] > 0) == (first_view[0] > 0):
+            k += 1
+        lo, f_lo = stepsizes_view[k - 1], first_view[k - 1]
+        hi, f_hi = stepsizes_view[k], first_view[k]
+        if fabs(f_lo) < fabs(f_hi):
+            point, f_point, d_point = lo, f_lo, second_view[k - 1]
+        else:
+            point, f_point, d_point = hi, f_hi, second_view[k]
+
+        for iteration in range(100):
+            if hi - lo <= tolerance:
+                point = lo - f_lo * (hi - lo) / (f_hi - f_lo)
+                converged = True
+                break
+
+            newton = point - f_point / d_point if d_point > 0 else lo - 1
+            if newton <= lo or newton >= hi:
+                newton = (lo + hi) / 2
+            elif fabs(newton - point) <= tolerance / 2:
+                converged = True
+                point = newton
+                break
+
+            point = newton
+            stepsizes_view[0] = point
+            objective_derivatives(stepsizes_view, 1, partial_first_view, partial_second_view, first_view,
+                                  second_view, vdf, direction_view, flows_view, capacity_view, fftime_view,
+                                  alpha_view, beta_view, c)
+            f_point = first_view[0] + constant
+            d_point = second_view[0]
+            if f_point == 0:
+                converged = True
+                break
+            if (f_point > 0) == (f_lo > 0):
+                lo, f_lo = point, f_point
+            else:
+                hi, f_hi = point, f_point
+
+    return point, f_zero, f_one, converged
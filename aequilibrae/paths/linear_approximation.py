@@ -1,5 +1,4 @@
 import importlib.util as iutil
-from functools import partial
 import numpy as np
 from typing import List, Dict
 from ..utils import WorkerThread
@@ -12,22 +11,12 @@ try:
     from aequilibrae.paths.AoN import linear_combination, linear_combination_skims, aggregate_link_costs
     from aequilibrae.paths.AoN import triple_linear_combination, triple_linear_combination_skims
     from aequilibrae.paths.AoN import copy_one_dimension, copy_two_dimensions, copy_three_dimensions
-    from aequilibrae.paths.AoN import sum_a_times_b_minus_c, linear_combination_1d
+    from aequilibrae.paths.AoN import sum_a_times_b_minus_c, line_search
+    from aequilibrae.paths.AoN import conjugate_differences, biconjugate_differences
+    from aequilibrae.paths.AoN import conjugate_scalars, biconjugate_scalars
 except ImportError as ie:
     logger.warning(f"Could not import procedures from the binary. {ie.args}")
 
-import scipy
-
-if int(scipy.__version__.split(".")[1]) >= 3:
-    from scipy.optimize import root_scalar
-
-    recent_scipy = True
-else:
-    from scipy.optimize import root as root_scalar
-
-    recent_scipy = False
-    logger.warning("Using older version of Scipy. For better performance, use Scipy >= 1.4")
-
 if False:
     from aequilibrae.paths.traffic_assignment import TrafficAssignment
 
@@ -91,6 +80,9 @@ class LinearApproximation(WorkerThread):
         # if this is one, we do not have a new direction and will get stuck. Make it 1.
         self.conjugate_direction_max = 0.99999
 
+        # Number of step sizes evaluated together (in a single pass over the links) to bracket the optimal one
+        self.line_search_candidates = 4
+
         # if FW stepsize is zero, we set it to the corresponding MSA stepsize and then need to not make
         # the step direction conjugate to the previous direction.
         self.do_fw_step = False
@@ -106,63 +98,47 @@ class LinearApproximation(WorkerThread):
         self.fw_total_flow = assig_spec.total_flow
         self.congested_time = assig_spec.congested_time
         self.vdf_der = np.array(assig_spec.congested_time, copy=True)
-        self.congested_value = np.array(assig_spec.congested_time, copy=True)
 
+        # Skims are only blended over the last iterations if this is set
+        self.skim_blending_iterations = assig_spec.skim_blending_iterations
+        self.blending_skims = False
+
+        # Step directions are rotated among these results at each iteration, instead of being copied
         self.step_direction = {}  # type: Dict[AssignmentResults]
         self.previous_step_direction = {}  # type: Dict[AssignmentResults]
         self.pre_previous_step_direction = {}  # type: Dict[AssignmentResults]
 
-        for c in self.traffic_classes:
-            r = AssignmentResults()
-            r.prepare(c.graph, c.matrix)
-            self.step_direction[c.__id__] = r
-
         if self.algorithm in ["cfw", "bfw"]:
+            # Differences between directions and the current solution, summed over all classes for each link
+            self.direction_differences = np.zeros((self.fw_total_flow.shape[0], 3))
 
             for c in self.traffic_classes:
-                r = AssignmentResults()
-                r.prepare(c.graph, c.matrix)
-                r.compact_link_loads = np.zeros([])
-                r.compact_total_link_loads = np.zeros([])
-                self.previous_step_direction[c.__id__] = r
-
-                r = AssignmentResults()
-                r.prepare(c.graph, c.matrix)
-                r.compact_link_loads = np.zeros([])
-                r.compact_total_link_loads = np.zeros([])
-                self.step_direction[c.__id__] = r
-
-                r = AssignmentResults()
-                r.prepare(c.graph, c.matrix)
-                r.compact_link_loads = np.zeros([])
-                r.compact_total_link_loads = np.zeros([])
-                self.pre_previous_step_direction[c.__id__] = r
+                for directions in [self.step_direction, self.previous_step_direction, self.pre_previous_step_direction]:
+                    r = AssignmentResults()
+                    r.prepare(c.graph, c.matrix)
+                    r.compact_link_loads = np.zeros([])
+                    r.compact_total_link_loads = np.zeros([])
+                    directions[c.__id__] = r
+        else:
+            # The step direction of MSA and Frank-Wolfe is the all-or-nothing solution itself
+            for c in self.traffic_classes:
+                self.step_direction[c.__id__] = c._aon_results
 
     def calculate_conjugate_stepsize(self):
         self.vdf.apply_derivative(
             self.vdf_der, self.fw_total_flow, self.capacity, self.free_flow_tt, *self.vdf_parameters, self.cores
         )
-        numerator = 0.0
-        denominator = 0.0
-        prev_dir_minus_current_sol = {}
-        aon_minus_current_sol = {}
-        aon_minus_prev_dir = {}
-
-        for c in self.traffic_classes:
-            stp_dir = self.step_direction[c.__id__]
-            prev_dir_minus_current_sol[c.__id__] = np.sum(stp_dir.link_loads[:, :] - c.results.link_loads[:, :], axis=1)
-            aon_minus_current_sol[c.__id__] = np.sum(
-                c._aon_results.link_loads[:, :] - c.results.link_loads[:, :], axis=1
+        # Products of sums over all classes, so the differences of each class are added up link by link
+        for i, c in enumerate(self.traffic_classes):
+            conjugate_differences(
+                self.direction_differences,
+                c.results.link_loads,
+                c._aon_results.link_loads,
+                self.step_direction[c.__id__].link_loads,
+                i == 0,
+                self.cores,
             )
-            aon_minus_prev_dir[c.__id__] = np.sum(c._aon_results.link_loads[:, :] - stp_dir.link_loads[:, :], axis=1)
-
-        for c_0 in self.traffic_classes:
-            for c_1 in self.traffic_classes:
-                numerator += prev_dir_minus_current_sol[c_0.__id__] * aon_minus_current_sol[c_1.__id__]
-                denominator += prev_dir_minus_current_sol[c_0.__id__] * aon_minus_prev_dir[c_1.__id__]
-
-        numerator = np.sum(numerator * self.vdf_der)
-        denominator = np.sum(denominator * self.vdf_der)
+        numerator, denominator = conjugate_scalars(self.direction_differences, self.vdf_der, self.cores)
 
         alpha = numerator / denominator
         if alpha < 0.0:
@@ -180,51 +156,25 @@ class LinearApproximation(WorkerThread):
         self.vdf.apply_derivative(
             self.vdf_der, self.fw_total_flow, self.capacity, self.free_flow_tt, *self.vdf_parameters, self.cores
         )
-        mu_numerator = 0.0
-        mu_denominator = 0.0
-        nu_nom = 0.0
-        nu_denom = 0.0
-
-        w_ = {}
-        x_ = {}
-        y_ = {}
-        z_ = {}
-
-        for c in self.traffic_classes:
-            x_[c.__id__] = np.sum(
-                (
-                    self.step_direction[c.__id__].link_loads[:, :] * self.stepsize
-                    + self.previous_step_direction[c.__id__].link_loads[:, :] * (1.0 - self.stepsize)
-                    - c.results.link_loads[:, :]
-                ),
-                axis=1,
-            )
-
-            y_[c.__id__] = np.sum(c._aon_results.link_loads[:, :] - c.results.link_loads[:, :], axis=1)
-            z_[c.__id__] = np.sum(self.step_direction[c.__id__].link_loads[:, :] - c.results.link_loads[:, :], axis=1)
-
-            w_[c.__id__] = np.sum(
-                self.previous_step_direction[c.__id__].link_loads - self.step_direction[c.__id__].link_loads[:, :],
-                axis=1,
+        for i, c in enumerate(self.traffic_classes):
+            biconjugate_differences(
+                self.direction_differences,
+                c.results.link_loads,
+                c._aon_results.link_loads,
+                self.step_direction[c.__id__].link_loads,
+                self.previous_step_direction[c.__id__].link_loads,
+                i == 0,
+                self.cores,
             )
-
-        for c_0 in self.traffic_classes:
-            for c_1 in self.traffic_classes:
-                mu_numerator += x_[c_0.__id__] * y_[c_1.__id__]
-                mu_denominator += x_[c_0.__id__] * w_[c_1.__id__]
-                nu_nom += z_[c_0.__id__] * y_[c_1.__id__]
-                nu_denom += z_[c_0.__id__] * z_[c_1.__id__]
-
-        mu_numerator = np.sum(mu_numerator * self.vdf_der)
-        mu_denominator = np.sum(mu_denominator * self.vdf_der)
+        mu_numerator, mu_denominator, nu_nom, nu_denom = biconjugate_scalars(
+            self.direction_differences, self.vdf_der, self.stepsize, self.cores
+        )
         if mu_denominator == 0.0:
             mu = 0.0
         else:
             mu = -mu_numerator / mu_denominator
             mu = max(0.0, mu)
 
-        nu_nom = np.sum(nu_nom * self.vdf_der)
-        nu_denom = np.sum(nu_denom * self.vdf_der)
         if nu_denom == 0.0:
             nu = 0.0
         else:
@@ -248,10 +198,12 @@ class LinearApproximation(WorkerThread):
             for c in self.traffic_classes:
                 aon_res = c._aon_results
                 stp_dir_res = self.step_direction[c.__id__]
-                copy_two_dimensions(stp_dir_res.link_loads, aon_res.link_loads, self.cores)
-                stp_dir_res.total_flows()
-                if c.results.num_skims > 0:
-                    copy_three_dimensions(stp_dir_res.skims.matrix_view, aon_res.skims.matrix_view, self.cores)
+                if stp_dir_res is not aon_res:
+                    # The AoN results are overwritten on the next iteration, so CFW and BFW need their own copy
+                    copy_two_dimensions(stp_dir_res.link_loads, aon_res.link_loads, self.cores)
+                    stp_dir_res.total_flows()
+                    if c.results.num_skims > 0 and self.blending_skims:
+                        copy_three_dimensions(stp_dir_res.skims.matrix_view, aon_res.skims.matrix_view, self.cores)
                 sd_flows.append(aon_res.total_link_loads)
 
         # 3rd iteration is cfw. also, if we had to reset direction search we need a cfw step before bfw
@@ -259,22 +211,25 @@ class LinearApproximation(WorkerThread):
             self.do_conjugate_step = False
             self.calculate_conjugate_stepsize()
             for c in self.traffic_classes:
-                sdr = self.step_direction[c.__id__]
-                pre_previous = self.pre_previous_step_direction[c.__id__]
-                copy_two_dimensions(pre_previous.link_loads, sdr.link_loads, self.cores)
-                pre_previous.total_flows()
-                if c.results.num_skims > 0:
-                    copy_three_dimensions(pre_previous.skims.matrix_view, sdr.skims.matrix_view, self.cores)
+                # The new direction is written over the pre-previous one, which then keeps the current direction
+                sdr = self.pre_previous_step_direction[c.__id__]
+                pre_previous = self.step_direction[c.__id__]
+                self.step_direction[c.__id__] = sdr
+                self.pre_previous_step_direction[c.__id__] = pre_previous
 
                 linear_combination(
-                    sdr.link_loads, c._aon_results.link_loads, sdr.link_loads, self.conjugate_stepsize, self.cores
+                    sdr.link_loads,
+                    c._aon_results.link_loads,
+                    pre_previous.link_loads,
+                    self.conjugate_stepsize,
+                    self.cores,
                 )
 
-                if c.results.num_skims > 0:
+                if c.results.num_skims > 0 and self.blending_skims:
                     linear_combination_skims(
                         sdr.skims.matrix_view,
                         c._aon_results.skims.matrix_view,
-                        sdr.skims.matrix_view,
+                        pre_previous.skims.matrix_view,
                         self.conjugate_stepsize,
                         self.cores,
                     )
@@ -284,19 +239,15 @@ class LinearApproximation(WorkerThread):
         # biconjugate
         else:
             self.calculate_biconjugate_direction()
-            # deep copy because we overwrite step_direction but need it on next iteration
+            # The new direction is written over the pre-previous one, the current one becomes the previous one and
+            # the old previous direction is only kept as a buffer for the next iteration
             for c in self.traffic_classes:
                 ppst = self.pre_previous_step_direction[c.__id__]  # type: AssignmentResults
                 prev_stp_dir = self.previous_step_direction[c.__id__]  # type: AssignmentResults
                 stp_dir = self.step_direction[c.__id__]  # type: AssignmentResults
 
-                copy_two_dimensions(ppst.link_loads, stp_dir.link_loads, self.cores)
-                ppst.total_flows()
-                if c.results.num_skims > 0:
-                    copy_three_dimensions(ppst.skims.matrix_view, stp_dir.skims.matrix_view, self.cores)
-
                 triple_linear_combination(
-                    stp_dir.link_loads,
+                    ppst.link_loads,
                     c._aon_results.link_loads,
                     stp_dir.link_loads,
                     prev_stp_dir.link_loads,
@@ -304,10 +255,10 @@ class LinearApproximation(WorkerThread):
                     self.cores,
                 )
 
-                stp_dir.total_flows()
-                if c.results.num_skims > 0:
+                ppst.total_flows()
+                if c.results.num_skims > 0 and self.blending_skims:
                     triple_linear_combination_skims(
-                        stp_dir.skims.matrix_view,
+                        ppst.skims.matrix_view,
                         c._aon_results.skims.matrix_view,
                         stp_dir.skims.matrix_view,
                         prev_stp_dir.skims.matrix_view,
@@ -315,15 +266,35 @@ class LinearApproximation(WorkerThread):
                         self.cores,
                     )
 
-                sd_flows.append(np.sum(stp_dir.link_loads, axis=1))
+                sd_flows.append(ppst.total_link_loads)
 
-                copy_two_dimensions(prev_stp_dir.link_loads, ppst.link_loads, self.cores)
-                prev_stp_dir.total_flows()
-                if c.results.num_skims > 0:
-                    copy_three_dimensions(prev_stp_dir.skims.matrix_view, ppst.skims.matrix_view, self.cores)
+                self.step_direction[c.__id__] = ppst
+                self.previous_step_direction[c.__id__] = stp_dir
+                self.pre_previous_step_direction[c.__id__] = prev_stp_dir
 
         self.step_direction_flow = np.sum(sd_flows, axis=0)
 
+    def __start_skim_blending(self):
+        """Starts blending skims from the ones of the current all-or-nothing assignment"""
+        self.blending_skims = True
+        for c in self.traffic_classes:
+            if c.results.num_skims == 0:
+                continue
+            aon_skims = c._aon_results.skims.matrix_view
+            copy_three_dimensions(c.results.skims.matrix_view, aon_skims, self.cores)
+            if self.iter == 1:
+                continue
+            # Directions that are read when computing the next one
+            for directions in [self.step_direction, self.previous_step_direction]:
+                if c.__id__ in directions and directions[c.__id__] is not c._aon_results:
+                    copy_three_dimensions(directions[c.__id__].skims.matrix_view, aon_skims, self.cores)
+
+    def __skims_blended_now(self):
+        """Whether skims are blended at the current iteration"""
+        if self.skim_blending_iterations is None:
+            return True
+        return self.iter > self.max_iter - self.skim_blending_iterations
+
     def doWork(self):
         self.execute()
 
@@ -369,17 +340,20 @@ class LinearApproximation(WorkerThread):
 
             flows = []
             if self.iter == 1:
+                self.blending_skims = False
+                if self.__skims_blended_now():
+                    self.__start_skim_blending()
                 for c in self.traffic_classes:
                     copy_two_dimensions(c.results.link_loads, c._aon_results.link_loads, self.cores)
                     c.results.total_flows()
-                    if c.results.num_skims > 0:
-                        copy_three_dimensions(c.results.skims.matrix_view, c._aon_results.skims.matrix_view, self.cores)
                     flows.append(c.results.total_link_loads)
 
                 if self.algorithm == "all-or-nothing":
                     break
 
             else:
+                if not self.blending_skims and self.__skims_blended_now():
+                    self.__start_skim_blending()
                 self.__calculate_step_direction()
                 self.calculate_stepsize()
                 for c in self.traffic_classes:
@@ -389,7 +363,7 @@ class LinearApproximation(WorkerThread):
                         cls_res.link_loads, stp_dir.link_loads, cls_res.link_loads, self.stepsize, self.cores
                     )
 
-                    if cls_res.num_skims > 0:
+                    if cls_res.num_skims > 0 and self.blending_skims:
                         linear_combination_skims(
                             cls_res.skims.matrix_view,
                             stp_dir.skims.matrix_view,
@@ -440,6 +414,9 @@ class LinearApproximation(WorkerThread):
                 c.graph.skims[:, idx] = self.congested_time[:]
 
         for c in self.traffic_classes:
+            if c.results.num_skims > 0 and not self.blending_skims:
+                # Converged before skims started to be blended, so we keep those of the last all-or-nothing
+                copy_three_dimensions(c.results.skims.matrix_view, c._aon_results.skims.matrix_view, self.cores)
             c.results.link_loads /= c.pce
             c.results.total_flows()
 
@@ -451,18 +428,6 @@ class LinearApproximation(WorkerThread):
             self.equilibration.emit(["iterations", self.iter])
             self.equilibration.emit(["finished_threaded_procedure"])
 
-    def __derivative_of_objective_stepsize_dependent(self, stepsize, const_term):
-        """The stepsize-dependent part of the derivative of the objective function. If fixed costs are defined,
-        the corresponding contribution needs to be passed in"""
-        x = np.zeros_like(self.fw_total_flow)
-        linear_combination_1d(x, self.step_direction_flow, self.fw_total_flow, stepsize, self.cores)
-        # x = self.fw_total_flow + stepsize * (self.step_direction_flow - self.fw_total_flow)
-        self.vdf.apply_vdf(self.congested_value, x, self.capacity, self.free_flow_tt, *self.vdf_parameters, self.cores)
-        link_cost_term = sum_a_times_b_minus_c(
-            self.congested_value, self.step_direction_flow, self.fw_total_flow, self.cores
-        )
-        return link_cost_term + const_term
-
     def __derivative_of_objective_stepsize_independent(self):
         """The part of the derivative of the objective function that does not dependent on stepsize. Non-zero
         only for fixed cost contributions."""
@@ -482,37 +447,40 @@ class LinearApproximation(WorkerThread):
             return
 
         class_specific_term = self.__derivative_of_objective_stepsize_independent()
-        derivative_of_objective = partial(
-            self.__derivative_of_objective_stepsize_dependent, const_term=class_specific_term
-        )
 
         x_tol = max(min(1e-6, self.rgap * 1e-5), 1e-12)
 
+        stepsize, derivative_at_zero, derivative_at_one, converged = line_search(
+            self.vdf.function,
+            self.step_direction_flow,
+            self.fw_total_flow,
+            self.capacity,
+            self.free_flow_tt,
+            *self.vdf_parameters,
+            class_specific_term,
+            x_tol,
+            self.line_search_candidates,
+            self.cores,
+        )
+
         try:
-            if recent_scipy:
-                min_res = root_scalar(derivative_of_objective, bracket=[0, 1], xtol=x_tol)
-                self.stepsize = min_res.root
-                if not min_res.converged:
-                    logger.warning("Descent direction stepsize finder has not converged")
-            else:
-                min_res = root_scalar(derivative_of_objective, 1 / self.iter, xtol=x_tol)
-                if not min_res.success:
-                    logger.warning("Descent direction stepsize finder has not converged")
-                self.stepsize = min_res.x[0]
-                if self.stepsize <= 0.0 or self.stepsize >= 1.0:
-                    raise ValueError("wrong root")
+            if np.isnan(stepsize):
+                raise ValueError("Derivatives of the objective function at 0 and 1 have the same sign")
+            if not converged:
+                logger.warning("Descent direction stepsize finder has not converged")
+            self.stepsize = stepsize
 
             self.conjugate_failed = False
 
         except ValueError as e:
-            # We can have iterations where the objective function is not *strictly* convex, but the scipy method cannot deal
-            # with this. Stepsize is then either given by 1 or 0, depending on where the objective function is smaller.
-            # However, using zero would mean the overall solution would not get updated, and therefore we assert the stepsize
-            # in order to add a small fraction of the AoN. A heuristic value equal to the corresponding MSA step size
-            # seems to work well in practice.
+            # We can have iterations where the objective function is not *strictly* convex, but the line search
+            # cannot deal with this. Stepsize is then either given by 1 or 0, depending on where the objective function
+            # is smaller. However, using zero would mean the overall solution would not get updated, and therefore we
+            # assert the stepsize in order to add a small fraction of the AoN. A heuristic value equal to the
+            # corresponding MSA step size seems to work well in practice.
             if self.algorithm == "bfw":
                 self.betas.fill(-1)
-            if derivative_of_objective(0.0) < derivative_of_objective(1.0):
+            if derivative_at_zero < derivative_at_one:
                 if self.algorithm == "frank-wolfe" or self.conjugate_failed:
                     tiny_step = 1e-2 / self.iter  # use a fraction of the MSA stepsize. We observe that using 1e-4
                     # works well in practice, however for a large number of iterations this might be too much so
@@ -0,0 +1,33 @@
+from libc.math cimport pow, sqrt
+
+# Scalar versions of the volume-delay functions, shared by the assignment algorithms that update links one at a time
+cdef int BPR_VDF = 0
+cdef int CONICAL_VDF = 1
+
+
+cdef inline void link_vdf(int vdf,
+                          double flow,
+                          double capacity,
+                          double fftime,
+                          double alpha,
+                          double beta,
+                          double *time,
+                          double *derivative) nogil:
+    # Congested time and its derivative for a single link, with the same conventions as the vectorized functions
+    cdef double ratio
+    if flow <= 0:
+        time[0] = fftime
+        if vdf == BPR_VDF:
+            derivative[0] = 0
+            return
+        flow = 0
+    if vdf == BPR_VDF:
+        ratio = flow / capacity
+        time[0] = fftime * (1 + alpha * pow(ratio, beta))
+        derivative[0] = fftime * alpha * beta * pow(ratio, beta - 1) / capacity
+    else:
+        ratio = 1 - flow / capacity
+        if flow > 0:
+            time[0] = fftime * (sqrt(pow(alpha, 2) * pow(ratio, 2) + pow(beta, 2)) - alpha * ratio - beta + 2)
+        derivative[0] = fftime * ((alpha / capacity) - (pow(alpha, 2) * ratio) / (
+                capacity * sqrt(pow(alpha, 2) * pow(ratio, 2) + pow(beta, 2))))
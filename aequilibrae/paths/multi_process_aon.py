@@ -0,0 +1,298 @@
+import atexit
+import mmap
+import multiprocessing as mp
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from aequilibrae.paths.multi_threaded_aon import MultiThreadedAoN
+from aequilibrae import logger
+
+try:
+    from aequilibrae.paths.AoN import assign_origin_indices, sum_axis0
+except ImportError as ie:
+    logger.warning(f"Could not import procedures from the binary. {ie.args}")
+
+# Worker processes are expensive to start, so they are kept alive between assignments (and iterations)
+__pools = {}
+
+# Assignments with arrays shared with the workers, which are released together with the pools
+_shared_assignments = weakref.WeakSet()
+
+
+def _process_pool(processes: int) -> ProcessPoolExecutor:
+    if processes not in __pools:
+        # Forking a process that already started OpenMP threads is not safe, so we always spawn workers
+        __pools[processes] = ProcessPoolExecutor(max_workers=processes, mp_context=mp.get_context("spawn"))
+    return __pools[processes]
+
+
+def close_process_pools() -> None:
+    """Shuts down the worker processes kept alive between multi-process assignments
+
+    Arrays shared with the workers are released as well. Pools and arrays are re-created the next time they are
+    needed. This is also called when the interpreter exits"""
+    for aon in list(_shared_assignments):
+        aon.close()
+    while __pools:
+        _, pool = __pools.popitem()
+        pool.shutdown(wait=True)
+
+
+atexit.register(close_process_pools)
+
+
+class SharedArray:
+    """NumPy array living in shared memory, which can be re-opened by other processes from its descriptor"""
+
+    def __init__(self, array: np.ndarray = None, descriptor=None):
+        if descriptor is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            self.array = np.ndarray(array.shape, dtype=array.dtype, buffer=self.shm.buf)
+            self.array[...] = array
+            self.owner = True
+        else:
+            _, name, shape, dtype = descriptor
+            # Workers share the resource tracker of the parent, which is the only process that destroys the block
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=self.shm.buf)
+            self.owner = False
+
+    @property
+    def descriptor(self):
+        return "shared", self.shm.name, self.array.shape, self.array.dtype.str
+
+    def close(self):
+        del self.array
+        try:
+            self.shm.close()
+        except BufferError:
+            # Some other view of the array is still alive, and the memory is only unmapped once it is gone
+            pass
+        if self.owner:
+            self.shm.unlink()
+
+
+class MappedArray:
+    """View of a memory-mapped file (e.g. the cores of an AequilibraE matrix), re-opened by other processes"""
+
+    def __init__(self, descriptor):
+        _, file_name, position, size, shape, strides, dtype, mode = descriptor
+        self.buffer = np.memmap(file_name, dtype=np.uint8, mode=mode, offset=position, shape=size)
+        self.array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=self.buffer, strides=strides)
+
+    @staticmethod
+    def describe(array: np.ndarray, writable: bool):
+        """Returns the descriptor of the file region behind a memory-mapped array, or None if there is none
+
+        Files mapped copy-on-write are not shared, as changes made to them by this process are not in the file"""
+        root = array
+        while isinstance(root.base, np.ndarray):
+            root = root.base
+        if not isinstance(root, np.memmap) or not isinstance(root.base, mmap.mmap) or root.filename is None:
+            return None
+        if root.mode not in (["r+", "w+"] if writable else ["r", "r+", "w+"]):
+            return None
+        if array.size == 0 or min(array.strides) < 0:
+            return None
+
+        low, high = np.byte_bounds(array)
+        position = root.offset + low - np.byte_bounds(root)[0]
+        # Workers map read-only data copy-on-write, as the binaries need writable buffers
+        mode = "r+" if writable else "c"
+        return "mapped", root.filename, position, high - low, array.shape, array.strides, array.dtype.str, mode
+
+    def close(self):
+        del self.array
+        del self.buffer
+
+
+def _open(descriptor):
+    return SharedArray(descriptor=descriptor) if descriptor[0] == "shared" else MappedArray(descriptor)
+
+
+class MultiProcessAoN:
+    """All-or-nothing assignment spread across worker processes
+
+    Graph arrays, demand and outputs are shared with the workers, so nothing but descriptors and the list of origins
+    is sent to each process. Origins are dealt round-robin to the workers, each of which runs the OpenMP origin loop
+    with *threads* threads and returns its link loads through its own slot of a shared array. Slots are added
+    together at the end.
+
+    Shared memory is allocated the first time it is needed and reused by later calls (e.g. equilibrium iterations),
+    which only refresh link costs and closures. Demand and skims held in memory-mapped AequilibraE matrices are not
+    copied at all, as the workers map the matrix files themselves and write skims straight into them. Demand held in
+    memory (e.g. from OMX files) is copied to shared memory once for each buffer it lives in. The *no_path* array of
+    the results is moved to shared memory, where workers write to it directly.
+
+    Everything is released by :meth:`close` or :func:`close_process_pools`.
+    """
+
+    def __init__(self, processes: int, threads: int = 1):
+        self.processes = processes
+        self.threads = threads
+        self.shared = {}
+        self.__graph_id = None
+        self.__demand_source = None
+        self.__results = None
+        _shared_assignments.add(self)
+
+    def execute(self, origins: np.ndarray, matrix, graph, results) -> np.ndarray:
+        """Assigns all origins and returns the link loads on the compact graph (compact links + 1 x classes)"""
+        classes = results.classes["number"]
+        num_skims = len(graph.skim_fields)
+        zones = graph.num_zones
+
+        origin_indices = np.array(graph.compact_nodes_to_indices[origins], np.int64)
+        blocks = [origin_indices[i:: self.processes] for i in range(self.processes)]
+        blocks = [block for block in blocks if block.shape[0]]
+        if not blocks:
+            return np.zeros((results.compact_links + 1, classes))
+
+        if self.__graph_id != graph.__id__:
+            # Topology only changes with the graph
+            self.__share("fs", graph.compact_fs)
+            self.__share("ids", graph.compact_graph.id.values)
+            self.__graph_id = graph.__id__
+        self.__share("cost", graph.compact_cost)
+        self.__share("b_nodes", graph.closed_b_nodes(results.closed_links))
+        self.__share("graph_skims", graph.compact_skims if num_skims else np.zeros((1, 1), graph.compact_cost.dtype))
+        self.__share_no_path(results)
+        loads = self.__allocate("loads", (self.processes, results.compact_links + 1, classes), np.float64)
+        descriptors = {key: self.shared[key].descriptor for key in ["fs", "ids", "cost", "b_nodes", "graph_skims",
+                                                                    "no_path", "loads"]}
+
+        descriptors["demand"] = MappedArray.describe(matrix.matrix_view, writable=False)
+        if descriptors["demand"] is None:
+            source = (matrix.matrix_view.__array_interface__["data"][0], matrix.matrix_view.shape)
+            if self.__demand_source != source or "demand" not in self.shared:
+                self.__share("demand", matrix.matrix_view)
+                self.__demand_source = source
+            descriptors["demand"] = self.shared["demand"].descriptor
+
+        skims = results.skims.matrix_view if num_skims else None
+        descriptors["skims"] = None if skims is None else MappedArray.describe(skims, writable=True)
+        if descriptors["skims"] is None:
+            shape = (zones, zones, num_skims) if num_skims else (zones, 1, 1)
+            descriptors["skims"] = self.__allocate("skims", shape, np.float64).descriptor
+
+        settings = {
+            "descriptors": descriptors,
+            "heap": graph.heaps_available.index(graph.heap_type),
+            "nodes": graph.compact_num_nodes,
+            "zones": zones,
+            "num_skims": num_skims,
+            "block_flows_through_centroids": int(graph.block_centroid_flows),
+            "classes": classes,
+            "links": results.compact_links,
+            "threads": self.threads,
+            "buffers": results.load_buffers,
+        }
+        pool = _process_pool(self.processes)
+        jobs = [pool.submit(_assign_block, block, slot, settings) for slot, block in enumerate(blocks)]
+        for job in jobs:
+            job.result()
+
+        if num_skims and descriptors["skims"][0] == "shared":
+            results.skims.matrix_view[origin_indices, :, :] = self.shared["skims"].array[origin_indices, :, :]
+        link_loads = np.zeros(loads.array.shape[1:])
+        sum_axis0(link_loads, loads.array[: len(blocks), :, :], results.cores)
+        return link_loads
+
+    def close(self) -> None:
+        """Releases all memory shared with the workers"""
+        results = None if self.__results is None else self.__results()
+        if results is not None and "no_path" in self.shared and results.no_path is self.shared["no_path"].array:
+            results.no_path = np.array(results.no_path)
+        for arr in self.shared.values():
+            arr.close()
+        self.shared = {}
+        self.__graph_id = None
+        self.__demand_source = None
+        self.__results = None
+
+    def __del__(self):
+        # Results dropped without closing their shared arrays would otherwise leak them until the interpreter exits
+        self.close()
+
+    def __share(self, name: str, array: np.ndarray) -> SharedArray:
+        # Copies an array to shared memory, re-using the block it was copied to before whenever possible
+        current = self.shared.get(name)
+        if current is not None and current.array.shape == array.shape and current.array.dtype == array.dtype:
+            current.array[...] = array
+            return current
+        if current is not None:
+            current.close()
+        self.shared[name] = SharedArray(np.ascontiguousarray(array))
+        return self.shared[name]
+
+    def __allocate(self, name: str, shape: tuple, dtype) -> SharedArray:
+        # Shared block for an output, which workers overwrite
+        current = self.shared.get(name)
+        if current is not None and current.array.shape == shape and current.array.dtype == dtype:
+            return current
+        return self.__share(name, np.zeros(shape, dtype))
+
+    def __share_no_path(self, results):
+        # Results keep their no_path array in shared memory from now on, so workers write to it directly
+        current = self.shared.get("no_path")
+        if current is not None and results.no_path is current.array:
+            return
+        previous = None if self.__results is None else self.__results()
+        if previous is not None and current is not None and previous.no_path is current.array:
+            previous.no_path = np.array(previous.no_path)
+        if current is not None:
+            current.close()
+            del self.shared["no_path"]
+        results.no_path = self.__share("no_path", results.no_path).array
+        self.__results = weakref.ref(results)
+
+
+def _assign_block(origin_indices: np.ndarray, slot: int, settings: dict) -> None:
+    # Runs in the worker processes
+    shared = {key: _open(val) for key, val in settings["descriptors"].items()}
+    try:
+        arr = {key: val.array for key, val in shared.items()}
+        aux_res = MultiThreadedAoN()
+        aux_res.prepare_arrays(
+            arr["b_nodes"],
+            settings["zones"],
+            settings["nodes"],
+            settings["links"],
+            settings["classes"],
+            settings["num_skims"],
+            settings["threads"],
+            settings["buffers"],
+            arr["cost"].dtype,
+        )
+
+        assign_origin_indices(
+            origin_indices,
+            settings["heap"],
+            settings["nodes"],
+            settings["zones"],
+            settings["num_skims"],
+            settings["block_flows_through_centroids"],
+            arr["demand"],
+            arr["fs"],
+            arr["cost"],
+            arr["ids"],
+            arr["b_nodes"],
+            arr["graph_skims"],
+            arr["skims"],
+            arr["no_path"],
+            aux_res.predecessors,
+            aux_res.reached_first,
+            aux_res.connectors,
+            aux_res.temp_link_loads,
+            aux_res.temp_node_loads,
+            aux_res.temp_b_nodes,
+            aux_res.destinations,
+            aux_res.skim_slots,
+            settings["threads"],
+        )
+        sum_axis0(arr["loads"][slot, :, :], aux_res.temp_link_loads, settings["threads"])
+        del arr
+    finally:
+        for val in shared.values():
+            val.close()
@@ -5,32 +5,51 @@ class MultiThreadedAoN:
     def __init__(self):
         # The predecessors for each node in the graph
         self.predecessors = np.array([])
-        # holds the skims for all nodes in the network (during path finding)
-        self.temporary_skims = np.array([])
+        # Position of the skims of each node in the paths to centroids (during skimming)
+        self.skim_slots = np.array([])
         # Keeps the order in which the nodes were reached for the cascading network loading
         self.reached_first = np.array([])
         # The previous link for each node in the tree
         self.connectors = np.array([])
-        # Temporary results for assignment. Necessary for parallelization
+        # Temporary results for assignment (buffers x links x classes). Threads share buffers if there are fewer of them
         self.temp_link_loads = np.array([])
         # Temporary nodes for assignment. Necessary for cascading
         self.temp_node_loads = np.array([])
+        # B nodes of the graph used in path computation, with any links closed for the class
+        self.b_nodes = np.array([])
         #  holds the b_nodes in case of flows through centroid connectors are blocked
         self.temp_b_nodes = np.array([])
+        # Flags the destinations each thread needs to reach before it can stop searching
+        self.destinations = np.array([])
 
     # In case we want to do by hand, we can prepare each method individually
     def prepare(self, graph, results):
-        itype = graph.default_types("int")
-        ftype = graph.default_types("float")
-        self.predecessors = np.zeros((results.compact_nodes, results.cores), dtype=itype)
-        if results.num_skims > 0:
-            self.temporary_skims = np.zeros((results.compact_nodes, results.num_skims, results.cores), dtype=ftype)
-        else:
-            self.temporary_skims = np.zeros((1, 1, results.cores), dtype=ftype)
-        self.reached_first = np.zeros((results.compact_nodes, results.cores), dtype=itype)
-        self.connectors = np.zeros((results.compact_nodes, results.cores), dtype=itype)
-        self.temp_link_loads = np.zeros((results.links + 1, results.classes["number"], results.cores), dtype=ftype)
-        self.temp_node_loads = np.zeros((results.compact_nodes, results.classes["number"], results.cores), dtype=ftype)
-        self.temp_b_nodes = np.zeros((graph.compact_graph.b_node.shape[0], results.cores), dtype=itype)
-        for i in range(results.cores):
-            self.temp_b_nodes[:, i] = graph.compact_graph.b_node.values[:]
+        self.prepare_arrays(
+            graph.closed_b_nodes(results.closed_links),
+            graph.num_zones,
+            results.compact_nodes,
+            results.compact_links,
+            results.classes["number"],
+            results.num_skims,
+            results.cores,
+            results.load_buffers,
+            graph.compact_cost.dtype,
+        )
+
+    def prepare_arrays(self, b_nodes: np.ndarray, zones: int, nodes: int, links: int, classes: int, num_skims: int,
+                       cores: int, buffers: int = 0, float_type=np.float64):
+        """Allocates the scratch arrays from their dimensions only, for processes that do not hold a graph"""
+        buffers = cores if buffers < 1 else min(buffers, cores)
+        itype = np.int64
+        # Loads are kept in the precision of the graph costs, while skims are always cascaded in double precision
+        self.predecessors = np.zeros((nodes, cores), dtype=itype)
+        self.skim_slots = np.zeros((nodes if num_skims > 0 else 1, cores), dtype=itype)
+        self.reached_first = np.zeros((nodes, cores), dtype=itype)
+        self.connectors = np.zeros((nodes, cores), dtype=itype)
+        self.temp_link_loads = np.zeros((buffers, links + 1, classes), dtype=float_type)
+        self.temp_node_loads = np.zeros((cores, nodes, classes), dtype=float_type)
+        self.b_nodes = b_nodes
+        self.temp_b_nodes = np.zeros((b_nodes.shape[0], cores), dtype=itype)
+        for i in range(cores):
+            self.temp_b_nodes[:, i] = b_nodes[:]
+        self.destinations = np.zeros((zones, cores), dtype=itype)
@@ -5,24 +5,33 @@ class MultiThreadedNetworkSkimming:
     def __init__(self):
         # The predecessors for each node in the graph
         self.predecessors = np.array([], np.int64)
-        # holds the skims for all nodes in the network (during path finding)
-        self.temporary_skims = np.array([], np.int64)
+        # Position of the skims of each node in the paths to centroids (during skimming)
+        self.skim_slots = np.array([], np.int64)
         # Keeps the order in which the nodes were reached for the cascading network loading
         self.reached_first = np.array([], np.int64)
         # The previous link for each node in the tree
         self.connectors = np.array([], np.int64)
         #  holds the b_nodes in case of flows through centroid connectors are blocked
         self.temp_b_nodes = np.array([], np.int64)
+        # Flags the destinations we need to reach before we can stop searching. Shared by all threads
+        self.destinations = np.array([], np.int64)
+        self.num_destinations = 0
 
     # In case we want to do by hand, we can prepare each method individually
-    def prepare(self, graph, results):
+    def prepare(self, graph, results, destinations=None):
         itype = graph.default_types("int")
-        ftype = graph.default_types("float")
         self.predecessors = np.zeros((results.nodes, results.cores), dtype=itype)
-        self.temporary_skims = np.zeros((results.nodes, results.num_skims, results.cores), dtype=ftype)
+        self.skim_slots = np.zeros((results.nodes, results.cores), dtype=itype)
         self.reached_first = np.zeros((results.nodes, results.cores), dtype=itype)
         self.connectors = np.zeros((results.nodes, results.cores), dtype=itype)
-        self.temp_b_nodes = np.zeros((graph.compact_graph.b_node.values.shape[0], results.cores), dtype=itype)
+        self.temp_b_nodes = np.zeros((graph.compact_b_nodes.shape[0], results.cores), dtype=itype)
 
         for i in range(results.cores):
-            self.temp_b_nodes[:, i] = graph.compact_graph.b_node.values[:]
+            self.temp_b_nodes[:, i] = graph.compact_b_nodes[:]
+
+        self.destinations = np.zeros(graph.num_zones, dtype=itype)
+        if destinations is None:
+            self.destinations[:] = 1
+        else:
+            self.destinations[graph.compact_nodes_to_indices[destinations]] = 1
+        self.num_destinations = int(self.destinations.sum())
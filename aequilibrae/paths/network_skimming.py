@@ -1,7 +1,8 @@
 import sys
-from os.path import join, isfile
+from os.path import join, isfile, basename, dirname, abspath
 import threading
 import importlib.util as iutil
+import numpy as np
 from uuid import uuid4
 from multiprocessing.dummy import Pool as ThreadPool
 from datetime import datetime
@@ -12,7 +13,7 @@ from aequilibrae.utils import WorkerThread
 from aequilibrae import logger
 
 try:
-    from aequilibrae.paths.AoN import skimming_single_origin
+    from aequilibrae.paths.AoN import skimming_single_origin, many_to_many_skims
 except ImportError as ie:
     logger.warning(f"Could not import procedures from the binary. {ie.args}")
 
@@ -59,16 +60,38 @@ class NetworkSkimming(WorkerThread):
         # Or specify the AequilibraE's matrix file format
         skm.save_to_project('skimming result', 'aem')
 
+        # If we only care about a few destinations, the path search stops as soon as they are all reached.
+        # Skims to all other centroids may be left as infinite
+        skm = NetworkSkimming(graph, destinations=[1, 5, 12])
+        skm.execute()
+
+        # For repeated skimming on the same network, a contraction hierarchy is much faster
+        graph.build_contraction_hierarchy()
+        skm = NetworkSkimming(graph)
+        skm.execute()
+
+        # Costs and skims between any nodes in the graph (e.g. transit stops), as a compact origins x destinations array
+        skm = NetworkSkimming(graph)
+        costs, skims = skm.many_to_many(origins=[1, 2, 3], destinations=[101, 102, 250, 1800])
+
+        # Skims too large to hold in memory can be streamed to a file while they are computed, one block of
+        # origins at a time. Files in the project's matrices folder can still be saved to the project
+        skm = NetworkSkimming(graph)
+        skm.results.set_output(join(Matrices().fldr, 'large_skims.omx'), block_size=100)
+        skm.execute()
+        skm.save_to_project('large skims')
+
         project.close()
     """
 
     if pyqt:
         skimming = pyqtSignal(object)
 
-    def __init__(self, graph, origins=None):
+    def __init__(self, graph, origins=None, destinations=None):
         WorkerThread.__init__(self, None)
 
         self.origins = origins
+        self.destinations = destinations
         self.graph = graph
         self.results = SkimResults()
         self.aux_res = MultiThreadedNetworkSkimming()
@@ -85,22 +108,44 @@ class NetworkSkimming(WorkerThread):
         if pyqt:
             self.skimming.emit(["zones finalized", 0])
 
+        if self.destinations is not None:
+            self.destinations = np.array(self.destinations, dtype=self.graph.default_types("int"))
+            if not np.isin(self.destinations, self.graph.centroids).all():
+                raise ValueError("All destinations need to be centroids in the graph")
+
+        if self.origins is not None:
+            self.origins = np.array(self.origins, dtype=self.graph.default_types("int"))
+            if not np.isin(self.origins, self.graph.centroids).all():
+                raise ValueError("All origins need to be centroids in the graph. Use many_to_many for other nodes")
+
         self.results.prepare(self.graph)
+        if self.graph.contraction_hierarchy is not None:
+            self.__skim_with_hierarchy()
+            return
+
         self.aux_res = MultiThreadedNetworkSkimming()
-        self.aux_res.prepare(self.graph, self.results)
+        self.aux_res.prepare(self.graph, self.results, self.destinations)
 
-        pool = ThreadPool(self.results.cores)
-        all_threads = {"count": 0}
-        for orig in list(self.graph.centroids):
+        origins = []
+        for orig in list(self.graph.centroids if self.origins is None else self.origins):
             i = int(self.graph.nodes_to_indices[orig])
             if i >= self.graph.nodes_to_indices.shape[0]:
                 self.report.append(f"Centroid {orig} is beyond the domain of the graph")
             elif self.graph.fs[int(i)] == self.graph.fs[int(i) + 1]:
                 self.report.append(f"Centroid {orig} does not exist in the graph")
             else:
-                pool.apply_async(self.__func_skim_thread, args=(orig, all_threads))
+                origins.append(orig)
+
+        # Skims are written to the output file (if any) after each block of origins
+        pool = ThreadPool(self.results.cores)
+        all_threads = {"count": 0}
+        for block in self.__origin_blocks(origins):
+            self.results._start_block(self.graph.compact_nodes_to_indices[block])
+            pool.starmap(self.__func_skim_thread, [(orig, all_threads) for orig in block])
+            self.results._write_block()
         pool.close()
         pool.join()
+        self.results._finish_output()
         self.aux_res = None
         self.procedure_id = uuid4().hex
         self.procedure_date = str(datetime.today())
@@ -109,6 +154,86 @@ class NetworkSkimming(WorkerThread):
             self.skimming.emit(["text skimming", "Saving Outputs"])
             self.skimming.emit(["finished_threaded_procedure", None])
 
+    def __skim_with_hierarchy(self):
+        hierarchy = self.graph.contraction_hierarchy
+        hierarchy.cores = self.results.cores
+        zones = self.graph.num_zones
+        itype = self.graph.default_types("int")
+
+        origins = np.arange(zones, dtype=itype)
+        costs = np.empty((zones, zones), dtype=self.graph.default_types("float"))
+        if self.origins is None and self.destinations is None and self.results.output is None:
+            hierarchy._many_to_many(origins, origins, costs, self.results.skims.matrix_view)
+        else:
+            destinations = origins
+            if self.origins is not None:
+                origins = np.array(self.graph.compact_nodes_to_indices[self.origins], dtype=itype)
+            if self.destinations is not None:
+                destinations = np.array(self.graph.compact_nodes_to_indices[self.destinations], dtype=itype)
+            num_dest = destinations.shape[0]
+            for block in self.__origin_blocks(origins):
+                skims = np.empty((block.shape[0], num_dest, self.results.num_skims), dtype=costs.dtype)
+                hierarchy._many_to_many(block, destinations, costs[: block.shape[0], :num_dest], skims)
+                self.results._start_block(block)
+                for i, origin_index in enumerate(block):
+                    row = self.results._skim_row(origin_index)
+                    row[:, :] = np.inf
+                    row[destinations, :] = skims[i, :, :]
+                self.results._write_block()
+        self.results._finish_output()
+
+        self.procedure_id = uuid4().hex
+        self.procedure_date = str(datetime.today())
+        if pyqt:
+            self.skimming.emit(["zones finalized", zones])
+            self.skimming.emit(["finished_threaded_procedure", None])
+
+    def many_to_many(self, origins, destinations) -> (np.ndarray, np.ndarray):
+        """Computes costs and skims between any two sets of nodes in the graph
+
+        Origins and destinations do not need to be centroids. Each path search stops as soon as all destinations are
+        reached. If the graph has a contraction hierarchy and all nodes are in the compressed graph, it is used instead
+
+        Args:
+            *origins* (:obj:`list`): Node IDs of origins
+
+            *destinations* (:obj:`list`): Node IDs of destinations
+
+        Returns:
+            *costs* (:obj:`np.ndarray`): Array (origins x destinations) with the cost of the shortest paths. np.inf
+            where there is no path
+
+            *skims* (:obj:`np.ndarray`): Array (origins x destinations x skims) with the skims along the shortest
+            paths, in the same order as *graph.skim_fields*
+        """
+        graph = self.graph
+        itype = graph.default_types("int")
+        origins = np.array(origins, dtype=itype).reshape(-1)
+        destinations = np.array(destinations, dtype=itype).reshape(-1)
+        if not graph.cost_field:
+            raise ValueError('Cost field needs to be set for computation. use graph.set_graph("your_cost_field")')
+        for nodes in [origins, destinations]:
+            if nodes.shape[0] == 0:
+                raise ValueError("Origins and destinations cannot be empty")
+            if nodes.min() < 0 or nodes.max() >= graph.nodes_to_indices.shape[0]:
+                raise ValueError("All origins and destinations need to be nodes in the graph")
+            if np.any(graph.nodes_to_indices[nodes] < 0):
+                raise ValueError("All origins and destinations need to be nodes in the graph")
+
+        hierarchy = graph.contraction_hierarchy
+        if hierarchy is not None and self.__in_compact_graph(origins) and self.__in_compact_graph(destinations):
+            hierarchy.cores = self.results.cores
+            return hierarchy.skim(origins, destinations)
+
+        costs, skims = many_to_many_skims(
+            graph.nodes_to_indices[origins], graph.nodes_to_indices[destinations], graph, self.results.cores
+        )
+        return costs, skims
+
+    def __in_compact_graph(self, nodes: np.ndarray) -> bool:
+        indices = self.graph.compact_nodes_to_indices
+        return nodes.max() < indices.shape[0] and bool(np.all(indices[nodes] >= 0))
+
     def save_to_project(self, name: str, format="omx") -> None:
         """Saves skim results to the project folder and creates record in the database
 
@@ -117,14 +242,25 @@ class NetworkSkimming(WorkerThread):
             *format* (:obj:`str`, `Optional`): File format ('aem' or 'omx'). Default is 'omx'
         """
 
-        file_name = f"{name}.{format.lower()}"
         mats = Matrices()
-        record = mats.new_record(name, file_name, self.results.skims)
+        if self.results.output is None:
+            file_name = f"{name}.{format.lower()}"
+            record = mats.new_record(name, file_name, self.results.skims)
+        else:
+            # Skims were streamed to their file already, so we only register it
+            if dirname(abspath(self.results.output)) != abspath(mats.fldr):
+                raise ValueError("Skims streamed to a file can only be saved if it is in the project's matrices folder")
+            record = mats.new_record(name, basename(self.results.output))
         record.procedure_id = self.procedure_id
         record.timestamp = self.procedure_date
         record.procedure = "Network skimming"
         record.save()
 
+    def __origin_blocks(self, origins):
+        origins = np.array(origins, dtype=self.graph.default_types("int"))
+        block_size = self.results.block_size if self.results.output is not None else max(1, origins.shape[0])
+        return [origins[i : i + block_size] for i in range(0, origins.shape[0], block_size)]
+
     def __func_skim_thread(self, origin, all_threads):
         if threading.get_ident() in all_threads:
             th = all_threads[threading.get_ident()]
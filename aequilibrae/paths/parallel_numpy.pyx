@@ -25,6 +25,37 @@ cpdef void sum_axis1_cython(double[:] totals,
 
 
 
+def sum_axis0(totals, multiples, cores):
+    cdef int c = cores
+    cdef double [:, :] totals_view = totals
+
+    # Layers can be in single or double precision
+    if multiples.dtype == np.float32:
+        sum_axis0_cython[float](totals_view, multiples, c)
+    else:
+        sum_axis0_cython[double](totals_view, multiples, c)
+
+
+@cython.wraparound(False)
+@cython.embedsignature(True)
+@cython.boundscheck(False)
+cpdef void sum_axis0_cython(double[:, :] totals,
+                            cython.floating[:, :, :] multiples,
+                            int cores):
+  # Each thread reduces a range of rows across all layers, so no two threads write to the same row
+  cdef long long i, j, k
+  cdef long long l = totals.shape[0]
+  cdef long long n = totals.shape[1]
+  cdef long long layers = multiples.shape[0]
+
+  for i in prange(l, nogil=True, num_threads=cores):
+      for j in range(n):
+          totals[i, j] = 0
+      for k in range(layers):
+          for j in range(n):
+              totals[i, j] += multiples[k, i, j]
+
+
 def sum_a_times_b_minus_c(array1, array2, array3, cores):
     cdef int c = cores
     cdef double result
@@ -311,17 +342,20 @@ cpdef void assign_link_loads_cython(double[:, :] actual,
 
 def aggregate_link_costs(actual_costs, compressed_costs, crosswalk):
     cdef double [:] actual_view = actual_costs
-    cdef double [:] compressed_view = compressed_costs
     cdef long long [:] crosswalk_view = crosswalk
 
-    aggregate_link_costs_cython(actual_view, compressed_view, crosswalk_view)
+    # Compressed costs can be in single or double precision
+    if compressed_costs.dtype == np.float32:
+        aggregate_link_costs_cython[float](actual_view, compressed_costs, crosswalk_view)
+    else:
+        aggregate_link_costs_cython[double](actual_view, compressed_costs, crosswalk_view)
 
 
 @cython.wraparound(False)
 @cython.embedsignature(True)
 @cython.boundscheck(False)
 cpdef void aggregate_link_costs_cython(double[:] actual,
-                                       double[:] compressed,
+                                       cython.floating[:] compressed,
                                        long long[:] crosswalk):
     cdef long long i, j, k
     cdef long long links = actual.shape[0]
@@ -333,4 +367,174 @@ cpdef void aggregate_link_costs_cython(double[:] actual,
     for i in range(links):
         k = crosswalk[i]
         if k < c_l:
-            compressed[k] += actual[i]
\ No newline at end of file
+            compressed[k] += actual[i]
+
+def conjugate_differences(differences, current, aon, step_direction, reset, cores):
+    cdef int c = cores
+    cdef int rst = reset
+
+    cdef double [:, :] differences_view = differences
+    cdef double [:, :] current_view = current
+    cdef double [:, :] aon_view = aon
+    cdef double [:, :] step_direction_view = step_direction
+
+    conjugate_differences_cython(differences_view, current_view, aon_view, step_direction_view, rst, c)
+
+
+@cython.wraparound(False)
+@cython.embedsignature(True)
+@cython.boundscheck(False)
+cpdef void conjugate_differences_cython(double[:, :] differences,
+                                        double[:, :] current,
+                                        double[:, :] aon,
+                                        double[:, :] step_direction,
+                                        int reset,
+                                        int cores):
+    # Adds the differences of one traffic class, summed over its user classes, to the totals of all classes:
+    # column 0 gets aon - current and column 1 gets step direction - current
+    cdef long long i, j
+    cdef double aon_diff, step_diff
+    cdef long long l = current.shape[0]
+    cdef long long k = current.shape[1]
+
+    for i in prange(l, nogil=True, num_threads=cores):
+        aon_diff = 0
+        step_diff = 0
+        for j in range(k):
+            aon_diff = aon_diff + aon[i, j] - current[i, j]
+            step_diff = step_diff + step_direction[i, j] - current[i, j]
+        if reset:
+            differences[i, 0] = aon_diff
+            differences[i, 1] = step_diff
+        else:
+            differences[i, 0] += aon_diff
+            differences[i, 1] += step_diff
+
+
+def biconjugate_differences(differences, current, aon, step_direction, previous_step_direction, reset, cores):
+    cdef int c = cores
+    cdef int rst = reset
+
+    cdef double [:, :] differences_view = differences
+    cdef double [:, :] current_view = current
+    cdef double [:, :] aon_view = aon
+    cdef double [:, :] step_direction_view = step_direction
+    cdef double [:, :] previous_view = previous_step_direction
+
+    biconjugate_differences_cython(differences_view, current_view, aon_view, step_direction_view, previous_view,
+                                   rst, c)
+
+
+@cython.wraparound(False)
+@cython.embedsignature(True)
+@cython.boundscheck(False)
+cpdef void biconjugate_differences_cython(double[:, :] differences,
+                                          double[:, :] current,
+                                          double[:, :] aon,
+                                          double[:, :] step_direction,
+                                          double[:, :] previous_step_direction,
+                                          int reset,
+                                          int cores):
+    # Same as conjugate_differences, with previous step direction - current in column 2
+    cdef long long i, j
+    cdef double aon_diff, step_diff, previous_diff
+    cdef long long l = current.shape[0]
+    cdef long long k = current.shape[1]
+
+    for i in prange(l, nogil=True, num_threads=cores):
+        aon_diff = 0
+        step_diff = 0
+        previous_diff = 0
+        for j in range(k):
+            aon_diff = aon_diff + aon[i, j] - current[i, j]
+            step_diff = step_diff + step_direction[i, j] - current[i, j]
+            previous_diff = previous_diff + previous_step_direction[i, j] - current[i, j]
+        if reset:
+            differences[i, 0] = aon_diff
+            differences[i, 1] = step_diff
+            differences[i, 2] = previous_diff
+        else:
+            differences[i, 0] += aon_diff
+            differences[i, 1] += step_diff
+            differences[i, 2] += previous_diff
+
+
+def conjugate_scalars(differences, derivatives, cores):
+    cdef int c = cores
+    cdef double [:] result_view
+    cdef double [:, :] differences_view = differences
+    cdef double [:] derivatives_view = derivatives
+
+    result = np.zeros(2)
+    result_view = result
+    conjugate_scalars_cython(result_view, differences_view, derivatives_view, c)
+    return result[0], result[1]
+
+
+@cython.wraparound(False)
+@cython.embedsignature(True)
+@cython.boundscheck(False)
+cpdef void conjugate_scalars_cython(double[:] result,
+                                    double[:, :] differences,
+                                    double[:] derivatives,
+                                    int cores):
+    # Numerator and denominator of the conjugate step size, from the differences of conjugate_differences
+    cdef long long i
+    cdef double weighted_step
+    cdef double numerator = 0.0
+    cdef double denominator = 0.0
+    cdef long long l = differences.shape[0]
+
+    for i in prange(l, nogil=True, num_threads=cores):
+        weighted_step = derivatives[i] * differences[i, 1]
+        numerator += weighted_step * differences[i, 0]
+        denominator += weighted_step * (differences[i, 0] - differences[i, 1])
+
+    result[0] = numerator
+    result[1] = denominator
+
+
+def biconjugate_scalars(differences, derivatives, stepsize, cores):
+    cdef int c = cores
+    cdef double stpsz = float(stepsize)
+    cdef double [:] result_view
+    cdef double [:, :] differences_view = differences
+    cdef double [:] derivatives_view = derivatives
+
+    result = np.zeros(4)
+    result_view = result
+    biconjugate_scalars_cython(result_view, differences_view, derivatives_view, stpsz, c)
+    return result[0], result[1], result[2], result[3]
+
+
+@cython.wraparound(False)
+@cython.embedsignature(True)
+@cython.boundscheck(False)
+cpdef void biconjugate_scalars_cython(double[:] result,
+                                      double[:, :] differences,
+                                      double[:] derivatives,
+                                      double stepsize,
+                                      int cores):
+    # Numerators and denominators of mu and nu of the biconjugate direction, from the differences of
+    # biconjugate_differences
+    cdef long long i
+    cdef double combined, weighted_combined, weighted_step
+    cdef double mu_numerator = 0.0
+    cdef double mu_denominator = 0.0
+    cdef double nu_numerator = 0.0
+    cdef double nu_denominator = 0.0
+    cdef long long l = differences.shape[0]
+
+    for i in prange(l, nogil=True, num_threads=cores):
+        combined = differences[i, 1] * stepsize + differences[i, 2] * (1.0 - stepsize)
+        weighted_combined = derivatives[i] * combined
+        weighted_step = derivatives[i] * differences[i, 1]
+        mu_numerator += weighted_combined * differences[i, 0]
+        mu_denominator += weighted_combined * (differences[i, 2] - differences[i, 1])
+        nu_numerator += weighted_step * differences[i, 0]
+        nu_denominator += weighted_step * differences[i, 1]
+
+    result[0] = mu_numerator
+    result[1] = mu_denominator
+    result[2] = nu_numerator
+    result[3] = nu_denominator
@@ -17,4 +17,8 @@ cdef double INFINITE = 1.79769313e+308
 VERSION = 0.7
 MINOR_VRSN = 2
 binary_version = "0.7.2"
-release_name = "Queluz"
\ No newline at end of file
+release_name = "Queluz"
+# Priority queues available for the shortest path computation
+cdef int FIBONACCI_HEAP = 0
+cdef int QUATERNARY_HEAP = 1
+cdef int RADIX_HEAP = 2
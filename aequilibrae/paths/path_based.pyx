@@ -0,0 +1,340 @@
+"""
+ -----------------------------------------------------------------------------------------------------------
+ Package:    AequilibraE
+ Name:       Path-based traffic assignment
+ Purpose:    Implements gradient projection on the paths kept in a path store
+ Original Author:  Pedro Camargo (c@margo.co)
+ Contributors:
+ Last edited by: Pedro Camrgo
+ Website:    www.AequilibraE.com
+ Repository:  https://github.com/AequilibraE/AequilibraE
+ Created:    18/10/2026
+ Updated:
+ Copyright:   (c) AequilibraE authors
+ Licence:     See LICENSE.TXT
+ -----------------------------------------------------------------------------------------------------------
+
+Paths are sequences of links of the compressed graph, all stored one after the other in a single array. The paths of
+each OD pair form a linked list that starts at the first path of the OD, so paths can be appended to any OD at any
+time. Shortest paths are only added to the store if they are not there yet.
+
+Flow shifts update link costs in the same way as the bush-based assignment (bush_based.pyx).
+"""
+
+
+@cython.wraparound(False)
+@cython.boundscheck(False)
+cdef inline unsigned long long hash_path(long long [:] links, long long length) nogil:
+    cdef long long i
+    cdef unsigned long long h = length
+    for i in range(length):
+        h = h * 1000003 ^ <unsigned long long> links[i]
+    return h
+
+
+@cython.wraparound(False)
+@cython.boundscheck(False)
+cdef long long find_path(long long first,
+                         long long [:] path,
+                         long long length,
+                         unsigned long long h,
+                         long long [:] links,
+                         long long [:] path_start,
+                         long long [:] path_length,
+                         unsigned long long [:] path_hash,
+                         long long [:] path_next) nogil:
+    # Returns the path in the list of paths that starts at first with the same links, or -1 if there is none
+    cdef long long p, i
+    cdef bint same
+
+    p = first
+    while p >= 0:
+        if path_hash[p] == h and path_length[p] == length:
+            same = True
+            for i in range(length):
+                if links[path_start[p] + i] != path[i]:
+                    same = False
+                    break
+            if same:
+                return p
+        p = path_next[p]
+    return -1
+
+
+@cython.wraparound(False)
+@cython.boundscheck(False)
+cdef void path_cost(long long p,
+                    long long [:] links,
+                    long long [:] path_start,
+                    long long [:] path_length,
+                    double [:] link_costs,
+                    double [:] link_derivatives,
+                    double *cost,
+                    double *derivative) nogil:
+    # Cost of a path and the sum of the derivatives of its links
+    cdef long long i, l
+    cost[0] = 0
+    derivative[0] = 0
+    for i in range(path_start[p], path_start[p] + path_length[p]):
+        l = links[i]
+        cost[0] += link_costs[l]
+        derivative[0] += link_derivatives[l]
+
+
+@cython.wraparound(False)
+@cython.boundscheck(False)
+cdef void shift_path_flow(long long p,
+                          double delta,
+                          unsigned char [:] flags,
+                          unsigned char flag,
+                          long long [:] links,
+                          long long [:] path_start,
+                          long long [:] path_length,
+                          int vdf,
+                          double pce,
+                          long long [:] member_fs,
+                          long long [:] members,
+                          double [:] total_flow,
+                          double [:] congested_time,
+                          double [:] fixed_cost,
+                          double [:] capacity,
+                          double [:] fftime,
+                          double [:] alpha,
+                          double [:] beta,
+                          double [:] link_costs,
+                          double [:] link_derivatives,
+                          double [:] class_loads) nogil:
+    # Adds delta to the links of the path whose flag is the one given
+    cdef long long i, l
+    for i in range(path_start[p], path_start[p] + path_length[p]):
+        l = links[i]
+        if flags[l] == flag:
+            shift_flow(l, delta, vdf, pce, member_fs, members, total_flow, congested_time, fixed_cost, capacity,
+                       fftime, alpha, beta, link_costs, link_derivatives, class_loads)
+
+
+@cython.wraparound(False)
+@cython.boundscheck(False)
+cdef void equilibrate_od(long long first,
+                         unsigned char [:] flags,
+                         long long [:] links,
+                         long long [:] path_start,
+                         long long [:] path_length,
+                         long long [:] path_next,
+                         double [:] path_flow,
+                         int vdf,
+                         double pce,
+                         long long [:] member_fs,
+                         long long [:] members,
+                         double [:] total_flow,
+                         double [:] congested_time,
+                         double [:] fixed_cost,
+                         double [:] capacity,
+                         double [:] fftime,
+                         double [:] alpha,
+                         double [:] beta,
+                         double [:] link_costs,
+                         double [:] link_derivatives,
+                         double [:] class_loads) nogil:
+    # Shifts flow from all paths of an OD pair to its cheapest one. Each shift is a Newton step on the difference of
+    # costs between the two paths, with the derivatives of the links used by only one of them
+    cdef long long p, s, i, l
+    cdef double cost, derivative, best, s_cost, s_derivative, shared, delta
+
+    s = -1
+    best = INFINITE
+    p = first
+    while p >= 0:
+        path_cost(p, links, path_start, path_length, link_costs, link_derivatives, &cost, &derivative)
+        if cost < best:
+            best = cost
+            s = p
+        p = path_next[p]
+
+    for i in range(path_start[s], path_start[s] + path_length[s]):
+        flags[links[i]] = 1
+
+    p = first
+    while p >= 0:
+        if p == s or path_flow[p] <= 0:
+            p = path_next[p]
+            continue
+
+        path_cost(s, links, path_start, path_length, link_costs, link_derivatives, &s_cost, &s_derivative)
+        cost = 0
+        derivative = 0
+        shared = 0
+        for i in range(path_start[p], path_start[p] + path_length[p]):
+            l = links[i]
+            cost += link_costs[l]
+            if flags[l]:
+                shared += link_derivatives[l]
+            else:
+                derivative += link_derivatives[l]
+
+        if cost > s_cost:
+            derivative += s_derivative - shared
+            delta = path_flow[p]
+            if derivative > 0 and (cost - s_cost) / derivative < delta:
+                delta = (cost - s_cost) / derivative
+
+            # Links used by both paths are flagged with 3, by the cheapest path only with 1 and by the other with 2
+            for i in range(path_start[p], path_start[p] + path_length[p]):
+                flags[links[i]] += 2
+            shift_path_flow(p, -delta, flags, 2, links, path_start, path_length, vdf, pce, member_fs, members,
+                            total_flow, congested_time, fixed_cost, capacity, fftime, alpha, beta, link_costs,
+                            link_derivatives, class_loads)
+            shift_path_flow(s, delta, flags, 1, links, path_start, path_length, vdf, pce, member_fs, members,
+                            total_flow, congested_time, fixed_cost, capacity, fftime, alpha, beta, link_costs,
+                            link_derivatives, class_loads)
+            for i in range(path_start[p], path_start[p] + path_length[p]):
+                flags[links[i]] -= 2
+            path_flow[p] -= delta
+            path_flow[s] += delta
+        p = path_next[p]
+
+    for i in range(path_start[s], path_start[s] + path_length[s]):
+        flags[links[i]] = 0
+
+
+@cython.wraparound(False)
+@cython.boundscheck(False)
+def update_origin_paths(origin, user_class, pair, demand, network, scratch, store, class_loads,
+                        int inner_iterations):
+    """
+    Adds the current shortest paths from one origin to the path store and equilibrates the flows of each OD pair
+    among its paths
+
+    The first time paths are added for an OD pair, its entire demand is loaded on the shortest path
+
+    :param origin: Index of the origin in the compressed graph
+    :param user_class: Index of the user class in the matrix of the traffic class
+    :param pair: Position of the origin and user class in the OD pair index of the path store (*pair_fs*)
+    :param demand: Demand from the origin to each zone
+    :param network: Network arrays, as prepared by GradientProjection
+    :param scratch: Scratch arrays, as prepared by GradientProjection
+    :param store: PathStore with the paths of the traffic class
+    :param class_loads: Loads of the user class on the compressed graph
+    :param inner_iterations: Number of times flows are shifted within each OD pair
+    """
+    cdef long long i, j, d, n, k, p, q, length, first, found
+    cdef long long orig = origin
+    cdef long long m = user_class
+    cdef long long needed_paths = 0
+    cdef long long needed_links = 0
+    cdef unsigned long long h
+    cdef int heap = heap_code(network.graph)
+    cdef double [:] demand_view = demand
+    cdef long long [:] pair_destination = store.pair_destination
+    cdef long long first_pair = store.pair_fs[pair]
+    cdef long long last_pair = store.pair_fs[pair + 1]
+    cdef long long [:] blocked_b_nodes = scratch.temp_b_nodes
+    cdef long long [:] pred = scratch.pred_min
+    cdef long long [:] connectors = scratch.pred_max
+    cdef long long [:] reached_first = scratch.order
+    cdef long long [:] depth = scratch.indegree
+    cdef long long [:] no_destinations = scratch.position
+    cdef long long [:] path = scratch.bush
+    cdef unsigned char [:] flags = scratch.in_bush
+    cdef long long [:] ids = network.ids
+    cdef long long [:] graph_fs = network.graph_fs
+    cdef long long [:] a_nodes = network.a_nodes
+    cdef long long [:] b_nodes = network.b_nodes
+    cdef long long [:] member_fs = network.member_fs
+    cdef long long [:] members = network.members
+    cdef double [:] total_flow = network.total_flow
+    cdef double [:] congested_time = network.congested_time
+    cdef double [:] fixed_cost = network.fixed_cost
+    cdef double [:] capacity = network.capacity
+    cdef double [:] fftime = network.fftime
+    cdef double [:] alpha = network.alpha
+    cdef double [:] beta = network.beta
+    cdef double [:] link_costs = network.link_costs
+    cdef double [:] link_derivatives = network.link_derivatives
+    cdef double [:] loads = class_loads
+    cdef int vdf = network.vdf
+    cdef double pce = network.pce
+    cdef int block_flows_through_centroids = network.block_flows_through_centroids
+
+    with nogil:
+        # Links leaving centroids are blocked for all origins but the one we are computing paths from
+        for j in range(graph_fs[orig], graph_fs[orig + 1]):
+            blocked_b_nodes[j] = b_nodes[j]
+        found = compute_path_tree[double](heap, orig, link_costs, blocked_b_nodes, graph_fs, pred, ids, connectors,
+                                          reached_first, no_destinations, 0)
+        if block_flows_through_centroids:
+            for j in range(graph_fs[orig], graph_fs[orig + 1]):
+                blocked_b_nodes[j] = a_nodes[j]
+
+        depth[orig] = 0
+        for i in range(1, found + 1):
+            n = reached_first[i]
+            depth[n] = depth[pred[n]] + 1
+        for q in range(first_pair, last_pair):
+            d = pair_destination[q]
+            if demand_view[d] > 0 and pred[d] >= 0:
+                needed_paths += 1
+                needed_links += depth[d]
+
+    # The store grows, if needed, before any path is added
+    store._ensure_capacity(needed_paths, needed_links)
+    cdef long long [:] links = store.links
+    cdef long long [:] path_start = store.path_start
+    cdef long long [:] path_length = store.path_length
+    cdef unsigned long long [:] path_hash = store.path_hash
+    cdef long long [:] path_next = store.path_next
+    cdef long long [:] path_origin = store.path_origin
+    cdef long long [:] path_destination = store.path_destination
+    cdef long long [:] path_class = store.path_class
+    cdef double [:] path_flow = store.path_flow
+    cdef long long [:] first_path = store.first_path
+    cdef long long num_paths = store.num_paths
+    cdef long long num_links = store.num_links
+
+    with nogil:
+        for q in range(first_pair, last_pair):
+            d = pair_destination[q]
+            if demand_view[d] <= 0 or pred[d] < 0:
+                continue
+
+            length = depth[d]
+            n = d
+            k = length
+            while n != orig:
+                k -= 1
+                path[k] = connectors[n]
+                n = pred[n]
+            h = hash_path(path, length)
+
+            first = first_path[q]
+            p = find_path(first, path, length, h, links, path_start, path_length, path_hash, path_next)
+            if p < 0:
+                p = num_paths
+                for i in range(length):
+                    links[num_links + i] = path[i]
+                path_start[p] = num_links
+                path_length[p] = length
+                path_hash[p] = h
+                path_next[p] = first
+                path_origin[p] = orig
+                path_destination[p] = d
+                path_class[p] = m
+                path_flow[p] = 0
+                first_path[q] = p
+                num_paths += 1
+                num_links += length
+
+            if first < 0:
+                path_flow[p] = demand_view[d]
+                for i in range(length):
+                    shift_flow(path[i], demand_view[d], vdf, pce, member_fs, members, total_flow, congested_time,
+                               fixed_cost, capacity, fftime, alpha, beta, link_costs, link_derivatives, loads)
+                continue
+
+            for i in range(inner_iterations):
+                equilibrate_od(first_path[q], flags, links, path_start, path_length, path_next, path_flow,
+                               vdf, pce, member_fs, members, total_flow, congested_time, fixed_cost, capacity,
+                               fftime, alpha, beta, link_costs, link_derivatives, loads)
+
+    store.num_paths = num_paths
+    store.num_links = num_links
@@ -0,0 +1,109 @@
+# cython: language_level=3
+"""
+Bidirectional Dijkstra for point-to-point queries
+
+The forward search runs on the graph's forward star and the backward search on its reverse star (links sorted by
+b_node). Both searches use the quaternary heap and stop as soon as the sum of the smallest labels in both heaps can no
+longer improve on the best path found so far.
+"""
+
+@cython.wraparound(False)
+@cython.embedsignature(True)
+@cython.boundscheck(False)
+cpdef long long bidirectional_path_finding(long long origin,
+                                           long long destination,
+                                           double[:] graph_costs,
+                                           long long [:] csr_indices,
+                                           long long [:] graph_fs,
+                                           long long [:] ids,
+                                           long long [:] reverse_csr_indices,
+                                           long long [:] reverse_fs,
+                                           long long [:] reverse_ids,
+                                           long long zones,
+                                           int block_flows_through_centroids,
+                                           long long [:] pred,
+                                           long long [:] connectors,
+                                           long long [:] succ,
+                                           long long [:] reverse_connectors) nogil:
+    # Returns the index of the node where both searches meet, or -1 if there is no path
+    # Links in the reverse star are mapped to the forward star through reverse_ids, so their costs come from
+    # graph_costs and do not need to be rebuilt every time the cost field changes
+
+    cdef long long M = pred.shape[0]
+    cdef long long i, j, v, w, link
+    cdef long long meeting_node = -1
+    cdef double new_val, best = INFINITE
+    cdef double top_forward, top_backward
+
+    cdef QuaternaryHeap forward
+    cdef QuaternaryHeap backward
+
+    for i in range(M):
+        pred[i] = -1
+        connectors[i] = -1
+        succ[i] = -1
+        reverse_connectors[i] = -1
+
+    initialize_quaternary_heap(&forward, M)
+    initialize_quaternary_heap(&backward, M)
+    quaternary_insert(&forward, origin, 0)
+    quaternary_insert(&backward, destination, 0)
+
+    while forward.length > 0 and backward.length > 0:
+        top_forward = forward.values[forward.nodes[0]]
+        top_backward = backward.values[backward.nodes[0]]
+        if top_forward + top_backward >= best:
+            break
+
+        if top_forward <= top_backward:
+            v = quaternary_remove_min(&forward)
+            # Paths cannot go through centroids other than the origin
+            if block_flows_through_centroids and v < zones and v != origin:
+                continue
+
+            for j in range(graph_fs[v], graph_fs[v + 1]):
+                w = csr_indices[j]
+                if forward.positions[w] == SCANNED:
+                    continue
+                new_val = forward.values[v] + graph_costs[j]
+                if forward.positions[w] == NOT_IN_HEAP:
+                    quaternary_insert(&forward, w, new_val)
+                elif forward.values[w] > new_val:
+                    quaternary_decrease_val(&forward, w, new_val)
+                else:
+                    continue
+                pred[w] = v
+                connectors[w] = ids[j]
+
+                if backward.positions[w] != NOT_IN_HEAP and new_val + backward.values[w] < best:
+                    if not (block_flows_through_centroids and w < zones and w != destination):
+                        best = new_val + backward.values[w]
+                        meeting_node = w
+        else:
+            v = quaternary_remove_min(&backward)
+            if block_flows_through_centroids and v < zones and v != destination:
+                continue
+
+            for j in range(reverse_fs[v], reverse_fs[v + 1]):
+                w = reverse_csr_indices[j]
+                if backward.positions[w] == SCANNED:
+                    continue
+                link = reverse_ids[j]
+                new_val = backward.values[v] + graph_costs[link]
+                if backward.positions[w] == NOT_IN_HEAP:
+                    quaternary_insert(&backward, w, new_val)
+                elif backward.values[w] > new_val:
+                    quaternary_decrease_val(&backward, w, new_val)
+                else:
+                    continue
+                succ[w] = v
+                reverse_connectors[w] = ids[link]
+
+                if forward.positions[w] != NOT_IN_HEAP and new_val + forward.values[w] < best:
+                    if not (block_flows_through_centroids and w < zones and w != origin):
+                        best = new_val + forward.values[w]
+                        meeting_node = w
+
+    free_quaternary_heap(&forward)
+    free_quaternary_heap(&backward)
+    return meeting_node
@@ -0,0 +1,386 @@
+"""
+ -----------------------------------------------------------------------------------------------------------
+ Package:    AequilibraE
+ Name:       Alternative priority queues for the shortest path computation
+ Purpose:    Implements Dijkstra's algorithm on top of a 4-ary (quaternary) heap and of a radix heap
+ Original Author:  Pedro Camargo (c@margo.co)
+ Contributors:
+ Last edited by: Pedro Camrgo
+ Website:    www.AequilibraE.com
+ Repository:  https://github.com/AequilibraE/AequilibraE
+ Created:    18/10/2026
+ Updated:
+ Copyright:   (c) AequilibraE authors
+ Licence:     See LICENSE.TXT
+ -----------------------------------------------------------------------------------------------------------
+
+Both heaps work on the same arrays as the Fibonacci-heap implementation and produce the same shortest path
+costs. When there are ties between paths, however, the tree returned may differ from the one returned by
+the Fibonacci heap, as nodes with the same cost can be scanned in a different order.
+
+The quaternary heap is an implicit heap stored in a flat array, which has much better cache behaviour than
+the pointer-based Fibonacci heap.
+
+The radix heap is a monotone priority queue (keys extracted never decrease, which is always the case for
+Dijkstra's algorithm). Non-negative IEEE-754 doubles have the same ordering as their bit patterns interpreted
+as unsigned 64 bit integers, so costs do not need to be scaled into integers.
+"""
+from libc.string cimport memcpy
+from libc.stdlib cimport realloc
+
+######################################################################
+# Quaternary heap
+#  Implicit 4-ary min-heap of node indices with decrease-key support.
+#  positions[node] holds the position of the node in the heap array,
+#  NOT_IN_HEAP if it was never inserted and SCANNED once it was removed
+
+cdef long long NOT_IN_HEAP = -1
+cdef long long SCANNED = -2
+
+cdef struct QuaternaryHeap:
+    long long length
+    long long *nodes
+    long long *positions
+    double *values
+
+cdef void initialize_quaternary_heap(QuaternaryHeap* heap, long long size) nogil:
+    cdef long long i
+    heap.length = 0
+    heap.nodes = <long long*> malloc(size * sizeof(long long))
+    heap.positions = <long long*> malloc(size * sizeof(long long))
+    heap.values = <double*> malloc(size * sizeof(double))
+    for i in range(size):
+        heap.positions[i] = NOT_IN_HEAP
+
+cdef void free_quaternary_heap(QuaternaryHeap* heap) nogil:
+    free(heap.nodes)
+    free(heap.positions)
+    free(heap.values)
+
+cdef inline void quaternary_sift_up(QuaternaryHeap* heap, long long position) nogil:
+    cdef long long parent
+    cdef long long node = heap.nodes[position]
+    cdef double val = heap.values[node]
+
+    while position > 0:
+        parent = (position - 1) >> 2
+        if heap.values[heap.nodes[parent]] <= val:
+            break
+        heap.nodes[position] = heap.nodes[parent]
+        heap.positions[heap.nodes[position]] = position
+        position = parent
+
+    heap.nodes[position] = node
+    heap.positions[node] = position
+
+cdef inline void quaternary_sift_down(QuaternaryHeap* heap, long long position) nogil:
+    cdef long long child, first_child, last_child, best
+    cdef long long node = heap.nodes[position]
+    cdef double val = heap.values[node]
+
+    while True:
+        first_child = 4 * position + 1
+        if first_child >= heap.length:
+            break
+        best = first_child
+        last_child = min(first_child + 4, heap.length)
+        for child in range(first_child + 1, last_child):
+            if heap.values[heap.nodes[child]] < heap.values[heap.nodes[best]]:
+                best = child
+        if heap.values[heap.nodes[best]] >= val:
+            break
+        heap.nodes[position] = heap.nodes[best]
+        heap.positions[heap.nodes[position]] = position
+        position = best
+
+    heap.nodes[position] = node
+    heap.positions[node] = position
+
+cdef inline void quaternary_insert(QuaternaryHeap* heap, long long node, double val) nogil:
+    heap.values[node] = val
+    heap.nodes[heap.length] = node
+    heap.length += 1
+    quaternary_sift_up(heap, heap.length - 1)
+
+cdef inline void quaternary_decrease_val(QuaternaryHeap* heap, long long node, double val) nogil:
+    heap.values[node] = val
+    quaternary_sift_up(heap, heap.positions[node])
+
+cdef inline long long quaternary_remove_min(QuaternaryHeap* heap) nogil:
+    cdef long long out = heap.nodes[0]
+    heap.positions[out] = SCANNED
+    heap.length -= 1
+    if heap.length > 0:
+        heap.nodes[0] = heap.nodes[heap.length]
+        quaternary_sift_down(heap, 0)
+    return out
+
+
+@cython.wraparound(False)
+@cython.embedsignature(True)
+@cython.boundscheck(False)
+cpdef int path_finding_quaternary(long origin,
+                                  cython.floating[:] graph_costs,
+                                  long long [:] csr_indices,
+                                  long long [:] graph_fs,
+                                  long long [:] pred,
+                                  long long [:] ids,
+                                  long long [:] connectors,
+                                  long long [:] reached_first,
+                                  long long [:] destinations,
+                                  long long num_destinations,
+                                  double cutoff=INFINITE) nogil:
+
+    cdef unsigned int M = pred.shape[0]
+    cdef long long D = destinations.shape[0]
+    cdef long long remaining = num_destinations
+
+    cdef long long i, j, j_current, v
+    cdef ITYPE_t found = 0
+    cdef DTYPE_t new_val
+
+    cdef QuaternaryHeap heap
+
+    for i in range(M):
+        pred[i] = -1
+        connectors[i] = -1
+        reached_first[i] = -1
+
+    initialize_quaternary_heap(&heap, M)
+    quaternary_insert(&heap, origin, 0)
+
+    while heap.length > 0:
+        v = quaternary_remove_min(&heap)
+        if heap.values[v] > cutoff:
+            break
+        reached_first[found] = v
+        found += 1
+
+        if remaining > 0 and v < D:
+            if destinations[v] > 0:
+                remaining -= 1
+                if remaining == 0:
+                    break
+
+        for j in range(graph_fs[v], graph_fs[v + 1]):
+            j_current = csr_indices[j]
+
+            if heap.positions[j_current] != SCANNED:
+                new_val = heap.values[v] + graph_costs[j]
+                if heap.positions[j_current] == NOT_IN_HEAP:
+                    quaternary_insert(&heap, j_current, new_val)
+                    pred[j_current] = v
+                    connectors[j_current] = ids[j]
+
+                elif heap.values[j_current] > new_val:
+                    quaternary_decrease_val(&heap, j_current, new_val)
+                    pred[j_current] = v
+                    #The link that took us to such node
+                    connectors[j_current] = ids[j]
+
+    free_quaternary_heap(&heap)
+    return found -1
+
+######################################################################
+# Radix heap
+#  Monotone priority queue with 65 buckets. An element with key k sits in
+#  the bucket given by the position of the highest bit in which k differs
+#  from the last key extracted (bucket zero holds keys equal to it).
+#  Decrease-key is done lazily by inserting the node again, so outdated
+#  entries are simply skipped when they are extracted
+
+ctypedef unsigned long long RADIX_KEY_t
+
+cdef struct RadixBucket:
+    long long length
+    long long capacity
+    RADIX_KEY_t *keys
+    long long *nodes
+
+cdef struct RadixHeap:
+    long long length
+    RADIX_KEY_t last_key
+    RadixBucket[65] buckets
+
+cdef inline RADIX_KEY_t radix_key(double val) nogil:
+    cdef RADIX_KEY_t key
+    memcpy(&key, &val, sizeof(double))
+    return key
+
+cdef inline int radix_bucket_index(RADIX_KEY_t key, RADIX_KEY_t last_key) nogil:
+    # Number of significant bits in (key XOR last_key)
+    cdef RADIX_KEY_t diff = key ^ last_key
+    cdef int bits = 0
+    if diff >> 32:
+        diff >>= 32
+        bits += 32
+    if diff >> 16:
+        diff >>= 16
+        bits += 16
+    if diff >> 8:
+        diff >>= 8
+        bits += 8
+    while diff:
+        diff >>= 1
+        bits += 1
+    return bits
+
+cdef void initialize_radix_heap(RadixHeap* heap) nogil:
+    cdef int i
+    heap.length = 0
+    heap.last_key = 0
+    for i in range(65):
+        heap.buckets[i].length = 0
+        heap.buckets[i].capacity = 0
+        heap.buckets[i].keys = NULL
+        heap.buckets[i].nodes = NULL
+
+cdef void free_radix_heap(RadixHeap* heap) nogil:
+    cdef int i
+    for i in range(65):
+        free(heap.buckets[i].keys)
+        free(heap.buckets[i].nodes)
+
+cdef inline void radix_bucket_append(RadixBucket* bucket, RADIX_KEY_t key, long long node) nogil:
+    if bucket.length == bucket.capacity:
+        bucket.capacity = 16 if bucket.capacity == 0 else 2 * bucket.capacity
+        bucket.keys = <RADIX_KEY_t*> realloc(bucket.keys, bucket.capacity * sizeof(RADIX_KEY_t))
+        bucket.nodes = <long long*> realloc(bucket.nodes, bucket.capacity * sizeof(long long))
+        if bucket.keys == NULL or bucket.nodes == NULL:
+            abort()
+    bucket.keys[bucket.length] = key
+    bucket.nodes[bucket.length] = node
+    bucket.length += 1
+
+cdef inline void radix_insert(RadixHeap* heap, long long node, double val) nogil:
+    cdef RADIX_KEY_t key = radix_key(val)
+    radix_bucket_append(&heap.buckets[radix_bucket_index(key, heap.last_key)], key, node)
+    heap.length += 1
+
+cdef inline long long radix_remove_min(RadixHeap* heap) nogil:
+    cdef int i
+    cdef long long k
+    cdef RADIX_KEY_t new_last
+    cdef RadixBucket* bucket
+
+    if heap.buckets[0].length == 0:
+        i = 1
+        while heap.buckets[i].length == 0:
+            i += 1
+        bucket = &heap.buckets[i]
+        new_last = bucket.keys[0]
+        for k in range(1, bucket.length):
+            if bucket.keys[k] < new_last:
+                new_last = bucket.keys[k]
+        heap.last_key = new_last
+        # All elements of this bucket go to strictly lower buckets
+        for k in range(bucket.length):
+            radix_bucket_append(&heap.buckets[radix_bucket_index(bucket.keys[k], new_last)],
+                                bucket.keys[k],
+                                bucket.nodes[k])
+        bucket.length = 0
+
+    heap.buckets[0].length -= 1
+    heap.length -= 1
+    return heap.buckets[0].nodes[heap.buckets[0].length]
+
+
+@cython.wraparound(False)
+@cython.embedsignature(True)
+@cython.boundscheck(False)
+cpdef int path_finding_radix(long origin,
+                             cython.floating[:] graph_costs,
+                             long long [:] csr_indices,
+                             long long [:] graph_fs,
+                             long long [:] pred,
+                             long long [:] ids,
+                             long long [:] connectors,
+                             long long [:] reached_first,
+                             long long [:] destinations,
+                             long long num_destinations,
+                             double cutoff=INFINITE) nogil:
+
+    cdef unsigned int M = pred.shape[0]
+    cdef long long D = destinations.shape[0]
+    cdef long long remaining = num_destinations
+
+    cdef long long i, j, j_current, v
+    cdef ITYPE_t found = 0
+    cdef DTYPE_t new_val
+
+    cdef RadixHeap heap
+    cdef double *values = <double*> malloc(M * sizeof(double))
+    # 2: never reached, 3: in the heap, 1: scanned (same convention as the Fibonacci heap)
+    cdef unsigned char *state = <unsigned char*> malloc(M * sizeof(unsigned char))
+
+    for i in range(M):
+        pred[i] = -1
+        connectors[i] = -1
+        reached_first[i] = -1
+        state[i] = 2
+
+    initialize_radix_heap(&heap)
+    values[origin] = 0
+    state[origin] = 3
+    radix_insert(&heap, origin, 0)
+
+    while heap.length > 0:
+        v = radix_remove_min(&heap)
+        if state[v] == 1:
+            # Outdated entry from a lazy decrease-key
+            continue
+        if values[v] > cutoff:
+            break
+        state[v] = 1
+        reached_first[found] = v
+        found += 1
+
+        if remaining > 0 and v < D:
+            if destinations[v] > 0:
+                remaining -= 1
+                if remaining == 0:
+                    break
+
+        for j in range(graph_fs[v], graph_fs[v + 1]):
+            j_current = csr_indices[j]
+
+            if state[j_current] != 1:
+                new_val = values[v] + graph_costs[j]
+                if state[j_current] == 2 or values[j_current] > new_val:
+                    state[j_current] = 3
+                    values[j_current] = new_val
+                    radix_insert(&heap, j_current, new_val)
+                    pred[j_current] = v
+                    #The link that took us to such node
+                    connectors[j_current] = ids[j]
+
+    free_radix_heap(&heap)
+    free(values)
+    free(state)
+    return found -1
+
+
+@cython.wraparound(False)
+@cython.embedsignature(True)
+@cython.boundscheck(False)
+cdef int compute_path_tree(int heap_type,
+                           long origin,
+                           cython.floating[:] graph_costs,
+                           long long [:] csr_indices,
+                           long long [:] graph_fs,
+                           long long [:] pred,
+                           long long [:] ids,
+                           long long [:] connectors,
+                           long long [:] reached_first,
+                           long long [:] destinations,
+                           long long num_destinations,
+                           double cutoff=INFINITE) nogil:
+    # Nodes farther than the cutoff from the origin are not scanned
+    if heap_type == QUATERNARY_HEAP:
+        return path_finding_quaternary(origin, graph_costs, csr_indices, graph_fs, pred, ids, connectors,
+                                       reached_first, destinations, num_destinations, cutoff)
+    elif heap_type == RADIX_HEAP:
+        return path_finding_radix(origin, graph_costs, csr_indices, graph_fs, pred, ids, connectors, reached_first,
+                                  destinations, num_destinations, cutoff)
+    return path_finding(origin, graph_costs, csr_indices, graph_fs, pred, ids, connectors, reached_first,
+                        destinations, num_destinations, cutoff)
@@ -14,3 +14,4 @@ __date__ = "$Date: 2016-07-02$"
 from .assignment_results import AssignmentResults
 from .path_results import PathResults
 from .skim_results import SkimResults
+from .path_store import PathStore
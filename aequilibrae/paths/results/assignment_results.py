@@ -36,6 +36,11 @@ class AssignmentResults:
         if not isinstance(p, int):
             p = 0
         self.set_cores(p)
+        self.processes = 1  # number of worker processes the all-or-nothing assignment is spread across
+        self.multi_process_aon = None  # arrays shared with worker processes, kept between iterations
+        self.load_buffers = 0  # number of link load buffers shared by threads. Zero means one per thread
+        self.closed_links = []  # links closed for these results only, on top of those closed in the graph
+        self.path_store = None  # Paths and their flows, for path-based assignment algorithms
 
         self.classes = {"number": 1, "names": ["flow"]}
 
@@ -66,6 +71,10 @@ class AssignmentResults:
         self.__float_type = graph.default_types("float")
         self.__integer_type = graph.default_types("int")
 
+        if self.multi_process_aon is not None:
+            self.multi_process_aon.close()
+            self.multi_process_aon = None
+
         if matrix.view_names is None:
             raise ("Please set the matrix_procedures computational view")
         else:
@@ -95,6 +104,15 @@ class AssignmentResults:
             self.__redim()
             self.__graph_id__ = graph.__id__
 
+    def set_closed_links(self, links: list) -> None:
+        """
+        Sets the links closed when computing these results, on top of those closed in the graph
+
+        Args:
+            *links* (:obj:`list`): List of link IDs to close. An empty list re-opens all of them
+        """
+        self.closed_links = [int(x) for x in links]
+
     def reset(self) -> None:
         """
         Resets object to prepared and pre-computation state
@@ -167,6 +185,42 @@ class AssignmentResults:
         if self.link_loads.shape[0]:
             self.__redim()
 
+    def set_processes(self, processes: int) -> None:
+        """
+        Sets number of worker processes to be used in the all-or-nothing assignment
+
+        Origins are split among processes that share the graph and demand through shared memory, with the number of
+        cores divided among them. A single process (default) runs everything with threads in the current process,
+        while more processes help when the Python overhead around path computation limits the use of all cores
+
+        Args:
+            *processes* (:obj:`int`): Number of processes to be used in computation
+        """
+
+        if not isinstance(processes, int):
+            raise ValueError("Number of processes needs to be an integer")
+        if processes < 1:
+            raise ValueError("Number of processes needs to be at least one")
+        self.processes = processes
+
+    def set_load_buffers(self, buffers: int) -> None:
+        """
+        Sets number of link load buffers to be shared by the threads of the all-or-nothing assignment
+
+        Each buffer holds loads for all links and classes. By default every thread gets its own, which is fastest but
+        takes a lot of memory on machines with many cores and assignments with many classes. With fewer buffers,
+        threads take turns adding the loads of each origin they assign to their shared buffer
+
+        Args:
+            *buffers* (:obj:`int`): Number of buffers. Zero (default) means one per thread
+        """
+
+        if not isinstance(buffers, int):
+            raise ValueError("Number of buffers needs to be an integer")
+        if buffers < 0:
+            raise ValueError("Number of buffers cannot be negative")
+        self.load_buffers = buffers
+
     def get_load_results(self) -> AequilibraeData:
         """
         Translates the assignment results from the graph format into the network format
@@ -211,13 +265,15 @@ class AssignmentResults:
 
         Args:
             *file_name* (:obj:`str`): Name of the file, with extension. Valid extensions are: ['aed', 'csv', 'sqlite']
-            *output* (:obj:`str`, optional): Type of output ('loads', 'path_file'). Defaults to 'loads'
+            *output* (:obj:`str`, optional): Type of output ('loads', 'path_file'). Defaults to 'loads'. Path files
+            are only available for path-based assignment, and can be saved to CSV or SQLite files
         """
 
         if output == "loads":
             res = self.get_load_results()
             res.export(file_name)
 
-        # TODO: Re-factor the exporting of the path file within the AequilibraeData format
         elif output == "path_file":
-            raise NotImplementedError
+            if self.path_store is None:
+                raise ValueError("Path files are only available for path-based assignment algorithms")
+            self.path_store.save(file_name)
@@ -3,7 +3,7 @@ from aequilibrae.paths.graph import Graph
 from aequilibrae import logger
 
 try:
-    from aequilibrae.paths.AoN import update_path_trace, path_computation
+    from aequilibrae.paths.AoN import update_path_trace, path_computation, bidirectional_path_computation
 except ImportError as ie:
     logger.warning(f'Could not import procedures from the binary. {ie.args}')
 
@@ -59,6 +59,9 @@ class PathResults:
         self.reached_first = None
         self.origin = None
         self.destination = None
+        self.early_exit = False
+        self.bidirectional = False
+        self._reverse_graph = None
         self.graph: Graph = None
         self.links = -1
         self.nodes = -1
@@ -69,7 +72,8 @@ class PathResults:
         self.__graph_id__ = None
         self.__graph_sum = None
 
-    def compute_path(self, origin: int, destination: int) -> None:
+    def compute_path(self, origin: int, destination: int, early_exit: bool = False,
+                     bidirectional: bool = False) -> None:
         """
         Computes the path between two nodes in the network
 
@@ -77,12 +81,24 @@ class PathResults:
             *origin* (:obj:`int`): Origin for the path
 
             *destination* (:obj:`int`): Destination for the path
+
+            *early_exit* (:obj:`bool`, `Optional`): Stops the search as soon as the destination is reached. Skims
+            are then only guaranteed for the destination and trace updates require a new search. Default is False
+
+            *bidirectional* (:obj:`bool`, `Optional`): Searches from both the origin and the destination at the same
+            time, which is much faster for point-to-point queries. Skims are only computed for the nodes along the
+            path and trace updates require a new search. Default is False
         """
 
         if self.graph is None:
             raise Exception('You need to set graph skimming before you compute a path')
 
-        path_computation(origin, destination, self.graph, self)
+        self.early_exit = early_exit
+        self.bidirectional = bidirectional
+        if bidirectional and origin != destination:
+            bidirectional_path_computation(origin, destination, self.graph, self)
+        else:
+            path_computation(origin, destination, self.graph, self, early_exit or bidirectional)
         if self.graph.skim_fields:
             self.skims.fill(np.inf)
             self.skims[self.graph.all_nodes, :] = self._skimming_array[:-1, :]
@@ -121,6 +137,20 @@ class PathResults:
         # where one needs to traverse all links (or almost all) in both directions.
         self.__graph_sum = 2 * graph.cost.sum()
         self.graph = graph
+        self._reverse_graph = None
+
+    def _reverse_star(self):
+        # The reverse star (links sorted by b_node) used by the backward search. It only depends on the topology
+        # and on the links closed in the graph, so we build it once for each set of closures
+        b_nodes = self.graph.b_nodes
+        if self._reverse_graph is None or self._reverse_graph[3] is not b_nodes:
+            itype = self.__integer_type
+            order = np.argsort(b_nodes, kind="stable").astype(itype)
+            reverse_fs = np.zeros(self.graph.num_nodes + 1, dtype=itype)
+            reverse_fs[1:] = np.cumsum(np.bincount(b_nodes, minlength=self.graph.num_nodes))
+            reverse_csr = self.graph.graph.a_node.values[order].astype(itype)
+            self._reverse_graph = (reverse_fs, reverse_csr, order, b_nodes)
+        return self._reverse_graph[:3]
 
     def reset(self) -> None:
         """
@@ -144,7 +174,8 @@ class PathResults:
         """
         Updates the path's nodes, links, skims and mileposts
 
-        It does not re-compute the path tree, so it saves most of the computation time
+        It does not re-compute the path tree, so it saves most of the computation time. If the path was computed
+        with *early_exit*, the tree may not reach the new destination, so the path is re-computed instead
 
         Args:
             *destination* (:obj:`int`): ID of the node we are computing the path too
@@ -155,4 +186,8 @@ class PathResults:
         if destination >= self.graph.nodes_to_indices.shape[0]:
             raise ValueError("destination out of the range of node numbers in the graph")
 
+        if self.early_exit or self.bidirectional:
+            self.compute_path(self.origin, destination, self.early_exit, self.bidirectional)
+            return
+
         update_path_trace(self, destination, self.graph)
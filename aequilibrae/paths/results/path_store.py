@@ -0,0 +1,241 @@
+import os
+import sqlite3
+import numpy as np
+import pandas as pd
+from aequilibrae.paths.graph import Graph
+
+
+class PathStore:
+    """
+    Paths used by each OD pair of a traffic class, and the flow on each one of them
+
+    Each distinct path is stored only once per OD pair and user class. Links of all paths are kept one after the other
+    in a single array of links of the compressed graph, and paths of the same OD pair are chained in a linked list,
+    so paths can be appended at any point of the assignment without moving the ones already stored.
+
+    ::
+
+        from aequilibrae.paths import TrafficAssignment
+
+        assig.set_algorithm('gradient-projection')
+        assig.execute()
+
+        paths = assigclass.results.path_store
+
+        # Flows between each OD pair that use links 123 or 456 (in any direction)
+        od_flows, link_flows = paths.select_link([123, 456])
+
+        # All paths, with their flows and links
+        path_file = paths.path_file()
+        assigclass.results.save_to_disk('path/to/paths.csv', output='path_file')
+    """
+
+    def __init__(self):
+        self.zones = 0
+        self.classes = []
+        self.num_paths = 0
+        self.num_links = 0
+        self.graph = Graph()
+
+        self.links = np.zeros(0, np.int64)  # Links of the compressed graph, for all paths
+        self.path_start = np.zeros(0, np.int64)  # Position of the first link of each path in the array of links
+        self.path_length = np.zeros(0, np.int64)
+        self.path_hash = np.zeros(0, np.uint64)
+        self.path_next = np.zeros(0, np.int64)  # Next path of the same OD pair
+        self.path_origin = np.zeros(0, np.int64)
+        self.path_destination = np.zeros(0, np.int64)
+        self.path_class = np.zeros(0, np.int64)
+        self.path_flow = np.zeros(0, np.float64)
+        self.pair_fs = np.zeros(1, np.int64)  # First OD pair of each user class and origin, in the arrays below
+        self.pair_destination = np.zeros(0, np.int64)  # Destination of each OD pair with demand
+        self.first_path = np.zeros(0, np.int64)  # First path of each OD pair with demand
+
+        self.__network_links = None
+
+    def prepare(self, graph: Graph, classes: list, demand: np.ndarray) -> None:
+        """
+        Prepares the store for the paths computed with a graph
+
+        Only OD pairs with positive demand are indexed, with those of each user class and origin stored contiguously
+        (from *pair_fs[class * zones + origin]* to *pair_fs[class * zones + origin + 1]*)
+
+        Args:
+            *graph* (:obj:`Graph`): Graph the paths are computed with
+
+            *classes* (:obj:`list`): Names of the user classes
+
+            *demand* (:obj:`np.ndarray`): Demand matrix (zones x zones x user classes)
+        """
+        self.graph = graph
+        self.zones = graph.num_zones
+        self.classes = list(classes)
+        self.num_paths = 0
+        self.num_links = 0
+
+        destinations = []
+        for m in range(len(self.classes)):
+            for origin in range(self.zones):
+                destinations.append(np.flatnonzero(np.nan_to_num(demand[origin, :, m]) > 0))
+        self.pair_fs = np.zeros(len(destinations) + 1, np.int64)
+        self.pair_fs[1:] = np.cumsum([x.shape[0] for x in destinations])
+        self.pair_destination = np.hstack(destinations + [np.zeros(0, np.int64)]).astype(np.int64)
+        self.first_path = np.full(self.pair_destination.shape[0], -1, np.int64)
+
+        self.__network_links = None
+        self.__resize(self.first_path.shape[0], self.first_path.shape[0])
+
+    def _ensure_capacity(self, paths: int, links: int) -> None:
+        # Makes room for some more paths and links. Arrays double in size to keep growth cheap
+        if self.num_paths + paths > self.path_start.shape[0]:
+            self.__resize(max(2 * self.path_start.shape[0], self.num_paths + paths), self.links.shape[0])
+        if self.num_links + links > self.links.shape[0]:
+            self.__resize(self.path_start.shape[0], max(2 * self.links.shape[0], self.num_links + links))
+
+    def __resize(self, paths: int, links: int) -> None:
+        def grow(array, size):
+            new_array = np.zeros(size, array.dtype)
+            new_array[: min(size, array.shape[0])] = array[:size]
+            return new_array
+
+        self.links = grow(self.links, links)
+        for name in ["path_start", "path_length", "path_hash", "path_next", "path_origin", "path_destination",
+                     "path_class", "path_flow"]:
+            self.__dict__[name] = grow(self.__dict__[name], paths)
+
+    def select_link(self, links: list) -> (np.ndarray, np.ndarray):
+        """
+        Flows that use any of the selected links
+
+        Args:
+            *links* (:obj:`list`): IDs of the selected links. Both directions are selected
+
+        Returns:
+            *od_flows* (:obj:`np.ndarray`): Flows between each OD pair that use the selected links (zones x zones x
+            user classes)
+
+            *link_flows* (:obj:`np.ndarray`): Link loads of those flows (links x user classes), in the same order as
+            the link loads of the assignment results
+        """
+        graph = self.graph
+        rows = np.nonzero(np.isin(graph.graph.link_id.values, np.array(links)))[0]
+        if rows.shape[0] == 0:
+            raise ValueError("None of the selected links are in the graph")
+
+        compressed = graph.graph.__compressed_id__.values.astype(np.int64)
+        selected = np.zeros(graph.compact_num_links + 1, bool)
+        selected[compressed[rows]] = True
+        selected[-1] = False
+
+        n = self.num_paths
+        used = self.path_flow[:n] > 0
+        if self.num_links > 0:
+            hits = np.add.reduceat(selected[self.links[: self.num_links]].astype(np.int64), self.path_start[:n])
+            used &= (hits > 0) & (self.path_length[:n] > 0)
+        else:
+            used[:] = False
+        paths = np.nonzero(used)[0]
+
+        od_flows = np.zeros((self.zones, self.zones, len(self.classes)))
+        np.add.at(
+            od_flows,
+            (self.path_origin[paths], self.path_destination[paths], self.path_class[paths]),
+            self.path_flow[paths],
+        )
+
+        compact_flows = np.zeros((graph.compact_num_links + 1, len(self.classes)))
+        for cls in range(len(self.classes)):
+            in_class = paths[self.path_class[paths] == cls]
+            lengths = self.path_length[in_class]
+            positions = np.repeat(self.path_start[in_class] - np.cumsum(lengths) + lengths, lengths)
+            positions += np.arange(lengths.sum())
+            flows = np.repeat(self.path_flow[in_class], lengths)
+            compact_flows[:, cls] = np.bincount(self.links[positions], weights=flows, minlength=compact_flows.shape[0])
+        compact_flows[-1, :] = 0
+        crosswalk = np.zeros(compressed.shape[0], np.int64)
+        crosswalk[graph.graph.__supernet_id__.values] = compressed
+        return od_flows, compact_flows[crosswalk, :]
+
+    def path_file(self) -> pd.DataFrame:
+        """
+        Table with all paths with flow, and their links in the order they are traversed
+
+        Returns:
+            *paths* (:obj:`pd.DataFrame`): Table with columns *origin*, *destination*, *class*, *path*, *flow*,
+            *sequence*, *link_id* and *direction*
+        """
+        n = self.num_paths
+        paths = np.nonzero(self.path_flow[:n] > 0)[0]
+        lengths = self.path_length[paths]
+        positions = np.repeat(self.path_start[paths] - np.cumsum(lengths) + lengths, lengths)
+        positions += np.arange(lengths.sum())
+        compact_links = self.links[positions]
+        path_of_link = np.repeat(paths, lengths)
+
+        # Each link of the compressed graph is expanded into the links of the network it represents
+        member_fs, rows = self.__expand_links()
+        counts = member_fs[compact_links + 1] - member_fs[compact_links]
+        starts = np.repeat(member_fs[compact_links] - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        rows = rows[starts]
+        path_of_row = np.repeat(path_of_link, counts)
+        first_row = np.zeros(paths.shape[0], np.int64)
+        path_counts = np.bincount(np.searchsorted(paths, path_of_row), minlength=paths.shape[0])
+        first_row[1:] = np.cumsum(path_counts)[:-1]
+
+        centroids = self.graph.centroids
+        return pd.DataFrame(
+            {
+                "origin": centroids[self.path_origin[path_of_row]],
+                "destination": centroids[self.path_destination[path_of_row]],
+                "class": np.array(self.classes)[self.path_class[path_of_row]],
+                "path": path_of_row,
+                "flow": self.path_flow[path_of_row],
+                "sequence": np.arange(rows.shape[0]) - np.repeat(first_row, path_counts),
+                "link_id": self.graph.graph.link_id.values[rows],
+                "direction": self.graph.graph.direction.values[rows],
+            }
+        )
+
+    def save(self, file_name: str) -> None:
+        """
+        Saves the path file to disk
+
+        Args:
+            *file_name* (:obj:`str`): Name of the file, with extension. Valid extensions are: ['csv', 'sqlite']
+        """
+        extension = os.path.splitext(file_name)[1].lower()
+        if extension not in [".csv", ".sqlite"]:
+            raise ValueError("Path files can only be saved to CSV or SQLite files")
+        df = self.path_file()
+        if extension == ".csv":
+            df.to_csv(file_name, index=False)
+        else:
+            conn = sqlite3.connect(file_name)
+            df.to_sql("path_file", conn, if_exists="replace", index=False)
+            conn.close()
+
+    def __expand_links(self):
+        # Rows of the graph that make up each link of the compressed graph, in the order they are traversed
+        if self.__network_links is not None:
+            return self.__network_links
+
+        graph = self.graph
+        num_links = graph.compact_num_links
+        compressed = graph.graph.__compressed_id__.values.astype(np.int64)
+        a_nodes = graph.graph.a_node.values
+        b_nodes = graph.graph.b_node.values
+
+        in_compact = np.nonzero(compressed < num_links)[0]
+        rows = in_compact[np.argsort(compressed[in_compact], kind="stable")]
+        member_fs = np.zeros(num_links + 1, np.int64)
+        member_fs[1:] = np.cumsum(np.bincount(compressed[in_compact], minlength=num_links))
+
+        for link in np.nonzero(np.diff(member_fs) > 1)[0]:
+            chain = rows[member_fs[link] : member_fs[link + 1]]
+            following = {a_nodes[x]: x for x in chain}
+            current = [x for x in chain if a_nodes[x] not in set(b_nodes[chain])][0]
+            for i in range(chain.shape[0]):
+                rows[member_fs[link] + i] = current
+                current = following.get(b_nodes[current], current)
+
+        self.__network_links = (member_fs, rows)
+        return self.__network_links
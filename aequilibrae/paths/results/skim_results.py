@@ -1,8 +1,16 @@
+import importlib.util as iutil
+import os
 import numpy as np
 import multiprocessing as mp
 from aequilibrae.matrix.aequilibrae_matrix import AequilibraeMatrix
 from aequilibrae.paths.graph import Graph
 
+spec = iutil.find_spec("openmatrix")
+has_omx = spec is not None
+if has_omx:
+    import openmatrix as omx
+    import tables
+
 
 class SkimResults:
     """
@@ -30,6 +38,12 @@ class SkimResults:
           res.compute_skims()
 
           res.skims.export('path/to/matrix.aem')
+
+          # For very large skim sets, skims can be streamed to a file while they are computed, so only a block of
+          # origins is kept in memory at a time
+          res = SkimResults()
+          res.set_output('path/to/skims.omx', block_size=256)
+          res.prepare(car_graph)
     """
 
     def __init__(self):
@@ -43,6 +57,38 @@ class SkimResults:
         self.__graph_id__ = None
         self.graph = Graph()
 
+        self.output = None  # File the skims are streamed to, if any
+        self.block_size = 0  # Number of origins skimmed before each write to the output file
+        self.__omx_file = None
+        self.__block = np.array([])  # Skims of the current block of origins, when streaming to OMX
+        self.__block_rows = {}  # Row of each origin in the current block
+
+    def set_output(self, file_name: str, block_size: int = 256) -> None:
+        """
+        Streams skims to a file while they are computed, instead of holding them all until they are saved
+
+        Origins are skimmed in blocks. For AEM files, the skim matrix is memory-mapped on the file itself and flushed
+        to disk after each block. For OMX files, only the skims of the current block are kept in memory, and they are
+        written to chunked datasets after each block. Needs to be set before the results are prepared
+
+        Args:
+            *file_name* (:obj:`str`): Path to the output file, with extension *aem* or *omx*
+
+            *block_size* (:obj:`int`, `Optional`): Number of origins in each block. Defaults to 256
+        """
+        extension = os.path.splitext(file_name)[1].lower()
+        if extension not in [".aem", ".omx"]:
+            raise ValueError("Skims can only be streamed to AEM or OMX files")
+        if extension == ".omx" and not has_omx:
+            raise ValueError("Open Matrix is not installed. Cannot continue")
+        if not isinstance(block_size, int) or block_size < 1:
+            raise ValueError("Block size needs to be a positive integer")
+        if os.path.isfile(file_name):
+            raise FileExistsError(f"{file_name} already exists")
+
+        self.output = file_name
+        self.block_size = block_size
+
     def prepare(self, graph: Graph):
         """
         Prepares the object with dimensions corresponding to the graph objects
@@ -60,14 +106,63 @@ class SkimResults:
         self.num_skims = len(graph.skim_fields)
 
         self.skims = AequilibraeMatrix()
-        self.skims.create_empty(
-            file_name=AequilibraeMatrix().random_name(), zones=self.zones, matrix_names=graph.skim_fields
-        )
+        self.__graph_id__ = graph.__id__
+        self.graph = graph
+        if self.output is not None and self.output.lower().endswith(".omx"):
+            self.__create_omx(graph)
+            return
+
+        file_name = AequilibraeMatrix().random_name() if self.output is None else self.output
+        self.skims.create_empty(file_name=file_name, zones=self.zones, matrix_names=graph.skim_fields)
         self.skims.index[:] = graph.centroids[:]
         self.skims.computational_view(core_list=self.skims.names)
         self.skims.matrix_view = self.skims.matrix_view.reshape(self.zones, self.zones, self.num_skims)
-        self.__graph_id__ = graph.__id__
-        self.graph = graph
+
+    def __create_omx(self, graph: Graph):
+        # Rows are chunked one by one, so each origin is written to its own chunks
+        self.__omx_file = omx.open_file(self.output, "w")
+        for name in graph.skim_fields:
+            self.__omx_file.create_matrix(
+                name,
+                atom=tables.Float64Atom(dflt=np.nan),
+                shape=(self.zones, self.zones),
+                chunkshape=(1, self.zones),
+            )
+        self.__omx_file.create_mapping("main_index", graph.centroids)
+        self.__block = np.full((self.block_size, self.zones, self.num_skims), np.inf)
+
+    def _start_block(self, origin_indices: np.ndarray) -> None:
+        # Called before skimming each block of origins
+        if self.__omx_file is not None:
+            self.__block_rows = {int(x): i for i, x in enumerate(origin_indices)}
+
+    def _skim_row(self, origin_index: int) -> np.ndarray:
+        # Array (destinations x skims) where the binaries write the skims from an origin
+        if self.__omx_file is not None:
+            return self.__block[self.__block_rows[origin_index], :, :]
+        return self.skims.matrix_view[origin_index, :, :]
+
+    def _write_block(self) -> None:
+        # Called once all origins in a block were skimmed
+        if self.__omx_file is not None:
+            for origin_index, row in self.__block_rows.items():
+                for i, name in enumerate(self.graph.skim_fields):
+                    self.__omx_file[name][origin_index, :] = self.__block[row, :, i]
+            self.__block_rows = {}
+        elif self.output is not None:
+            self.skims.matrices.flush()
+
+    def _finish_output(self) -> None:
+        # Closes the output file, if any, and loads the skims from it
+        if self.__omx_file is None:
+            if self.output is not None:
+                self.skims.matrices.flush()
+            return
+        self.__omx_file.close()
+        self.__omx_file = None
+        self.__block = np.array([])
+        self.skims = AequilibraeMatrix()
+        self.skims.load(self.output)
 
     def set_cores(self, cores: int) -> None:
         """
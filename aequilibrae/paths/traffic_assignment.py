@@ -10,6 +10,8 @@ import pandas as pd
 from aequilibrae.project.database_connection import ENVIRON_VAR
 from aequilibrae.paths.all_or_nothing import allOrNothing
 from aequilibrae.paths.linear_approximation import LinearApproximation
+from aequilibrae.paths.algorithm_b import AlgorithmB
+from aequilibrae.paths.gradient_projection import GradientProjection
 from aequilibrae.paths.vdf import VDF, all_vdf_functions
 from aequilibrae.paths.traffic_class import TrafficClass
 from aequilibrae.matrix import AequilibraeData
@@ -72,6 +74,10 @@ class TrafficAssignment(object):
         assig.max_iter = 1000
         assig.rgap_target = 0.00001
 
+        # skims are blended over all iterations by default, but blending them only over the last ones saves a lot of
+        # memory traffic on large models
+        assig.skim_blending_iterations = 10
+
         assig.execute() # we then execute the assignment
 
         # Convergence report is here
@@ -94,7 +100,7 @@ class TrafficAssignment(object):
     """
 
     bpr_parameters = ["alpha", "beta"]
-    all_algorithms = ["all-or-nothing", "msa", "frank-wolfe", "fw", "cfw", "bfw"]
+    all_algorithms = ["all-or-nothing", "msa", "frank-wolfe", "fw", "cfw", "bfw", "algorithm-b", "gradient-projection"]
 
     def __init__(self) -> None:
         parameters = Parameters().parameters["assignment"]["equilibrium"]
@@ -117,6 +123,8 @@ class TrafficAssignment(object):
         self.__dict__["description"] = ""
         self.__dict__["procedure_date"] = str(datetime.today())
         self.__dict__["steps_below_needed_to_terminate"] = 1
+        # Number of final iterations over which skims are blended. All of them if None
+        self.__dict__["skim_blending_iterations"] = None  # type: int
 
     def __setattr__(self, instance, value) -> None:
 
@@ -130,13 +138,18 @@ class TrafficAssignment(object):
         if instance == "rgap_target":
             if not isinstance(value, float):
                 return False, value, "Relative gap needs to be a float"
-            if isinstance(self.assignment, LinearApproximation):
+            if isinstance(self.assignment, (LinearApproximation, AlgorithmB)):
                 self.assignment.rgap_target = value
         elif instance == "max_iter":
             if not isinstance(value, int):
                 return False, value, "Number of iterations needs to be an integer"
-            if isinstance(self.assignment, LinearApproximation):
+            if isinstance(self.assignment, (LinearApproximation, AlgorithmB)):
                 self.assignment.max_iter = value
+        elif instance == "skim_blending_iterations":
+            if value is not None and (not isinstance(value, int) or value < 1):
+                return False, value, "Number of skim blending iterations needs to be a positive integer or None"
+            if isinstance(self.assignment, LinearApproximation):
+                self.assignment.skim_blending_iterations = value
         elif instance == "vdf":
             v = value.lower()
             if v not in all_vdf_functions:
@@ -216,7 +229,9 @@ class TrafficAssignment(object):
         """
         Chooses the assignment algorithm. e.g. 'frank-wolfe', 'bfw', 'msa'
 
-        'fw' is also accepted as an alternative to 'frank-wolfe'
+        'fw' is also accepted as an alternative to 'frank-wolfe'. 'algorithm-b' (bush-based) and
+        'gradient-projection' (path-based) converge to much tighter relative gaps than the others, and the latter
+        also keeps the flows on each path, available in the *path_store* of the results of each class
 
         Args:
             algorithm (:obj:`list`): Algorithm to be used
@@ -233,6 +248,10 @@ class TrafficAssignment(object):
 
         if algo in ["all-or-nothing", "msa", "frank-wolfe", "cfw", "bfw"]:
             self.assignment = LinearApproximation(self, algo)
+        elif algo == "algorithm-b":
+            self.assignment = AlgorithmB(self, algo)
+        elif algo == "gradient-projection":
+            self.assignment = GradientProjection(self, algo)
         else:
             raise Exception("Algorithm not listed in the case selection")
 
@@ -295,6 +314,36 @@ class TrafficAssignment(object):
             c.results.set_cores(cores)
             c._aon_results.set_cores(cores)
 
+    def set_processes(self, processes: int) -> None:
+        """Allows one to spread the all-or-nothing assignment across worker processes AFTER traffic classes have
+        been added
+
+            Inherited from :obj:`AssignmentResults`
+
+        Args:
+            processes (:obj:`int`): Number of worker processes to use. Cores are divided among them
+        """
+        if not self.classes:
+            raise Exception("You need load traffic classes before setting the number of processes")
+
+        for c in self.classes:
+            c._aon_results.set_processes(processes)
+
+    def set_load_buffers(self, buffers: int) -> None:
+        """Allows one to reduce the memory used by link loads during the all-or-nothing assignment AFTER traffic
+        classes have been added
+
+            Inherited from :obj:`AssignmentResults`
+
+        Args:
+            buffers (:obj:`int`): Number of link load buffers shared by threads. Zero means one per thread
+        """
+        if not self.classes:
+            raise Exception("You need load traffic classes before setting the number of load buffers")
+
+        for c in self.classes:
+            c._aon_results.set_load_buffers(buffers)
+
     def set_time_field(self, time_field: str) -> None:
         """
         Sets the graph field that contains free flow travel time -> e.g. 'fftime'
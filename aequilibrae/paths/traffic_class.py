@@ -89,6 +89,15 @@ class TrafficClass():
 
         self.vot = float(value_of_time)
 
+    def set_closed_links(self, links: list) -> None:
+        """Closes links for this class only, without changing the graph shared with other classes
+
+        Args:
+            links (:obj:`list`): List of link IDs to close. An empty list re-opens all of them
+        """
+        self.results.set_closed_links(links)
+        self._aon_results.set_closed_links(links)
+
     def __setattr__(self, key, value):
 
         if key not in ['graph', 'matrix', 'pce', 'mode', 'class_flow', 'results',
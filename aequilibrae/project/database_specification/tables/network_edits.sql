@@ -0,0 +1,4 @@
+-- Log of all changes to links and nodes, which is filled by triggers and used to invalidate cached graphs
+create TABLE if not exists network_edits (edit_id     INTEGER PRIMARY KEY AUTOINCREMENT,
+                                          table_name  TEXT    NOT NULL,
+                                          element_id  INTEGER NOT NULL);
@@ -0,0 +1,40 @@
+-- Records the IDs of all links and nodes that are added, changed or removed in the network_edits table
+--
+
+--#
+create trigger network_edits_link_insert after insert on links
+  BEGIN
+    INSERT INTO network_edits (table_name, element_id) VALUES ('links', new.link_id);
+  END;
+
+--#
+create trigger network_edits_link_update after update on links
+  BEGIN
+    INSERT INTO network_edits (table_name, element_id) VALUES ('links', new.link_id);
+    INSERT INTO network_edits (table_name, element_id) SELECT 'links', old.link_id WHERE old.link_id != new.link_id;
+  END;
+
+--#
+create trigger network_edits_link_delete after delete on links
+  BEGIN
+    INSERT INTO network_edits (table_name, element_id) VALUES ('links', old.link_id);
+  END;
+
+--#
+create trigger network_edits_node_insert after insert on nodes
+  BEGIN
+    INSERT INTO network_edits (table_name, element_id) VALUES ('nodes', new.node_id);
+  END;
+
+--#
+create trigger network_edits_node_update after update on nodes
+  BEGIN
+    INSERT INTO network_edits (table_name, element_id) VALUES ('nodes', new.node_id);
+    INSERT INTO network_edits (table_name, element_id) SELECT 'nodes', old.node_id WHERE old.node_id != new.node_id;
+  END;
+
+--#
+create trigger network_edits_node_delete after delete on nodes
+  BEGIN
+    INSERT INTO network_edits (table_name, element_id) VALUES ('nodes', old.node_id);
+  END;
@@ -0,0 +1,128 @@
+import hashlib
+import json
+import os
+import shutil
+from os.path import join, dirname, realpath
+from sqlite3 import Connection
+from typing import Optional, Tuple
+from uuid import uuid4
+from aequilibrae.paths import Graph
+from aequilibrae.project.project_creation import run_queries_from_sql_file
+from aequilibrae import logger
+
+
+class GraphCache:
+    """
+    Graphs built for each mode, kept in the *graph_cache* folder of the project
+
+    Each graph is stored with :meth:`Graph.save_to_folder` under a key that hashes the mode, the fields in the graph
+    and the structure of the links table, together with the state of the network when it was built: the last edit
+    recorded in the *network_edits* table and the size of the links and nodes tables. All edits to links and nodes
+    are recorded in that table by triggers, so the edits made since a graph was cached can be applied to it instead
+    of building it from scratch. The table and its triggers are only added to a project the first time the cache is
+    used, and edits older than all cached graphs are removed from it whenever a graph is saved.
+
+    Changes made while the network triggers are disabled are not tracked, so the cache should be cleared with
+    :meth:`clear` after any such change.
+    """
+
+    def __init__(self, conn: Connection, project_base_path: str):
+        self.conn = conn
+        self.folder = join(project_base_path, "graph_cache")
+        self.__ensure_edit_log()
+
+    def key(self, mode: str, fields: list) -> str:
+        """Returns the key of the graph for a mode with a given set of fields"""
+        table_info = self.conn.execute("PRAGMA table_info(links);").fetchall()
+        return hashlib.sha1(str([mode, sorted(fields), table_info]).encode()).hexdigest()
+
+    def state(self) -> dict:
+        """Returns the current state of the network"""
+        curr = self.conn.cursor()
+        last_edit = curr.execute("select seq from sqlite_sequence where name='network_edits'").fetchone()
+        return {
+            "last_edit": 0 if last_edit is None else last_edit[0],
+            "links": list(curr.execute("select count(*), max(link_id) from links").fetchone()),
+            "nodes": list(curr.execute("select count(*), max(node_id), sum(is_centroid) from nodes").fetchone()),
+        }
+
+    def edits_since(self, last_edit: int) -> Tuple[list, list]:
+        """Returns the IDs of links and nodes edited since a given edit"""
+        sql = "select distinct element_id from network_edits where table_name=? and edit_id > ?"
+        links = [x[0] for x in self.conn.execute(sql, ["links", last_edit]).fetchall()]
+        nodes = [x[0] for x in self.conn.execute(sql, ["nodes", last_edit]).fetchall()]
+        return links, nodes
+
+    def load(self, mode: str, key: str) -> Tuple[Optional[Graph], Optional[dict]]:
+        """Returns the graph stored for a mode under a key and the state of the network it was built for"""
+        entries = [x for x in self.__entries(mode) if x.startswith(f"{mode}_{key}_")]
+        entries = [x for x in entries if x.rsplit("_", 1)[-1].isdigit()]
+        if not entries:
+            return None, None
+        # Copies that could not be removed yet (e.g. still memory-mapped) are older than the latest one
+        folder = join(self.folder, max(entries, key=lambda x: int(x.rsplit("_", 1)[-1])))
+        graph = Graph()
+        try:
+            with open(join(folder, "state.json"), "r") as f:
+                state = json.load(f)
+            graph.load_from_folder(join(folder, "graph"))
+        except Exception as e:
+            logger.warning(f"Could not load cached graph for mode {mode}. {e.args}")
+            return None, None
+        return graph, state
+
+    def save(self, graph: Graph, key: str, state: dict) -> None:
+        """Stores a graph under a key, replacing any other graph stored for its mode"""
+        os.makedirs(self.folder, exist_ok=True)
+
+        # Saved to a temporary folder first, so a failure never leaves an incomplete graph under a valid key
+        temp_folder = join(self.folder, f"temp_{uuid4().hex}")
+        graph.save_to_folder(join(temp_folder, "graph"))
+        with open(join(temp_folder, "state.json"), "w") as f:
+            json.dump(state, f)
+        self.clear(graph.mode)
+        target = join(self.folder, f"{graph.mode}_{key}_{state['last_edit']}")
+        if os.path.exists(target):
+            # A copy of the graph for this same state is still in use, so it is kept instead
+            shutil.rmtree(temp_folder, ignore_errors=True)
+        else:
+            os.replace(temp_folder, target)
+        self.__prune_edit_log()
+
+    def clear(self, mode: str = None) -> bool:
+        """Removes the cached graphs for one mode, or for all modes if none is given
+
+        Returns whether all of them were removed. Graphs still in use (e.g. memory-mapped on Windows) are left behind
+        and removed by a later call"""
+        cleared = True
+        for entry in self.__entries(mode):
+            shutil.rmtree(join(self.folder, entry), ignore_errors=True)
+            if os.path.exists(join(self.folder, entry)):
+                logger.warning(f"Could not remove cached graph {entry}. It is probably still in use")
+                cleared = False
+        return cleared
+
+    def __entries(self, mode: str = None) -> list:
+        if not os.path.isdir(self.folder):
+            return []
+        return [x for x in os.listdir(self.folder) if mode is None or x.startswith(f"{mode}_")]
+
+    def __prune_edit_log(self):
+        # No cached graph needs the edits up to the oldest one it was built for, so the log does not grow forever
+        last_edits = [x.rsplit("_", 1)[-1] for x in self.__entries() if not x.startswith("temp_")]
+        last_edits = [int(x) for x in last_edits if x.isdigit()]
+        if not last_edits:
+            return
+        self.conn.execute("delete from network_edits where edit_id <= ?", [min(last_edits)])
+        self.conn.commit()
+
+    def __ensure_edit_log(self):
+        # Projects only get the edit log (and its triggers) the first time the cache is used
+        curr = self.conn.cursor()
+        curr.execute("select count(*) from sqlite_master where type='table' and name='network_edits'")
+        if curr.fetchone()[0]:
+            return
+        spec_folder = join(dirname(dirname(realpath(__file__))), "database_specification")
+        run_queries_from_sql_file(self.conn, join(spec_folder, "tables", "network_edits.sql"))
+        run_queries_from_sql_file(self.conn, join(spec_folder, "triggers", "network_edits_triggers.sql"))
+        self.conn.commit()
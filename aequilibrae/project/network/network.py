@@ -1,4 +1,5 @@
 import math
+from os.path import dirname
 from warnings import warn
 from sqlite3 import Connection as sqlc
 from typing import Dict
@@ -15,6 +16,7 @@ from aequilibrae.project.network.modes import Modes
 from aequilibrae.project.network.link_types import LinkTypes
 from aequilibrae.project.network.links import Links
 from aequilibrae.project.network.nodes import Nodes
+from aequilibrae.project.network.graph_cache import GraphCache
 from aequilibrae.paths import Graph
 from aequilibrae.parameters import Parameters
 from aequilibrae import logger
@@ -219,7 +221,7 @@ class Network:
 
         logger.info("Network built successfully")
 
-    def build_graphs(self, fields: list = None, modes: list = None) -> None:
+    def build_graphs(self, fields: list = None, modes: list = None, use_cache: bool = False) -> None:
         """Builds graphs for all modes currently available in the model
 
         When called, it overwrites all graphs previously created and stored in the networks'
@@ -230,6 +232,9 @@ class Network:
                                               database, it may be useful to specify which fields to use
             *modes* (:obj:`list`, optional): When working with very large graphs with large number of fields in the
                                               database, it may be useful to generate only those we need
+            *use_cache* (:obj:`bool`, optional): Loads graphs from the project's graph cache when the network has not
+                                                 changed since they were cached, and caches the graphs it builds.
+                                                 Defaults to False
 
         To use the *fields* parameter, a minimalistic option is the following
         ::
@@ -258,6 +263,26 @@ class Network:
         elif isinstance(modes, str):
             modes = [modes]
 
+        if use_cache:
+            cache = GraphCache(self.conn, dirname(self.source))
+            state = cache.state()
+            keys = {m: cache.key(m, all_fields) for m in modes}
+            missing = []
+            for m in modes:
+                g, cached_state = cache.load(m, keys[m])
+                if g is not None and cached_state != state:
+                    # Edits made since the graph was cached are applied to it, whenever possible
+                    g = self.__update_graph(g, cache.edits_since(cached_state["last_edit"]), state, cached_state)
+                    if g is not None:
+                        cache.save(g, keys[m], state)
+                if g is None:
+                    missing.append(m)
+                else:
+                    self.graphs[m] = g
+            modes = missing
+            if not modes:
+                return
+
         sql = f"select {','.join(all_fields)} from links"
 
         df = pd.read_sql(sql, self.conn).fillna(value=np.nan)
@@ -275,6 +300,39 @@ class Network:
             g.prepare_graph(centroids)
             g.set_blocked_centroid_flows(True)
             self.graphs[m] = g
+            if use_cache:
+                cache.save(g, keys[m], state)
+
+    def __update_graph(self, graph: Graph, edits: tuple, state: dict, cached_state: dict):
+        # Returns the graph with the edits applied, or None if it needs to be built from scratch
+        link_ids, _ = edits
+        if state["last_edit"] == cached_state["last_edit"] or len(link_ids) > graph.network.shape[0] / 10:
+            # Changes were not recorded by the triggers, or are too many to be worth applying one by one
+            return None
+
+        curr = self.conn.cursor()
+        curr.execute("select node_id from nodes where is_centroid=1 order by node_id;")
+        centroids = np.array([i[0] for i in curr.fetchall()], np.uint32)
+        if not np.array_equal(centroids, graph.centroids):
+            return None
+
+        if not link_ids:
+            return graph
+
+        fields = [x for x in graph.network.columns if x != "id"]
+        sql = f"select {','.join(fields)} from links where link_id in ({','.join(str(x) for x in link_ids)})"
+        df = pd.read_sql(sql, self.conn).fillna(value=np.nan)
+        try:
+            df = df.astype({x: graph.network[x].dtype for x in fields})
+        except (ValueError, TypeError):
+            # A field no longer has the same type it had when the graph was built
+            return None
+        df.loc[~df.modes.str.contains(graph.mode), "b_node"] = df.loc[~df.modes.str.contains(graph.mode), "a_node"]
+
+        existing = set(df.link_id.values)
+        removed = [x for x in link_ids if x not in existing]
+        graph.update_links(df, removed)
+        return graph
 
     def set_time_field(self, time_field: str) -> None:
         """
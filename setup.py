@@ -1,5 +1,6 @@
 import sys
 import os
+import platform
 import numpy as np
 from setuptools import setup, find_packages
 from setuptools import Extension
@@ -10,7 +11,19 @@ sys.dont_write_bytecode = True
 
 here = os.path.dirname(os.path.realpath(__file__))
 whole_path = os.path.join(here, "aequilibrae/paths", "AoN.pyx")
-ext_module = Extension("aequilibrae.paths.AoN", [whole_path], include_dirs=[np.get_include()])
+
+if "WINDOWS" in platform.platform().upper():
+    openmp_flags = ["/openmp"]
+else:
+    openmp_flags = ["-fopenmp"]
+
+ext_module = Extension(
+    "aequilibrae.paths.AoN",
+    [whole_path],
+    extra_compile_args=openmp_flags,
+    extra_link_args=openmp_flags,
+    include_dirs=[np.get_include()],
+)
 
 pkgs = [pkg for pkg in find_packages()]
 
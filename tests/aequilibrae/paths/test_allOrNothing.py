@@ -2,10 +2,12 @@ import os
 from tempfile import gettempdir
 from unittest import TestCase
 import uuid
+import numpy as np
 from aequilibrae.utils.create_example import create_example
-from aequilibrae.paths import Graph
+from aequilibrae.paths import Graph, close_process_pools
 from aequilibrae.paths.results import AssignmentResults
 from aequilibrae.paths.all_or_nothing import allOrNothing
+from aequilibrae.matrix import AequilibraeMatrix
 from ...data import test_graph
 
 
@@ -66,3 +68,118 @@ class TestAllOrNothing(TestCase):
         load2 = res2.get_load_results()
 
         self.assertEqual(list(load1.matrix_tot * 2), list(load2.matrix_tot), "Something wrong with the AoN")
+
+    def test_execute_in_blocks(self):
+        loads = []
+        for cores, steps in [(1, 1), (2, 3), (4, 1000)]:
+            res = AssignmentResults()
+            res.prepare(self.g, self.matrix)
+            res.set_cores(cores)
+            assig = allOrNothing(self.matrix, self.g, res)
+            assig.progress_steps = steps
+            assig.execute()
+            loads.append(res.link_loads.copy())
+
+        for load in loads[1:]:
+            self.assertTrue(np.allclose(loads[0], load), "Assignment results depend on the split of origins")
+
+    def test_execute_processes(self):
+        res1 = AssignmentResults()
+        res1.prepare(self.g, self.matrix)
+        allOrNothing(self.matrix, self.g, res1).execute()
+
+        res2 = AssignmentResults()
+        res2.prepare(self.g, self.matrix)
+        res2.set_processes(2)
+        allOrNothing(self.matrix, self.g, res2).execute()
+
+        self.assertTrue(np.allclose(res1.link_loads, res2.link_loads), "Process backend returned different loads")
+        self.assertTrue(np.allclose(res1.skims.matrix_view, res2.skims.matrix_view), "Process backend skims differ")
+        self.assertTrue(np.array_equal(res1.no_path, res2.no_path), "Process backend no_path differs")
+
+        # Arrays shared with the workers are kept with the results and re-used by the next call
+        shared = {key: val.descriptor for key, val in res2.multi_process_aon.shared.items()}
+        allOrNothing(self.matrix, self.g, res2).execute()
+        self.assertEqual(shared, {key: val.descriptor for key, val in res2.multi_process_aon.shared.items()})
+        self.assertTrue(np.allclose(res1.link_loads, res2.link_loads), "Loads changed when re-using shared arrays")
+
+        close_process_pools()
+        self.assertEqual(res2.multi_process_aon.shared, {}, "Shared arrays not released")
+        res2.link_loads.fill(0)
+        allOrNothing(self.matrix, self.g, res2).execute()
+        self.assertTrue(np.allclose(res1.link_loads, res2.link_loads), "Process pool was not re-created after closing")
+
+        with self.assertRaises(ValueError):
+            res2.set_processes(0)
+
+    def test_execute_shared_load_buffers(self):
+        res1 = AssignmentResults()
+        res1.prepare(self.g, self.matrix)
+        allOrNothing(self.matrix, self.g, res1).execute()
+
+        res2 = AssignmentResults()
+        res2.prepare(self.g, self.matrix)
+        res2.set_load_buffers(1)
+        assig = allOrNothing(self.matrix, self.g, res2)
+        assig.execute()
+
+        self.assertEqual(assig.aux_res.temp_link_loads.shape[0], 1, "Link load buffers were not shared")
+        self.assertTrue(np.allclose(res1.link_loads, res2.link_loads), "Shared buffers returned different loads")
+
+        with self.assertRaises(ValueError):
+            res2.set_load_buffers(-1)
+
+    def test_execute_single_precision(self):
+        res1 = AssignmentResults()
+        res1.prepare(self.g, self.matrix)
+        allOrNothing(self.matrix, self.g, res1).execute()
+
+        self.g.set_precision("single")
+        res2 = AssignmentResults()
+        res2.prepare(self.g, self.matrix)
+        allOrNothing(self.matrix, self.g, res2).execute()
+
+        self.assertEqual(res2.link_loads.dtype, np.float64, "Results should remain in double precision")
+        self.assertTrue(np.allclose(res1.link_loads, res2.link_loads, rtol=1e-5), "Single precision loads differ")
+        self.assertTrue(np.allclose(res1.skims.matrix_view, res2.skims.matrix_view, rtol=1e-5), "Skims differ")
+
+    def test_execute_reordered_nodes(self):
+        res1 = AssignmentResults()
+        res1.prepare(self.g, self.matrix)
+        allOrNothing(self.matrix, self.g, res1).execute()
+
+        self.g.set_node_order("rcm")
+        res2 = AssignmentResults()
+        res2.prepare(self.g, self.matrix)
+        allOrNothing(self.matrix, self.g, res2).execute()
+
+        self.assertTrue(np.allclose(res1.skims.matrix_view, res2.skims.matrix_view), "Node order changed skims")
+
+    def test_execute_classes_without_demand(self):
+        # The second class has no demand at all, and the first origin has no demand in any class
+        demand = np.nan_to_num(np.array(self.matrix.matrix_view).reshape(self.matrix.zones, self.matrix.zones))
+        demand[0, :] = 0
+        mat = AequilibraeMatrix()
+        mat.create_empty(file_name=mat.random_name(), zones=self.matrix.zones, matrix_names=["a", "b", "c"])
+        mat.index[:] = self.matrix.index[:]
+        mat.matrices[:, :, 0] = demand
+        mat.matrices[:, :, 2] = demand * 3
+        mat.computational_view(["a", "b", "c"])
+
+        single = AequilibraeMatrix()
+        single.create_empty(file_name=single.random_name(), zones=self.matrix.zones, matrix_names=["a"])
+        single.index[:] = self.matrix.index[:]
+        single.matrices[:, :, 0] = demand
+        single.computational_view(["a"])
+
+        res1 = AssignmentResults()
+        res1.prepare(self.g, single)
+        allOrNothing(single, self.g, res1).execute()
+
+        res2 = AssignmentResults()
+        res2.prepare(self.g, mat)
+        allOrNothing(mat, self.g, res2).execute()
+
+        self.assertTrue(np.allclose(res2.link_loads[:, 0], res1.link_loads[:, 0]), "Wrong loads for the first class")
+        self.assertEqual(res2.link_loads[:, 1].sum(), 0, "Class without demand was loaded")
+        self.assertTrue(np.allclose(res2.link_loads[:, 2], res1.link_loads[:, 0] * 3), "Wrong loads for the last class")
@@ -0,0 +1,55 @@
+from os.path import join
+from tempfile import gettempdir
+from unittest import TestCase
+from uuid import uuid4
+
+import numpy as np
+
+from aequilibrae.paths import NetworkSkimming
+from aequilibrae.utils.create_example import create_example
+
+
+class TestContractionHierarchy(TestCase):
+    def setUp(self) -> None:
+        self.project = create_example(join(gettempdir(), "test_cch_" + uuid4().hex))
+        self.project.network.build_graphs()
+        self.graph = self.project.network.graphs["c"]
+        self.graph.set_graph("free_flow_time")
+        self.graph.set_skimming(["free_flow_time", "distance"])
+        self.graph.set_blocked_centroid_flows(False)
+
+    def tearDown(self) -> None:
+        self.project.close()
+
+    def __skims(self):
+        skm = NetworkSkimming(self.graph)
+        skm.execute()
+        return np.array(skm.results.skims.matrix_view)
+
+    def test_skimming(self):
+        dijkstra = self.__skims()
+        self.graph.build_contraction_hierarchy()
+        np.testing.assert_array_almost_equal(dijkstra[:, :, 0], self.__skims()[:, :, 0])
+
+    def test_customization(self):
+        self.graph.build_contraction_hierarchy()
+        self.graph.set_graph("distance")
+        self.graph.set_skimming(["distance"])
+        hierarchy = self.__skims()
+
+        self.graph.contraction_hierarchy = None
+        np.testing.assert_array_almost_equal(self.__skims(), hierarchy)
+
+    def test_query(self):
+        self.graph.build_contraction_hierarchy()
+        cost, skims = self.graph.contraction_hierarchy.query(5, 2)
+        self.assertEqual(cost, 9, "Point-to-point query returned the wrong cost")
+        self.assertEqual(skims[0], 9, "Point-to-point query returned the wrong skims")
+
+        with self.assertRaises(ValueError):
+            self.graph.contraction_hierarchy.query(5, 10000)
+
+    def test_prepare_discards_hierarchy(self):
+        self.graph.build_contraction_hierarchy()
+        self.graph.prepare_graph(self.graph.centroids)
+        self.assertIsNone(self.graph.contraction_hierarchy, "Hierarchy should be discarded with the graph topology")
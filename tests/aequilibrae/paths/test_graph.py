@@ -2,6 +2,7 @@ from unittest import TestCase
 import os
 import tempfile
 import numpy as np
+import pandas as pd
 from aequilibrae.paths import Graph
 from os.path import join
 from uuid import uuid4
@@ -56,6 +57,107 @@ class TestGraph(TestCase):
         new_graph = Graph()
         new_graph.load_from_disk(join(path_test, "aequilibrae_test_graph.aeg"))
 
+    def test_save_to_folder(self):
+        self.graph.set_graph("distance")
+        self.graph.set_skimming(["distance", "free_flow_time"])
+        folder = join(tempfile.gettempdir(), uuid4().hex)
+        self.graph.save_to_folder(folder)
+
+        new_graph = Graph()
+        new_graph.load_from_folder(folder)
+        self.assertEqual(new_graph.__id__, self.graph.__id__, "Graph ID not loaded")
+        self.assertEqual(new_graph.cost_field, "distance", "Cost field not loaded")
+        self.assertEqual(new_graph.skim_fields, ["distance", "free_flow_time"], "Skim fields not loaded")
+        self.assertListEqual(sorted(new_graph.graph.columns), sorted(self.graph.graph.columns), "Wrong graph fields")
+        for array in ["fs", "cost", "compact_fs", "compact_cost", "compact_skims", "centroids"]:
+            self.assertTrue(np.array_equal(getattr(new_graph, array), getattr(self.graph, array)), f"Wrong {array}")
+
+        # The compressed graph is kept, so the loaded graph can have its cost changed without being prepared
+        new_graph.set_graph("free_flow_time")
+        self.graph.set_graph("free_flow_time")
+        self.assertTrue(np.array_equal(new_graph.compact_cost, self.graph.compact_cost), "Wrong compressed graph")
+
+    def test_save_to_folder_overwrite(self):
+        folder = join(tempfile.gettempdir(), uuid4().hex)
+        os.makedirs(folder)
+        with open(join(folder, "other_file.txt"), "w") as f:
+            f.write("not a graph")
+        with self.assertRaises(FileExistsError):
+            self.graph.save_to_folder(folder)
+
+        # A folder holding a saved graph can be overwritten, but files that are not part of the graph are kept
+        os.remove(join(folder, "other_file.txt"))
+        self.graph.save_to_folder(folder)
+        with open(join(folder, "other_file.txt"), "w") as f:
+            f.write("not a graph")
+        self.graph.save_to_folder(folder)
+        self.assertTrue(os.path.isfile(join(folder, "other_file.txt")), "Files not written by the graph were removed")
+        new_graph = Graph()
+        new_graph.load_from_folder(folder)
+        self.assertTrue(np.array_equal(new_graph.compact_fs, self.graph.compact_fs), "Overwritten graph not loaded")
+
+    def test_save_to_folder_text_nulls(self):
+        network = self.graph.network.copy()
+        network["name"] = "some road"
+        network.loc[::2, "name"] = None
+        graph = Graph()
+        graph.network = network
+        graph.prepare_graph(self.graph.centroids)
+
+        folder = join(tempfile.gettempdir(), uuid4().hex)
+        graph.save_to_folder(folder)
+        new_graph = Graph()
+        new_graph.load_from_folder(folder)
+        names = new_graph.network["name"]
+        self.assertTrue(np.array_equal(names.isna().values, network["name"].isna().values), "Nulls not restored")
+        self.assertTrue((names[names.notna()] == "some road").all(), "Text not restored")
+
+    def test_load_from_disk_memory_mapped(self):
+        folder = join(tempfile.gettempdir(), uuid4().hex)
+        self.graph.save_to_folder(folder)
+
+        new_graph = Graph()
+        new_graph.load_from_disk(folder)
+        self.assertIsInstance(new_graph.compact_fs, np.memmap, "Arrays not memory-mapped")
+        self.assertTrue(np.array_equal(new_graph.compact_fs, self.graph.compact_fs), "Wrong forward star")
+
+        # Mapping is copy-on-write, so the graph can be changed without changing the files
+        new_graph.compact_fs[:] = 0
+        reloaded = Graph()
+        reloaded.load_from_folder(folder, memory_map=False)
+        self.assertNotIsInstance(reloaded.compact_fs, np.memmap, "Arrays should have been read")
+        self.assertTrue(np.array_equal(reloaded.compact_fs, self.graph.compact_fs), "Changes written to disk")
+
+    def test_update_links(self):
+        self.graph.set_graph("free_flow_time")
+        self.graph.set_skimming(["distance"])
+        network = self.graph.network.copy()
+
+        # Changing attributes only patches the graph
+        changed = network[network.link_id.isin([1, 2, 3])].copy()
+        changed.loc[:, "free_flow_time"] *= 2
+        changed.loc[:, "distance"] += 1
+        self.graph.update_links(changed)
+
+        reference = Graph()
+        reference.network = self.graph.network.copy()
+        reference.prepare_graph(self.graph.centroids)
+        reference.set_graph("free_flow_time")
+        reference.set_skimming(["distance"])
+        self.assertTrue(np.allclose(self.graph.compact_cost, reference.compact_cost), "Cost not updated")
+        self.assertTrue(np.allclose(self.graph.compact_skims, reference.compact_skims), "Skims not updated")
+        self.assertTrue(np.allclose(self.graph.cost, reference.cost), "Cost of the full graph not updated")
+
+        # Removing links changes the topology, so the graph is prepared again with the same settings
+        self.graph.update_links(changed.iloc[:0], removed=[4])
+        self.assertEqual(self.graph.network.shape[0], network.shape[0] - 1, "Link not removed")
+        self.assertNotIn(4, self.graph.graph.link_id.values, "Link not removed from the graph")
+        self.assertEqual(self.graph.cost_field, "free_flow_time", "Cost field not kept")
+        self.assertEqual(self.graph.compact_cost.shape[0], self.graph.compact_num_links, "Cost not rebuilt")
+
+        with self.assertRaises(ValueError):
+            self.graph.update_links(changed[["link_id", "a_node", "b_node"]])
+
     def test_available_skims(self):
         self.graph.prepare_graph(np.arange(5) + 1)
         avail = self.graph.available_skims()
@@ -91,3 +193,80 @@ class TestGraph(TestCase):
         r1.prepare(self.graph)
         r1.compute_path(20, 21)
         self.assertEqual(list(r1.path), [63, 69])
+
+    def test_set_closed_links(self):
+        self.graph.set_blocked_centroid_flows(False)
+        self.graph.set_graph("distance")
+        fs = self.graph.compact_fs.copy()
+
+        self.graph.set_closed_links([62])
+        r1 = PathResults()
+        r1.prepare(self.graph)
+        r1.compute_path(20, 21)
+        self.assertEqual(list(r1.path), [63, 69], "Closed link was used")
+        self.assertTrue(np.array_equal(self.graph.compact_fs, fs), "Graph should not have been prepared again")
+
+        # Re-opening the link restores the original path
+        self.graph.set_closed_links([])
+        r1.compute_path(20, 21)
+        self.assertEqual(list(r1.path), [62], "Link not re-opened")
+
+    def test_set_heap(self):
+        self.assertEqual(self.graph.heap_type, "fibonacci", "Wrong default heap")
+        for heap in ["quaternary", "RADIX", "Fibonacci"]:
+            self.graph.set_heap(heap)
+            self.assertEqual(self.graph.heap_type, heap.lower(), "Heap not set properly")
+
+        with self.assertRaises(ValueError):
+            self.graph.set_heap("pairing")
+
+    def test_set_precision(self):
+        self.graph.set_graph("distance")
+        self.graph.set_skimming(["distance"])
+        self.assertEqual(self.graph.compact_cost.dtype, np.float64, "Wrong default precision")
+
+        self.graph.set_precision("single")
+        self.assertEqual(self.graph.compact_cost.dtype, np.float32, "Costs not converted to single precision")
+        self.assertEqual(self.graph.compact_skims.dtype, np.float32, "Skims not converted to single precision")
+        self.assertEqual(self.graph.cost.dtype, np.float64, "Full graph should remain in double precision")
+
+        self.graph.set_graph("free_flow_time")
+        self.assertEqual(self.graph.compact_cost.dtype, np.float32, "New costs not set in single precision")
+
+        with self.assertRaises(ValueError):
+            self.graph.set_precision("half")
+
+    def test_set_node_order(self):
+        self.graph.set_graph("distance")
+        self.graph.set_node_order("RCM")
+        self.assertEqual(self.graph.node_order, "rcm", "Node order not set properly")
+
+        zones = self.graph.num_zones
+        self.assertTrue(np.array_equal(self.graph.compact_all_nodes[:zones], self.graph.centroids), "Centroids moved")
+        indices = self.graph.compact_nodes_to_indices[self.graph.compact_all_nodes]
+        self.assertTrue(np.array_equal(indices, np.arange(self.graph.compact_num_nodes)), "Wrong node indices")
+        self.assertEqual(self.graph.compact_cost.shape[0], self.graph.compact_num_links, "Cost field not reset")
+
+        with self.assertRaises(ValueError):
+            self.graph.set_node_order("hilbert")
+
+    def test_compress_chains(self):
+        # Two centroids joined by a chain of degree-two nodes, with a branch hanging from node 12
+        network = pd.DataFrame(
+            {
+                "link_id": np.arange(1, 8),
+                "a_node": [1, 10, 11, 12, 13, 12, 14],
+                "b_node": [10, 11, 12, 13, 2, 14, 15],
+                "direction": [0, 0, 1, 0, 0, 0, 0],
+                "distance": np.ones(7),
+            }
+        )
+        graph = Graph()
+        graph.network = network
+        graph.prepare_graph(np.array([1, 2]))
+
+        # Chains 1-10-11-12, 12-13-2 and 12-14-15 become single links, and the one-way link makes the first one-way
+        self.assertEqual(graph.compact_num_nodes, 4, "Degree-two nodes were not removed")
+        self.assertEqual(graph.compact_num_links, 5, "Wrong number of compressed links")
+        chain = graph.graph[graph.graph.link_id.isin([1, 2, 3]) & (graph.graph.direction == 1)]
+        self.assertEqual(chain.__compressed_id__.nunique(), 1, "Chain not compressed into a single link")
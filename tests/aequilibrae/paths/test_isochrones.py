@@ -0,0 +1,63 @@
+from unittest import TestCase
+import os
+import uuid
+from shutil import copytree, rmtree
+from tempfile import gettempdir
+import numpy as np
+from aequilibrae.paths import Isochrones, PathResults
+from aequilibrae.project import Project
+
+from ...data import siouxfalls_project
+
+
+class TestIsochrones(TestCase):
+    def setUp(self) -> None:
+        os.environ['PATH'] = os.path.join(gettempdir(), 'temp_data') + ';' + os.environ['PATH']
+
+        self.proj_dir = os.path.join(gettempdir(), uuid.uuid4().hex)
+        copytree(siouxfalls_project, self.proj_dir)
+
+        self.project = Project()
+        self.project.open(self.proj_dir)
+        self.project.network.build_graphs()
+        self.graph = self.project.network.graphs['c']
+        self.graph.set_graph(cost_field="free_flow_time")
+        self.graph.set_skimming("free_flow_time")
+        self.graph.set_blocked_centroid_flows(False)
+
+    def tearDown(self) -> None:
+        self.project.close()
+        try:
+            rmtree(self.proj_dir)
+        except Exception as e:
+            print(f'Failed to remove at {e.args}')
+
+    def test_execute(self):
+        iso = Isochrones(self.graph)
+        iso.execute([1, 10], cutoff=8)
+
+        res = PathResults()
+        res.prepare(self.graph)
+        for source in [1, 10]:
+            res.compute_path(source, 24)
+            costs = res._skimming_array[: self.graph.num_nodes, 0]
+            expected = self.graph.all_nodes[costs <= 8]
+
+            nodes = iso.nodes[iso.nodes.source == source]
+            self.assertEqual(sorted(nodes.node_id.tolist()), sorted(expected.tolist()), "Wrong nodes reached")
+            np.testing.assert_allclose(nodes.cost.values, costs[self.graph.nodes_to_indices[nodes.node_id.values]])
+
+            links = iso.links[iso.links.source == source]
+            a_nodes = self.graph.graph.a_node.values
+            reachable = costs[a_nodes] + self.graph.cost <= 8
+            self.assertEqual(links.shape[0], reachable.sum(), "Wrong links reached")
+
+        with self.assertRaises(ValueError):
+            iso.execute([100000], cutoff=8)
+
+    def test_polygons(self):
+        iso = Isochrones(self.graph)
+        iso.execute([1, 10], cutoff=8)
+        polygons = iso.polygons(self.project.conn)
+        self.assertEqual(polygons.source.tolist(), [1, 10])
+        self.assertTrue(all(geo.area > 0 for geo in polygons.geometry))
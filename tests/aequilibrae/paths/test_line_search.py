@@ -0,0 +1,52 @@
+from unittest import TestCase
+from aequilibrae.paths.AoN import line_search, bpr, conical
+import numpy as np
+
+
+class TestLineSearch(TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(42)
+        self.links = 1000
+        self.capacity = rng.uniform(500, 2000, self.links)
+        self.fftime = rng.uniform(0.5, 5, self.links)
+        self.flows = rng.uniform(0, 2000, self.links)
+        self.direction = rng.uniform(0, 2000, self.links)
+        self.direction[:10] = self.flows[:10]
+
+    def derivative(self, vdf, stepsize, alpha, beta, const_term):
+        times = np.zeros(self.links)
+        combined = self.flows + stepsize * (self.direction - self.flows)
+        vdf(times, combined, self.capacity, self.fftime, alpha, beta, 1)
+        return np.sum(times * (self.direction - self.flows)) + const_term
+
+    def check_root(self, function, vdf, alpha, beta, const_term):
+        stepsize, at_zero, at_one, converged = line_search(
+            function, self.direction, self.flows, self.capacity, self.fftime, alpha, beta, const_term, 1e-10, 4, 2
+        )
+        self.assertTrue(converged)
+        self.assertAlmostEqual(at_zero, self.derivative(vdf, 0.0, alpha, beta, const_term), 6)
+        self.assertAlmostEqual(at_one, self.derivative(vdf, 1.0, alpha, beta, const_term), 6)
+        self.assertLess(self.derivative(vdf, stepsize - 1e-8, alpha, beta, const_term), 0)
+        self.assertGreater(self.derivative(vdf, stepsize + 1e-8, alpha, beta, const_term), 0)
+
+    def test_bpr(self):
+        alpha = np.full(self.links, 0.15)
+        beta = np.full(self.links, 4.0)
+        self.check_root("BPR", bpr, alpha, beta, 0.0)
+        self.check_root("BPR", bpr, alpha, beta, -1000.0)
+
+    def test_conical(self):
+        alpha = np.full(self.links, 4.0)
+        beta = np.full(self.links, 1.166)
+        self.check_root("CONICAL", conical, alpha, beta, 0.0)
+
+    def test_no_root(self):
+        alpha = np.full(self.links, 0.15)
+        beta = np.full(self.links, 4.0)
+        self.direction[:] = self.flows * 1.5
+        stepsize, at_zero, at_one, converged = line_search(
+            "BPR", self.direction, self.flows, self.capacity, self.fftime, alpha, beta, 0.0, 1e-10, 4, 1
+        )
+        self.assertTrue(np.isnan(stepsize))
+        self.assertFalse(converged)
+        self.assertLess(at_zero, at_one)
@@ -2,7 +2,7 @@ from unittest import TestCase
 import numpy as np
 from aequilibrae.paths.network_skimming import NetworkSkimming
 from aequilibrae.paths import skimming_single_origin
-from aequilibrae.paths.results import SkimResults
+from aequilibrae.paths.results import SkimResults, PathResults
 from aequilibrae.paths.multi_threaded_skimming import MultiThreadedNetworkSkimming
 import os
 from shutil import copytree, rmtree
@@ -73,3 +73,93 @@ class TestNetwork_skimming(TestCase):
         self.assertEqual(mat.procedure, 'Network skimming', 'Matrix saved wrong procedure name')
         self.assertEqual(mat.procedure_id, skm.procedure_id, 'Procedure ID saved  wrong')
         self.assertEqual(mat.timestamp, skm.procedure_date, 'Procedure ID saved  wrong')
+
+    def test_network_skimming_destinations(self):
+        self.network.build_graphs()
+        graph = self.network.graphs['c']
+        graph.set_graph(cost_field="distance")
+        graph.set_skimming("distance")
+
+        skm = NetworkSkimming(graph)
+        skm.execute()
+
+        destinations = [3, 7, 20]
+        partial = NetworkSkimming(graph, destinations=destinations)
+        partial.execute()
+
+        idx = graph.compact_nodes_to_indices[destinations]
+        np.testing.assert_array_equal(skm.results.skims.distance[:, idx], partial.results.skims.distance[:, idx])
+
+        with self.assertRaises(ValueError):
+            NetworkSkimming(graph, destinations=[100000]).execute()
+
+    def test_network_skimming_matches_path_skims(self):
+        # Network skimming only cascades skims along paths to centroids, so it is checked against the skims of
+        # full path trees
+        self.network.build_graphs()
+        graph = self.network.graphs['c']
+        graph.set_graph(cost_field="free_flow_time")
+        graph.set_skimming(["distance", "free_flow_time"])
+        graph.set_blocked_centroid_flows(False)
+
+        skm = NetworkSkimming(graph)
+        skm.execute()
+
+        res = PathResults()
+        res.prepare(graph)
+        indices = graph.nodes_to_indices[graph.centroids]
+        for i, origin in enumerate(graph.centroids):
+            res.compute_path(origin, graph.centroids[i - 1])
+            np.testing.assert_allclose(skm.results.skims.matrix_view[i, :, :], res._skimming_array[indices, :])
+
+    def test_network_skimming_streamed_output(self):
+        self.network.build_graphs()
+        graph = self.network.graphs['c']
+        graph.set_graph(cost_field="free_flow_time")
+        graph.set_skimming(["distance", "free_flow_time"])
+
+        skm = NetworkSkimming(graph)
+        skm.execute()
+
+        for extension in ["aem", "omx"]:
+            streamed = NetworkSkimming(graph)
+            streamed.results.set_output(os.path.join(self.proj_dir, 'matrices', f'streamed.{extension}'), block_size=5)
+            streamed.execute()
+            for name in skm.results.skims.names:
+                np.testing.assert_array_equal(skm.results.skims.get_matrix(name),
+                                              streamed.results.skims.get_matrix(name))
+            streamed.save_to_project(f'streamed {extension}')
+            self.assertEqual(self.project.matrices.get_record(f'streamed {extension}').cores, 2)
+
+        with self.assertRaises(ValueError):
+            NetworkSkimming(graph).results.set_output(os.path.join(self.proj_dir, 'skims.csv'))
+
+    def test_many_to_many(self):
+        self.network.build_graphs()
+        graph = self.network.graphs['c']
+        graph.set_graph(cost_field="free_flow_time")
+        graph.set_skimming(["distance", "free_flow_time"])
+        graph.set_blocked_centroid_flows(False)
+
+        origins, destinations = [3, 7, 12], [1, 7, 20, 24]
+        skm = NetworkSkimming(graph)
+        costs, skims = skm.many_to_many(origins, destinations)
+        self.assertEqual(costs.shape, (3, 4))
+        self.assertEqual(skims.shape, (3, 4, 2))
+
+        res = PathResults()
+        res.prepare(graph)
+        indices = graph.nodes_to_indices[destinations]
+        for i, origin in enumerate(origins):
+            res.compute_path(origin, destinations[0])
+            np.testing.assert_allclose(skims[i, :, :], res._skimming_array[indices, :])
+            np.testing.assert_allclose(costs[i, :], res._skimming_array[indices, 1])
+
+        # Only the requested origins are skimmed
+        partial = NetworkSkimming(graph, origins=origins)
+        partial.execute()
+        rows = graph.compact_nodes_to_indices[origins]
+        np.testing.assert_allclose(partial.results.skims.matrix_view[rows, :, :][:, indices, :], skims)
+
+        with self.assertRaises(ValueError):
+            skm.many_to_many([100000], destinations)
@@ -1,7 +1,9 @@
 import unittest
 import numpy as np
-from aequilibrae.paths.AoN import copy_one_dimension, sum_axis1, linear_combination, linear_combination_skims
+from aequilibrae.paths.AoN import copy_one_dimension, sum_axis0, sum_axis1, linear_combination, linear_combination_skims
 from aequilibrae.paths.AoN import copy_two_dimensions, copy_three_dimensions
+from aequilibrae.paths.AoN import conjugate_differences, biconjugate_differences
+from aequilibrae.paths.AoN import conjugate_scalars, biconjugate_scalars
 
 
 class TestParallel(unittest.TestCase):
@@ -13,6 +15,14 @@ class TestParallel(unittest.TestCase):
         sum_axis1(target, source, 1)
         self.assertEqual((b - target).max(), 0, 'Sum Axis 1 failed')
 
+    def test_sum_axis0(self):
+        target = np.zeros((50, 3))
+        source = np.random.rand(600).reshape(4, 50, 3)
+        b = np.sum(source, axis=0)
+
+        sum_axis0(target, source, 2)
+        self.assertTrue(np.allclose(b, target), 'Sum Axis 0 failed')
+
     def test_linear_combination(self):
         target = np.zeros((50, 1))
         source = np.random.rand(50).reshape(50, 1)
@@ -63,6 +73,40 @@ class TestParallel(unittest.TestCase):
         if target.sum() == 0:
             self.fail('Target and source are the other way around for copying one dimension')
 
+    def test_conjugate_scalars(self):
+        # Two traffic classes, with different numbers of user classes
+        classes = [np.random.rand(3 * 40 * k).reshape(3, 40, k) for k in [1, 3]]
+        der = np.random.rand(40)
+
+        differences = np.zeros((40, 3))
+        for i, (current, aon, step) in enumerate(classes):
+            conjugate_differences(differences, current, aon, step, i == 0, 2)
+        numerator, denominator = conjugate_scalars(differences, der, 2)
+
+        x = sum(np.sum(step - current, axis=1) for current, _, step in classes)
+        y = sum(np.sum(aon - current, axis=1) for current, aon, _ in classes)
+        w = sum(np.sum(aon - step, axis=1) for _, aon, step in classes)
+        self.assertAlmostEqual(numerator, np.sum(x * y * der), 10, 'Conjugate numerator is wrong')
+        self.assertAlmostEqual(denominator, np.sum(x * w * der), 10, 'Conjugate denominator is wrong')
+
+    def test_biconjugate_scalars(self):
+        classes = [np.random.rand(4 * 40 * k).reshape(4, 40, k) for k in [2, 1]]
+        der = np.random.rand(40)
+        stepsize = 0.3
+
+        differences = np.zeros((40, 3))
+        for i, (current, aon, step, previous) in enumerate(classes):
+            biconjugate_differences(differences, current, aon, step, previous, i == 0, 2)
+        scalars = biconjugate_scalars(differences, der, stepsize, 2)
+
+        x = sum(np.sum(s * stepsize + p * (1 - stepsize) - r, axis=1) for r, _, s, p in classes)
+        y = sum(np.sum(a - r, axis=1) for r, a, _, _ in classes)
+        z = sum(np.sum(s - r, axis=1) for r, _, s, _ in classes)
+        w = sum(np.sum(p - s, axis=1) for _, _, s, p in classes)
+        expected = [np.sum(x * y * der), np.sum(x * w * der), np.sum(z * y * der), np.sum(z * z * der)]
+        for computed, value in zip(scalars, expected):
+            self.assertAlmostEqual(computed, value, 10, 'Biconjugate direction terms are wrong')
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -84,3 +84,24 @@ class TestPathResults(TestCase):
         self.assertEqual(list(self.r.path_link_directions), [1, 1], "Path update failed. Wrong link directions")
         self.assertEqual(list(self.r.path_nodes), [5, 9, 10], "Path update failed. Wrong sequence of path nodes")
         self.assertEqual(list(self.r.milepost), [0, 5, 8], "Path update failed. Wrong milepost results")
+
+    def test_compute_paths_all_heaps(self):
+        for heap in self.g.heaps_available:
+            self.g.set_heap(heap)
+            self.r.compute_path(5, 2)
+            self.assertEqual(list(self.r.path), [12, 14], f"Path computation failed with the {heap} heap")
+            self.r.update_trace(10)
+            self.assertEqual(list(self.r.path_nodes), [5, 9, 10], f"Path update failed with the {heap} heap")
+
+    def test_compute_paths_early_exit(self):
+        self.r.compute_path(5, 2, early_exit=True)
+        self.assertEqual(list(self.r.path), [12, 14], "Path computation with early exit failed")
+        self.r.update_trace(10)
+        self.assertEqual(list(self.r.path_nodes), [5, 9, 10], "Path update with early exit failed")
+
+    def test_compute_paths_bidirectional(self):
+        self.r.compute_path(5, 2, bidirectional=True)
+        self.assertEqual(list(self.r.path), [12, 14], "Bidirectional path computation failed")
+        self.assertEqual(list(self.r.milepost), [0, 4, 9], "Bidirectional milepost computation failed")
+        self.r.update_trace(10)
+        self.assertEqual(list(self.r.path_nodes), [5, 9, 10], "Bidirectional path update failed")
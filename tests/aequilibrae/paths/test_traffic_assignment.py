@@ -31,7 +31,7 @@ class TestTrafficAssignment(TestCase):
         self.assignment = TrafficAssignment()
         self.assigclass = TrafficClass('car', self.car_graph, self.matrix)
 
-        self.algorithms = ["msa", "cfw", "bfw", "frank-wolfe"]
+        self.algorithms = ["msa", "cfw", "bfw", "frank-wolfe", "algorithm-b", "gradient-projection"]
 
     def tearDown(self) -> None:
         self.matrix.close()
@@ -60,7 +60,7 @@ class TestTrafficAssignment(TestCase):
 
     def test_algorithms_available(self):
         algs = self.assignment.algorithms_available()
-        real = ["all-or-nothing", "msa", "frank-wolfe", "bfw", "cfw", "fw"]
+        real = ["all-or-nothing", "msa", "frank-wolfe", "bfw", "cfw", "fw", "algorithm-b", "gradient-projection"]
 
         diff = [x for x in real if x not in algs]
         diff2 = [x for x in algs if x not in real]
@@ -217,6 +217,104 @@ class TestTrafficAssignment(TestCase):
         with self.assertRaises(ValueError):
             self.assignment.save_results("save_to_database")
 
+    def test_skim_blending_iterations(self):
+        with self.assertRaises(ValueError):
+            self.assignment.skim_blending_iterations = 0
+
+        self.car_graph.set_skimming(["free_flow_time", "distance"])
+
+        def assign(blending_iterations, max_iter=20, rgap_target=1e-10):
+            assignment = TrafficAssignment()
+            assigclass = TrafficClass("car", self.car_graph, self.matrix)
+            assignment.set_classes([assigclass])
+            assignment.set_vdf("BPR")
+            assignment.set_vdf_parameters({"alpha": "b", "beta": "power"})
+            assignment.set_capacity_field("capacity")
+            assignment.set_time_field("free_flow_time")
+            assignment.max_iter = max_iter
+            assignment.rgap_target = rgap_target
+            assignment.set_algorithm("bfw")
+            assignment.skim_blending_iterations = blending_iterations
+            assignment.execute()
+            return assignment, assigclass
+
+        _, all_iterations = assign(None)
+        all_skims = all_iterations.results.skims.matrix_view
+
+        # Blending over as many iterations as there are is the same as blending over all of them
+        _, assigclass = assign(20)
+        np.testing.assert_array_equal(assigclass.results.skims.matrix_view, all_skims)
+
+        _, assigclass = assign(3)
+        np.testing.assert_array_equal(assigclass.results.link_loads, all_iterations.results.link_loads)
+        self.assertFalse(np.array_equal(assigclass.results.skims.matrix_view, all_skims))
+
+        # If the assignment converges before skims are blended, they are those of the last all-or-nothing
+        assignment, assigclass = assign(1, 1000, 0.05)
+        self.assertLess(len(assignment.report()), 1000)
+        np.testing.assert_array_equal(assigclass.results.skims.matrix_view, assigclass._aon_results.skims.matrix_view)
+
+    def test_execute_algorithm_b(self):
+        self.assignment.add_class(self.assigclass)
+        self.assignment.set_vdf("BPR")
+        self.assignment.set_vdf_parameters({"alpha": "b", "beta": "power"})
+        self.assignment.set_capacity_field("capacity")
+        self.assignment.set_time_field("free_flow_time")
+
+        self.assignment.max_iter = 500
+        self.assignment.rgap_target = 0.00001
+        self.assignment.set_algorithm("bfw")
+        self.assignment.execute()
+        bfw_flows = np.array(self.assigclass.results.total_link_loads, copy=True)
+
+        self.assignment.rgap_target = 1e-8
+        self.assignment.set_algorithm("algorithm-b")
+        self.assignment.execute()
+        self.assertLess(self.assignment.assignment.rgap, 1e-8, "Algorithm B did not converge")
+        self.assertLess(len(self.assignment.report()), 500)
+
+        flows = self.assigclass.results.total_link_loads
+        np.testing.assert_allclose(flows, bfw_flows, atol=bfw_flows.max() * 0.005)
+        np.testing.assert_allclose(self.assignment.results().PCE_tot.sum(), flows.sum())
+
+    def test_execute_gradient_projection(self):
+        self.assignment.add_class(self.assigclass)
+        self.assignment.set_vdf("BPR")
+        self.assignment.set_vdf_parameters({"alpha": "b", "beta": "power"})
+        self.assignment.set_capacity_field("capacity")
+        self.assignment.set_time_field("free_flow_time")
+
+        self.assignment.max_iter = 500
+        self.assignment.rgap_target = 1e-8
+        self.assignment.set_algorithm("algorithm-b")
+        self.assignment.execute()
+        bush_flows = np.array(self.assigclass.results.total_link_loads, copy=True)
+
+        self.assignment.set_algorithm("gradient-projection")
+        self.assignment.execute()
+        self.assertLess(self.assignment.assignment.rgap, 1e-8, "Gradient projection did not converge")
+        np.testing.assert_allclose(self.assigclass.results.total_link_loads, bush_flows, atol=0.01)
+
+        # Paths carry the entire demand, and selecting all links gives back the assignment results
+        paths = self.assigclass.results.path_store
+        od_flows, link_flows = paths.select_link(self.car_graph.graph.link_id.unique())
+        demand = np.nan_to_num(self.matrix.matrix_view).reshape(od_flows.shape)
+        demand[np.arange(paths.zones), np.arange(paths.zones), :] = 0
+        np.testing.assert_allclose(od_flows, demand)
+        np.testing.assert_allclose(link_flows, self.assigclass.results.link_loads)
+
+        # Only paths using the selected link are returned
+        od_flows, link_flows = paths.select_link([1])
+        path_file = paths.path_file()
+        using = path_file[path_file.link_id == 1][["origin", "destination", "path", "flow"]].drop_duplicates()
+        self.assertAlmostEqual(od_flows.sum(), using.flow.sum())
+        rows = self.car_graph.graph.__supernet_id__[self.car_graph.graph.link_id == 1]
+        self.assertAlmostEqual(link_flows[rows].sum(), using.flow.sum())
+
+        file_name = os.path.join(gettempdir(), f"path_file_{uuid.uuid4().hex}.csv")
+        self.assigclass.results.save_to_disk(file_name, output="path_file")
+        self.assertEqual(pd.read_csv(file_name).shape[0], path_file.shape[0])
+
     def test_info(self):
         iterations = random.randint(1, 10000)
         rgap = random.random() / 10000
@@ -1,11 +1,13 @@
 from unittest import TestCase
 from tempfile import gettempdir
 from uuid import uuid4
+import numpy as np
 from os.path import join
 from aequilibrae.paths import TrafficClass
 from aequilibrae.matrix import AequilibraeMatrix
 from aequilibrae.paths import Graph
 from aequilibrae.paths.results import AssignmentResults
+from aequilibrae.paths.all_or_nothing import allOrNothing
 from aequilibrae.utils.create_example import create_example
 
 
@@ -30,3 +32,24 @@ class TestTrafficClass(TestCase):
         tc.set_pce(1)
         tc.set_pce(3.9)
         project.close()
+
+    def test_set_closed_links(self):
+        project = create_example(join(gettempdir(), "test_set_closed_links_" + uuid4().hex))
+        project.network.build_graphs()
+        car_graph = project.network.graphs["c"]  # type: Graph
+        car_graph.set_graph("free_flow_time")
+        car_graph.set_blocked_centroid_flows(False)
+
+        matrix = project.matrices.get_matrix("demand_omx")
+        matrix.computational_view()
+
+        tc = TrafficClass(name="car", graph=car_graph, matrix=matrix)
+        tc.set_closed_links([1, 2])
+        self.assertEqual(tc._aon_results.closed_links, [1, 2], "Links not closed for the class")
+        self.assertEqual(car_graph.closed_links, [], "Links should only be closed for the class")
+
+        allOrNothing(matrix, car_graph, tc._aon_results).execute()
+        loads = tc._aon_results.get_load_results()
+        closed = np.isin(loads.index, [1, 2])
+        self.assertEqual(np.nansum(loads.data[f"{matrix.view_names[0]}_tot"][closed]), 0, "Closed links were loaded")
+        project.close()
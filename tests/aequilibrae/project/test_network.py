@@ -1,5 +1,6 @@
 from unittest import TestCase
 import sqlite3
+import numpy as np
 from tempfile import gettempdir
 import os
 import uuid
@@ -81,3 +82,46 @@ class TestNetwork(TestCase):
     def test_count_nodes(self):
         items = self.siouxfalls.network.count_nodes()
         self.assertEqual(24, items, 'Wrong number of nodes found')
+
+    def test_build_graphs_with_cache(self):
+        self.siouxfalls.network.build_graphs(modes=["c"], use_cache=True)
+        cache_folder = join(self.proj_path, "graph_cache")
+        self.assertEqual(len(os.listdir(cache_folder)), 1, "Graph not cached")
+        built = self.siouxfalls.network.graphs["c"]
+
+        self.siouxfalls.network.graphs = {}
+        self.siouxfalls.network.build_graphs(modes=["c"], use_cache=True)
+        cached = self.siouxfalls.network.graphs["c"]
+        self.assertEqual(built.__id__, cached.__id__, "Graph not loaded from the cache")
+        self.assertEqual(built.compact_num_links, cached.compact_num_links, "Cached graph is different")
+
+        # Any edit to the network invalidates the cached graphs
+        link = self.siouxfalls.network.links.get(1)
+        link.name = "cached graph test"
+        link.save()
+        self.siouxfalls.network.build_graphs(modes=["c"], use_cache=True)
+        self.assertNotEqual(built.__id__, self.siouxfalls.network.graphs["c"].__id__, "Cache not invalidated")
+        self.assertEqual(len(os.listdir(cache_folder)), 1, "Stale graph not removed from the cache")
+
+        # Edits older than all cached graphs are no longer needed
+        edits = self.siouxfalls.conn.execute("select count(*) from network_edits").fetchone()[0]
+        self.assertEqual(edits, 0, "Edit log not pruned when the graph was cached")
+
+    def test_build_graphs_applies_edits_to_cache(self):
+        self.siouxfalls.network.build_graphs(modes=["c"], use_cache=True)
+        cached_id = self.siouxfalls.network.graphs["c"].__id__
+
+        link = self.siouxfalls.network.links.get(1)
+        link.free_flow_time = link.free_flow_time * 3
+        link.save()
+
+        self.siouxfalls.network.graphs = {}
+        self.siouxfalls.network.build_graphs(modes=["c"], use_cache=True)
+        updated = self.siouxfalls.network.graphs["c"]
+        self.assertNotEqual(updated.__id__, cached_id, "Edits not applied to the cached graph")
+        updated.set_graph("free_flow_time")
+
+        self.siouxfalls.network.build_graphs(modes=["c"])
+        reference = self.siouxfalls.network.graphs["c"]
+        reference.set_graph("free_flow_time")
+        self.assertTrue(np.allclose(updated.compact_cost, reference.compact_cost), "Edits not applied to the graph")